@@ -147,6 +147,8 @@ install -p -D -m 644 dci/systemd/dci-worker.service %{buildroot}%{_unitdir}/dci-
 %{_bindir}/dci-dbsync
 %{_bindir}/dci-dbinit
 %{_bindir}/dci-purge-swift-components
+%{_bindir}/dci-rebuild-global-status
+%{_bindir}/dci-rebuild-trends
 %license LICENSE
 %{python_sitelib}/dci
 %{python_sitelib}/*.egg-info
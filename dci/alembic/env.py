@@ -60,7 +60,7 @@ def run_migrations_online():
     and associate a connection with the context.
 
     """
-    connectable = dci_config.get_engine()
+    connectable = dci_config.get_engine(dci_config.ADMIN)
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
@@ -0,0 +1,43 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add keyset pagination indexes
+
+Revision ID: a3f1c6b2d8e4
+Revises: 45e44e338043
+Create Date: 2020-04-02 10:12:41.512309
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c6b2d8e4'
+down_revision = '45e44e338043'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('jobs_created_at_id_idx', 'jobs', ['created_at', 'id'])
+    op.create_index('jobstates_created_at_id_idx', 'jobstates',
+                    ['created_at', 'id'])
+    op.create_index('files_created_at_id_idx', 'files', ['created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('files_created_at_id_idx', 'files')
+    op.drop_index('jobstates_created_at_id_idx', 'jobstates')
+    op.drop_index('jobs_created_at_id_idx', 'jobs')
@@ -0,0 +1,53 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add idempotency_keys table
+
+Revision ID: b7e2c94d1a06
+Revises: f3a9d7c20e15
+Create Date: 2020-04-20 14:08:51.227463
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2c94d1a06'
+down_revision = 'f3a9d7c20e15'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+
+def upgrade():
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('remoteci_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('remotecis.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('key', sa.String(255), nullable=False, primary_key=True),
+        sa.Column('request_hash', sa.String(64), nullable=False),
+        sa.Column('job_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False)
+    )
+    op.create_index('idempotency_keys_job_id_idx', 'idempotency_keys',
+                    ['job_id'])
+
+
+def downgrade():
+    op.drop_table('idempotency_keys')
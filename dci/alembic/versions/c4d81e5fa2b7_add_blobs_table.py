@@ -0,0 +1,52 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add blobs table
+
+Revision ID: c4d81e5fa2b7
+Revises: b7e2c94d1a06
+Create Date: 2020-04-27 10:31:12.604118
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c4d81e5fa2b7'
+down_revision = 'b7e2c94d1a06'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'blobs',
+        sa.Column('sha256', sa.String(64), primary_key=True),
+        sa.Column('md5', sa.String(32), nullable=False),
+        sa.Column('size', sa.BIGINT, nullable=False),
+        sa.Column('refcount', sa.Integer, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False)
+    )
+    op.add_column('files', sa.Column('sha256', sa.String(64),
+                                     sa.ForeignKey('blobs.sha256'),
+                                     nullable=True))
+    op.create_index('files_sha256_idx', 'files', ['sha256'])
+
+
+def downgrade():
+    op.drop_index('files_sha256_idx', 'files')
+    op.drop_column('files', 'sha256')
+    op.drop_table('blobs')
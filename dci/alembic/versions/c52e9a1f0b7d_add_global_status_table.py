@@ -0,0 +1,64 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add global status table
+
+Revision ID: c52e9a1f0b7d
+Revises: a3f1c6b2d8e4
+Create Date: 2020-04-09 14:31:07.204115
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c52e9a1f0b7d'
+down_revision = 'a3f1c6b2d8e4'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+from dci.db import global_status
+
+
+def upgrade():
+    statuses = pg.ENUM('new', 'pre-run', 'running', 'post-run', 'success',
+                       'failure', 'killed', 'error', name='statuses',
+                       create_type=False)
+
+    op.create_index('jobs_components_component_id_idx', 'jobs_components',
+                    ['component_id'])
+    op.create_table(
+        'global_status',
+        sa.Column('component_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('components.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('remoteci_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('remotecis.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('job_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Index('global_status_job_id_idx', 'job_id'),
+        sa.Column('status', statuses, nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False)
+    )
+    global_status.rebuild(op.get_bind())
+
+
+def downgrade():
+    op.drop_table('global_status')
+    op.drop_index('jobs_components_component_id_idx', 'jobs_components')
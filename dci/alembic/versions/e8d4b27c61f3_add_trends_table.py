@@ -0,0 +1,54 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add trends table
+
+Revision ID: e8d4b27c61f3
+Revises: c52e9a1f0b7d
+Create Date: 2020-04-14 10:12:45.381920
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e8d4b27c61f3'
+down_revision = 'c52e9a1f0b7d'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+from dci.db import trends
+
+
+def upgrade():
+    op.create_table(
+        'trends',
+        sa.Column('topic_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('topics.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('team_id', pg.UUID(as_uuid=True),
+                  sa.ForeignKey('teams.id', ondelete='CASCADE'),
+                  nullable=False, primary_key=True),
+        sa.Column('day', sa.Date(), nullable=False, primary_key=True),
+        sa.Column('success', sa.Integer, nullable=False),
+        sa.Column('failure', sa.Integer, nullable=False)
+    )
+    trends.rebuild(op.get_bind())
+
+
+def downgrade():
+    op.drop_table('trends')
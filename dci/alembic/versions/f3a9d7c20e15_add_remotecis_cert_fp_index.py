@@ -0,0 +1,38 @@
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Add remotecis cert_fp index
+
+Revision ID: f3a9d7c20e15
+Revises: e8d4b27c61f3
+Create Date: 2020-04-16 09:41:22.803114
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9d7c20e15'
+down_revision = 'e8d4b27c61f3'
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('remotecis_cert_fp_idx', 'remotecis', ['cert_fp'])
+
+
+def downgrade():
+    op.drop_index('remotecis_cert_fp_idx', 'remotecis')
@@ -68,11 +68,12 @@ def get_all_analytics(user, job_id):
 
     query.add_extra_condition(_TABLE.c.job_id == job_id)
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, _TABLE.name)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, _TABLE.name,
+                                  fields=args['fields'])
 
-    return flask.jsonify({'analytics': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'analytics': rows, '_meta': meta})
 
 
 @api.route('/jobs/<uuid:job_id>/analytics/<uuid:anc_id>', methods=['GET'])
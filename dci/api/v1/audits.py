@@ -41,8 +41,9 @@ def get_logs(user):
     if user.is_not_super_admin():
         raise dci_exc.Unauthorized()
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, _TABLE.name, args['embed'], None)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, _TABLE.name, args['embed'], None,
+                                  fields=args['fields'])
 
-    return flask.jsonify({'audits': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'audits': rows, '_meta': meta})
@@ -22,6 +22,7 @@ from dci.common import exceptions as dci_exc
 from dci.common import signature
 from dci.common import utils
 from dci.common.schemas import check_and_get_args
+from dci.identity import forget_identity
 
 
 def get_resource_by_id(user, resource, table, embed_many=None,
@@ -35,7 +36,8 @@ def get_resource_by_id(user, resource, table, embed_many=None,
     resource_id = resource['id']
     columns = v1_utils.get_columns_name_with_objects(table)
 
-    query = v1_utils.QueryBuilder(table, args, columns, ignore_columns)
+    query = v1_utils.QueryBuilder(table, args, columns, ignore_columns,
+                                  embed_many=embed_many)
 
     if 'state' in resource:
         query.add_extra_condition(table.c.state != 'archived')
@@ -43,7 +45,8 @@ def get_resource_by_id(user, resource, table, embed_many=None,
     query.add_extra_condition(table.c.id == resource_id)
 
     rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, table.name, args['embed'], embed_many)
+    rows = v1_utils.format_result(rows, table.name, args['embed'], embed_many,
+                                  fields=args['fields'])
 
     if len(rows) < 1:
         raise dci_exc.DCINotFound(resource_name, resource_id)
@@ -111,6 +114,7 @@ def refresh_api_secret(user, resource, table):
 
     if not result.rowcount:
         raise dci_exc.DCIConflict(resource_name, resource['id'])
+    forget_identity(resource['id'])
 
     res = flask.jsonify(({'id': resource['id'], 'etag': resource['etag'],
                           'api_secret': values['api_secret']}))
@@ -16,11 +16,11 @@
 import flask
 import logging
 import os.path
+import uuid
+
 from sqlalchemy import sql
 
 from dci.api.v1 import api
-from dci.api.v1 import export_control
-from dci.api.v1 import utils as v1_utils
 from dci.common import exceptions as dci_exc
 from dci import decorators
 from dci.db import models
@@ -34,6 +34,131 @@ def splitpath(path):
     return [p for p in paths if p]
 
 
+def forget_access_decisions():
+    """Forget the cached repository access decisions after a change of a
+    remoteci, team, product, topic or component, or of their teams."""
+    flask.current_app.certs_access_cache.discard(lambda decision: True)
+
+
+def _get_access_query(fp, product_id, topic_id, component_id):
+    REMOTECIS = models.REMOTECIS
+    TEAMS = models.TEAMS
+    PRODUCTS = models.PRODUCTS
+    TOPICS = models.TOPICS
+    COMPONENTS = models.COMPONENTS
+    JPT = models.JOIN_PRODUCTS_TEAMS
+    JTT = models.JOINS_TOPICS_TEAMS
+
+    product_access = sql.exists().where(sql.and_(
+        JPT.c.team_id == REMOTECIS.c.team_id,
+        JPT.c.product_id == product_id))
+    topic_access = sql.exists().where(sql.and_(
+        JTT.c.team_id == REMOTECIS.c.team_id,
+        JTT.c.topic_id == topic_id))
+
+    return sql.select([
+        REMOTECIS.c.team_id.label('remoteci_team_id'),
+        TEAMS.c.id.label('team_id'),
+        TEAMS.c.name.label('team_name'),
+        TEAMS.c.state.label('team_state'),
+        PRODUCTS.c.id.label('product_id'),
+        PRODUCTS.c.name.label('product_name'),
+        PRODUCTS.c.state.label('product_state'),
+        TOPICS.c.id.label('topic_id'),
+        TOPICS.c.name.label('topic_name'),
+        TOPICS.c.state.label('topic_state'),
+        TOPICS.c.product_id.label('topic_product_id'),
+        TOPICS.c.export_control.label('topic_export_control'),
+        COMPONENTS.c.id.label('component_id'),
+        COMPONENTS.c.name.label('component_name'),
+        COMPONENTS.c.state.label('component_state'),
+        COMPONENTS.c.topic_id.label('component_topic_id'),
+        product_access.label('product_access'),
+        topic_access.label('topic_access'),
+    ]).select_from(
+        REMOTECIS.outerjoin(
+            TEAMS,
+            sql.and_(TEAMS.c.id == REMOTECIS.c.team_id,
+                     TEAMS.c.state != 'archived')
+        ).outerjoin(
+            PRODUCTS,
+            sql.and_(PRODUCTS.c.id == product_id,
+                     PRODUCTS.c.state != 'archived')
+        ).outerjoin(
+            TOPICS,
+            sql.and_(TOPICS.c.id == topic_id,
+                     TOPICS.c.state != 'archived')
+        ).outerjoin(
+            COMPONENTS,
+            sql.and_(COMPONENTS.c.id == component_id,
+                     COMPONENTS.c.state != 'archived')
+        )
+    ).where(REMOTECIS.c.cert_fp == fp)
+
+
+def _not_found(resource_id):
+    return dci_exc.DCIException('Resource "%s" not found.' % resource_id,
+                                status_code=404)
+
+
+def _forbidden(message):
+    return dci_exc.DCIException(message=message, status_code=403)
+
+
+def _verify_access(fp, product_id, topic_id, component_id):
+    """Verify in one query that the remoteci of the certificate fingerprint
+    can download the component, raise a DCIException if not."""
+    query = _get_access_query(fp, product_id, topic_id, component_id)
+    rows = flask.g.db_conn.execute(query).fetchall()
+    if len(rows) != 1:
+        raise _forbidden("remoteci fingerprint not found: %s" % fp)
+    access = rows[0]
+
+    if access["product_id"] is None:
+        raise _not_found(product_id)
+    if access["product_state"] != "active":
+        raise _forbidden("product %s/%s is not active"
+                         % (access["product_name"], access["product_id"]))
+
+    if access["topic_id"] is None:
+        raise _not_found(topic_id)
+    if access["topic_state"] != "active":
+        raise _forbidden("topic %s/%s is not active"
+                         % (access["topic_name"], access["topic_id"]))
+    if access["topic_product_id"] != access["product_id"]:
+        raise _forbidden("topic %s/%s does not belongs to product %s/%s"
+                         % (access["topic_name"], access["topic_id"],
+                            access["product_name"], access["product_id"]))
+
+    if access["component_id"] is None:
+        raise _not_found(component_id)
+    if access["component_state"] != "active":
+        raise _forbidden("component %s/%s is not active"
+                         % (access["component_name"],
+                            access["component_id"]))
+    if access["component_topic_id"] != access["topic_id"]:
+        raise _forbidden("component %s/%s does not belongs to topic %s/%s"
+                         % (access["component_name"], access["component_id"],
+                            access["topic_name"], access["topic_id"]))
+
+    if access["team_id"] is None:
+        raise _not_found(access["remoteci_team_id"])
+    if access["team_state"] != "active":
+        raise _forbidden("team %s/%s is not active"
+                         % (access["team_name"], access["team_id"]))
+
+    if not access["product_access"]:
+        raise _forbidden("team %s is not associated to the product %s"
+                         % (access["team_name"], access["product_name"]))
+
+    if access["topic_export_control"] is True:
+        return
+
+    if not access["topic_access"]:
+        raise _forbidden("team %s is not associated to the topic %s"
+                         % (access["team_name"], access["topic_name"]))
+
+
 @api.route("/certs/verify", methods=["GET"])
 @decorators.login_required
 def verify_repo_access(user):
@@ -51,65 +176,33 @@ def verify_repo_access(user):
             message="requested url is invalid: %s" % url, status_code=403)
 
     product_id, topic_id, component_id = splitpath(url)[:3]
-
-    REMOTECIS = models.REMOTECIS
-    query = sql.select([REMOTECIS]).where(REMOTECIS.c.cert_fp == fp)
-    remoteci = flask.g.db_conn.execute(query)
-
-    if remoteci.rowcount != 1:
-        raise dci_exc.DCIException(
-            message="remoteci fingerprint not found: %s" % fp, status_code=403)
-
-    product = v1_utils.verify_existence_and_get(product_id, models.PRODUCTS)
-    if product["state"] != "active":
+    try:
+        for resource_id in (product_id, topic_id, component_id):
+            uuid.UUID(resource_id)
+    except ValueError:
         raise dci_exc.DCIException(
-            message="product %s/%s is not active" % (product["name"], product["id"]),  # noqa
-            status_code=403)
-
-    topic = v1_utils.verify_existence_and_get(topic_id, models.TOPICS)
-    if topic["state"] != "active":
-        raise dci_exc.DCIException(
-            message="topic %s/%s is not active" % (topic["name"], topic["id"]),
-            status_code=403)
-
-    if str(topic["product_id"]) != str(product_id):
-        raise dci_exc.DCIException(
-            message="topic %s/%s does not belongs to product %s/%s"
-            % (topic["name"], topic["id"], product["name"], product["id"]),
-            status_code=403)
-    component = v1_utils.verify_existence_and_get(component_id, models.COMPONENTS)
-
-    if component["state"] != "active":
-        raise dci_exc.DCIException(
-            message="component %s/%s is not active" % (component["name"], component["id"]),  # noqa
-            status_code=403)
-
-    if str(component["topic_id"]) != str(topic_id):
-        raise dci_exc.DCIException(
-            message="component %s/%s does not belongs to topic %s/%s"
-            % (component["name"], component["id"], topic["name"], topic["id"]),
-            status_code=403)
-
-    team_id = remoteci.fetchone()["team_id"]
-    team = v1_utils.verify_existence_and_get(team_id, models.TEAMS)
-    if team["state"] != "active":
-        raise dci_exc.DCIException(
-            message="team %s/%s is not active" % (team["name"], team["id"]),
-            status_code=403)
-
-    team_ids = [team_id]
-    if not export_control.is_teams_associated_to_product(team_ids, product_id):
-        raise dci_exc.DCIException(
-            message="team %s is not associated to the product %s"
-            % (team["name"], product["name"]),
-            status_code=403)
-
-    if topic["export_control"] is True:
-        return flask.Response(None, 200)
-
-    if not export_control.is_teams_associated_to_topic(team_ids, topic_id):
-        raise dci_exc.DCIException(
-            message="team %s is not associated to the topic %s" % (team["name"], topic["name"]),  # noqa
-            status_code=403)
+            message="requested url is invalid: %s" % url, status_code=403)
 
-    return flask.Response(None, 200)
+    # the decisions are cached, a 403 as well as a 200
+    access_cache = flask.current_app.certs_access_cache
+    cache_key = (fp, product_id, topic_id, component_id)
+    decision = access_cache.get(cache_key)
+    if decision is None:
+        try:
+            _verify_access(fp, product_id, topic_id, component_id)
+            decision = (200, None)
+        except dci_exc.DCIException as e:
+            if e.status_code != 403:
+                raise
+            decision = (403, e.message)
+        access_cache.put(cache_key, decision)
+
+    status_code, message = decision
+    if status_code != 200:
+        raise dci_exc.DCIException(message=message, status_code=status_code)
+
+    ttl = flask.current_app.certs_access_cache.ttl
+    return flask.Response(None, 200, headers={
+        "Cache-Control": "private, max-age=%d" % ttl,
+        "Vary": "SSLFingerprint, X-Original-URI",
+    })
@@ -25,6 +25,7 @@ from sqlalchemy import sql
 from dci import dci_config
 from dci.api.v1 import api
 from dci.api.v1 import base
+from dci.api.v1 import certs
 from dci.api.v1 import export_control
 from dci.api.v1 import issues
 from dci.api.v1 import tags
@@ -100,12 +101,13 @@ def create_components(user):
     if str(values['topic_id']) not in v1_utils.user_topic_ids(user):
         raise dci_exc.Unauthorized()
 
-    query = _TABLE.insert().values(**values)
+    query = _TABLE.insert().returning(*_TABLE.columns).values(**values)
 
     try:
-        flask.g.db_conn.execute(query)
+        component = flask.g.db_conn.execute(query).fetchone()
     except sa_exc.IntegrityError:
         raise dci_exc.DCICreationConflict(_TABLE.name, 'name')
+    add_latest_component(component)
 
     result = json.dumps({'component': values})
     return flask.Response(result, 201, content_type='application/json')
@@ -136,6 +138,8 @@ def update_components(user, c_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('Component', c_id)
+    certs.forget_access_decisions()
+    forget_latest_components(component['topic_id'])
 
     return flask.Response(
         json.dumps({'component': result.fetchone()}), 200,
@@ -148,18 +152,19 @@ def get_all_components(user, topic_id):
 
     args = check_and_get_args(flask.request.args.to_dict())
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _C_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _C_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     query.add_extra_condition(sql.and_(
         _TABLE.c.topic_id == topic_id,
         _TABLE.c.state != 'archived'))
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'components': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'components': rows, '_meta': meta})
 
 
 @api.route('/components/<uuid:c_id>', methods=['GET'])
@@ -191,6 +196,8 @@ def delete_component_by_id(user, c_id):
 
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('Component', c_id)
+    certs.forget_access_decisions()
+    forget_latest_components(component['topic_id'])
 
     return flask.Response(None, 204, content_type='application/json')
 
@@ -208,13 +215,13 @@ def list_components_files(user, c_id):
     query = v1_utils.QueryBuilder(models.COMPONENTFILES, args, _CF_COLUMNS)
     query.add_extra_condition(models.COMPONENTFILES.c.component_id == c_id)
 
-    nb_rows = query.get_number_of_rows(models.COMPONENTFILES,
-                                       models.COMPONENTFILES.c.component_id == c_id)  # noqa
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, models.COMPONENTFILES.name, None, None)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, models.COMPONENTFILES.name, None, None,
+                                  fields=args['fields'])
 
     return flask.jsonify({'component_files': rows,
-                          '_meta': {'count': nb_rows}})
+                          '_meta': meta})
 
 
 @api.route('/components/<uuid:c_id>/files/<uuid:f_id>', methods=['GET'])
@@ -253,12 +260,12 @@ def download_component_file(user, c_id, f_id):
     component_file = v1_utils.verify_existence_and_get(
         f_id, models.COMPONENT_FILES)
     file_path = files_utils.build_file_path(component['topic_id'], c_id, f_id)
-
-    # Check if file exist on the storage engine
-    store.head(file_path)
-
-    _, file_descriptor = store.get(file_path)
-    return flask.send_file(file_descriptor, mimetype=component_file['mime'])
+    return files_utils.send_stored_file(
+        store, file_path,
+        mimetype=component_file['mime'],
+        etag=component_file['md5'] or component_file['etag'],
+        last_modified=component_file['created_at'],
+        size=component_file['size'])
 
 
 @api.route('/components/<uuid:c_id>/files', methods=['POST'])
@@ -277,8 +284,7 @@ def upload_component_file(user, c_id):
                                             c_id,
                                             file_id)
     content = files_utils.get_stream_or_content_from_request(flask.request)
-    store.upload(file_path, content)
-    s_file = store.head(file_path)
+    s_file = store.upload(file_path, content)
 
     values = dict.fromkeys(['md5', 'mime', 'component_id', 'name'])
 
@@ -287,9 +293,9 @@ def upload_component_file(user, c_id):
         'component_id': c_id,
         'name': file_id,
         'created_at': datetime.datetime.utcnow().isoformat(),
-        'md5': s_file['etag'],
-        'mime': s_file['content-type'],
-        'size': s_file['content-length']
+        'md5': s_file['md5'],
+        'mime': 'application/octet-stream',
+        'size': s_file['size']
     })
 
     query = COMPONENT_FILES.insert().values(**values)
@@ -324,34 +330,80 @@ def delete_component_file(user, c_id, f_id):
     return flask.Response(None, 204, content_type='application/json')
 
 
+def _load_latest_components(topic_id, db_conn):
+    topic = db_conn.execute(
+        sql.select([models.TOPICS.c.component_types])
+        .where(models.TOPICS.c.id == topic_id)).fetchone()
+    if topic is None:
+        raise dci_exc.DCINotFound('Topic', topic_id)
+
+    query = (sql.select([_TABLE])
+             .distinct(_TABLE.c.type)
+             .where(sql.and_(_TABLE.c.topic_id == topic_id,
+                             _TABLE.c.state == 'active'))
+             .order_by(_TABLE.c.type, sql.desc(_TABLE.c.created_at)))
+    rows = db_conn.execute(query).fetchall()
+
+    return {
+        'component_types': list(topic['component_types'] or []),
+        'components': dict((row['type'], dict(row)) for row in rows),
+    }
+
+
+def get_latest_components(topic_id, db_conn=None):
+    """Return the component types of a topic and its latest active
+    component of each type.
+
+    Within a request they are kept in the latest components cache, which
+    is updated by the changes of the components and topics.
+    """
+    if db_conn is not None:
+        return _load_latest_components(topic_id, db_conn)
+
+    latest_components_cache = flask.current_app.latest_components_cache
+    topic_id = str(topic_id)
+    latest = latest_components_cache.get(topic_id)
+    if latest is None:
+        latest = _load_latest_components(topic_id, flask.g.db_conn)
+        latest_components_cache.put(topic_id, latest)
+    return latest
+
+
+def add_latest_component(component):
+    """Make a new active component the latest one of its type."""
+    latest_components_cache = flask.current_app.latest_components_cache
+    topic_id = str(component['topic_id'])
+    latest = latest_components_cache.pop(topic_id)
+    if latest is None or component['state'] != 'active':
+        return
+    # the dict is replaced, never modified, for the concurrent readers
+    latest = dict(latest)
+    latest['components'] = dict(latest['components'])
+    latest['components'][component['type']] = dict(component)
+    latest_components_cache.put(topic_id, latest)
+
+
+def forget_latest_components(topic_id):
+    flask.current_app.latest_components_cache.pop(str(topic_id))
+
+
 def get_component_types_from_topic(topic_id, db_conn=None):
     """Returns the component types of a topic."""
-    db_conn = db_conn or flask.g.db_conn
-    query = sql.select([models.TOPICS]).\
-        where(models.TOPICS.c.id == topic_id)
-    topic = db_conn.execute(query).fetchone()
-    topic = dict(topic)
-    return topic['component_types']
+    return get_latest_components(topic_id, db_conn)['component_types']
 
 
 def get_last_components_by_type(component_types, topic_id, db_conn=None):
     """For each component type of a topic, get the last one."""
-    db_conn = db_conn or flask.g.db_conn
+    latest = get_latest_components(topic_id, db_conn)['components']
     _components = []
     for ct in component_types:
-        where_clause = sql.and_(models.COMPONENTS.c.type == ct,
-                                models.COMPONENTS.c.topic_id == topic_id,
-                                models.COMPONENTS.c.state == 'active')  # noqa
-        query = (sql.select([models.COMPONENTS])
-                 .where(where_clause)
-                 .order_by(sql.desc(models.COMPONENTS.c.created_at)))
-        component = db_conn.execute(query).fetchone()
+        component = latest.get(ct)
 
         if component is None:
             msg = 'Component of type "%s" not found or not exported.' % ct
             raise dci_exc.DCIException(msg, status_code=412)
 
-        if component['id'] in _components:
+        if component in _components:
             msg = ('Component types %s malformed: type %s duplicated.' %
                    (component_types, ct))
             raise dci_exc.DCIException(msg, status_code=412)
@@ -359,35 +411,45 @@ def get_last_components_by_type(component_types, topic_id, db_conn=None):
     return _components
 
 
+def get_components_by_ids(components_ids, db_conn=None):
+    """Return the non archived components of the given ids, by id, with
+    one query."""
+    return v1_utils.get_rows_by_ids(_TABLE, components_ids, db_conn)
+
+
 def verify_and_get_components_ids(topic_id, components_ids, component_types,
                                   db_conn=None):
     """Process some verifications of the provided components ids."""
-    db_conn = db_conn or flask.g.db_conn
     if len(components_ids) != len(component_types):
         msg = 'The number of component ids does not match the number ' \
               'of component types %s' % component_types
         raise dci_exc.DCIException(msg, status_code=412)
 
     # get the components from their ids
+    components = get_components_by_ids(components_ids, db_conn)
+    errors = []
     schedule_component_types = set()
     for c_id in components_ids:
-        where_clause = sql.and_(models.COMPONENTS.c.id == c_id,
-                                models.COMPONENTS.c.topic_id == topic_id,
-                                models.COMPONENTS.c.state == 'active')
-        query = (sql.select([models.COMPONENTS])
-                 .where(where_clause))
-        cmpt = db_conn.execute(query).fetchone()
-
-        if cmpt is None:
-            msg = 'Component id %s not found or not exported' % c_id
-            raise dci_exc.DCIException(msg, status_code=412)
-        cmpt = dict(cmpt)
-
-        if cmpt['type'] in schedule_component_types:
-            msg = ('Component types malformed: type %s duplicated.' %
-                   cmpt['type'])
-            raise dci_exc.DCIException(msg, status_code=412)
-        schedule_component_types.add(cmpt['type'])
+        cmpt = components.get(str(c_id))
+        if cmpt is None or cmpt['state'] != 'active':
+            errors.append({'id': c_id, 'error': 'not_found',
+                           'message': 'Component id %s not found or not '
+                                      'exported' % c_id})
+        elif str(cmpt['topic_id']) != str(topic_id):
+            errors.append({'id': c_id, 'error': 'wrong_topic',
+                           'message': 'Component id %s does not belong to '
+                                      'topic %s' % (c_id, topic_id)})
+        elif cmpt['type'] in schedule_component_types:
+            errors.append({'id': c_id, 'error': 'duplicated_type',
+                           'message': 'Component types malformed: type %s '
+                                      'duplicated.' % cmpt['type']})
+        else:
+            schedule_component_types.add(cmpt['type'])
+
+    if errors:
+        raise dci_exc.DCIException(errors[0]['message'],
+                                   payload={'errors': errors},
+                                   status_code=412)
     return components_ids
 
 
@@ -14,7 +14,6 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-from dci.api.v1 import utils as v1_utils
 from dci.common import exceptions as dci_exc
 from dci.db import models
 
@@ -22,20 +21,103 @@ import flask
 from sqlalchemy import sql
 
 
+def _load_team_access(team_id):
+    JPT = models.JOIN_PRODUCTS_TEAMS
+    JTT = models.JOINS_TOPICS_TEAMS
+    q_get_products = sql.select([JPT.c.product_id]).where(
+        JPT.c.team_id == team_id)
+    q_get_topics = sql.select(
+        [JTT.c.topic_id, models.TOPICS.c.state]
+    ).select_from(
+        JTT.join(models.TOPICS, JTT.c.topic_id == models.TOPICS.c.id)
+    ).where(JTT.c.team_id == team_id)
+
+    products = flask.g.db_conn.execute(q_get_products).fetchall()
+    topics = flask.g.db_conn.execute(q_get_topics).fetchall()
+    return {
+        'products': frozenset(str(p['product_id']) for p in products),
+        'topics': frozenset(str(t['topic_id']) for t in topics),
+        'active_topics': frozenset(str(t['topic_id']) for t in topics
+                                   if t['state'] == 'active'),
+    }
+
+
+def get_team_access(team_id):
+    """Return the ids of the products and topics a team is associated to.
+
+    The access of each team is loaded once in the team access cache and
+    updated by the changes of the products and topics teams.
+    """
+    team_access_cache = flask.current_app.team_access_cache
+    team_id = str(team_id)
+    team_access = team_access_cache.get(team_id)
+    if team_access is None:
+        team_access = _load_team_access(team_id)
+        team_access_cache.put(team_id, team_access)
+    return team_access
+
+
+def _update_team_access(team_id, key, resource_id, associated):
+    team_access_cache = flask.current_app.team_access_cache
+    team_id = str(team_id)
+    team_access = team_access_cache.pop(team_id)
+    if team_access is None:
+        return
+    # the sets are replaced, never modified, for the concurrent readers
+    team_access = dict(team_access)
+    if associated:
+        team_access[key] = team_access[key] | {str(resource_id)}
+    else:
+        team_access[key] = team_access[key] - {str(resource_id)}
+    team_access_cache.put(team_id, team_access)
+
+
+def add_product_team(product_id, team_id):
+    _update_team_access(team_id, 'products', product_id, True)
+
+
+def remove_product_team(product_id, team_id):
+    _update_team_access(team_id, 'products', product_id, False)
+
+
+def add_topic_team(topic, team_id):
+    _update_team_access(team_id, 'topics', topic['id'], True)
+    if topic['state'] == 'active':
+        _update_team_access(team_id, 'active_topics', topic['id'], True)
+
+
+def remove_topic_team(topic_id, team_id):
+    _update_team_access(team_id, 'topics', topic_id, False)
+    _update_team_access(team_id, 'active_topics', topic_id, False)
+
+
+def forget_topic(topic_id):
+    """Forget the access of the teams of a topic after a change of its
+    state."""
+    topic_id = str(topic_id)
+    flask.current_app.team_access_cache.discard(
+        lambda team_access: topic_id in team_access['topics'])
+
+
+def get_teams_topic_ids(team_ids):
+    """Return the ids of the active topics associated to the teams."""
+    topic_ids = set()
+    for team_id in team_ids:
+        if team_id is not None:
+            topic_ids.update(get_team_access(team_id)['active_topics'])
+    return list(topic_ids)
+
+
 def is_teams_associated_to_product(team_ids, product_id):
-    q_get_product_team = sql.select([models.JOIN_PRODUCTS_TEAMS]).where(
-        models.JOIN_PRODUCTS_TEAMS.c.team_id.in_(team_ids)
-    )
-    result = flask.g.db_conn.execute(q_get_product_team)
-    return result.rowcount > 0
+    product_id = str(product_id)
+    return any(product_id in get_team_access(team_id)['products']
+               for team_id in team_ids if team_id is not None)
 
 
 def is_teams_associated_to_topic(team_ids, topic_id):
-    q_get_topic__team = sql.select([models.JOINS_TOPICS_TEAMS]).where(
-        models.JOINS_TOPICS_TEAMS.c.team_id.in_(team_ids)
-    )
-    result = flask.g.db_conn.execute(q_get_topic__team)
-    return result.rowcount > 0
+    topic_id = str(topic_id)
+    return any(topic_id in get_team_access(team_id)['topics']
+               for team_id in team_ids if team_id is not None)
 
 
 def has_access_to_topic(user, topic):
@@ -48,10 +130,8 @@ def has_access_to_topic(user, topic):
     :return: True if has_access_to_topic, False otherwise
     """
     if topic["export_control"] is True:
-        product = v1_utils.verify_existence_and_get(
-            topic["product_id"], models.PRODUCTS
-        )
-        return is_teams_associated_to_product(user.teams_ids, product["id"])
+        return is_teams_associated_to_product(user.teams_ids,
+                                              topic["product_id"])
     return is_teams_associated_to_topic(user.teams_ids, topic["id"])
 
 
@@ -34,6 +34,7 @@ from dci.common import signature
 from dci.common import utils
 from dci.db import embeds
 from dci.db import models
+from dci.identity import forget_identity
 
 _TABLE = models.FEEDERS
 _F_COLUMNS = v1_utils.get_columns_name_with_objects(_TABLE)
@@ -85,11 +86,12 @@ def get_all_feeders(user):
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'feeders': rows, '_meta': {'count': len(rows)}})
+    return flask.jsonify({'feeders': rows, '_meta': meta})
 
 
 @api.route('/feeders/<uuid:f_id>', methods=['GET'])
@@ -126,6 +128,7 @@ def put_feeder(user, f_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('Feeder', f_id)
+    forget_identity(f_id)
 
     _result = dict(result.fetchone())
     del _result['api_secret']
@@ -157,6 +160,7 @@ def delete_feeder_by_id(user, f_id):
 
         if not result.rowcount:
             raise dci_exc.DCIDeleteConflict('Feeder', f_id)
+        forget_identity(f_id)
 
     return flask.Response(None, 204, content_type='application/json')
 
@@ -37,6 +37,7 @@ from dci.common.schemas import (
     check_and_get_args
 )
 from dci.common import utils
+from dci.db import blobs
 from dci.db import embeds
 from dci.db import models
 from dci import dci_config
@@ -169,8 +170,7 @@ def create_files(user):
 
     content = files_utils.get_stream_or_content_from_request(flask.request)
     store = dci_config.get_store('files')
-    store.upload(file_path, content)
-    s_file = store.head(file_path)
+    s_file = store.upload(file_path, content)
 
     etag = utils.gen_etag()
     values.update({
@@ -178,13 +178,18 @@ def create_files(user):
         'created_at': datetime.datetime.utcnow().isoformat(),
         'updated_at': datetime.datetime.utcnow().isoformat(),
         'team_id': job['team_id'],
-        'md5': None,
-        'size': s_file['content-length'],
+        'md5': s_file['md5'],
+        'size': s_file['size'],
+        'sha256': None,
         'state': 'active',
         'etag': etag,
     })
 
+    new_blob = None
     with flask.g.db_conn.begin():
+        if dci_config.CONFIG['STORE_FILES_DEDUP']:
+            new_blob = blobs.add_reference(flask.g.db_conn, s_file)
+            values['sha256'] = s_file['sha256']
         q_insert_file = _TABLE.insert().values(**values)
         flask.g.db_conn.execute(q_insert_file)
         result = json.dumps({'file': values})
@@ -193,9 +198,43 @@ def create_files(user):
             _, junit_file = store.get(file_path)
             _process_junit_file(values, junit_file, job)
 
+    # the store only changes once the reference to the blob is committed
+    if new_blob is not None:
+        _store_blob(store, file_path, values, new_blob)
+
     return flask.Response(result, 201, content_type='application/json')
 
 
+def _store_blob(store, file_path, file, new_blob):
+    """Move the uploaded file to the blob of its content, or drop it if the
+    blob is already stored."""
+    if not new_blob:
+        try:
+            store.delete(file_path)
+        except dci_exc.StoreExceptions as e:
+            logger.warn('duplicate file %s not removed: %s'
+                        % (file_path, e.message))
+        return
+
+    try:
+        store.rename(file_path, files_utils.build_blob_path(file['sha256']))
+    except dci_exc.StoreExceptions:
+        # the file has no content, forget it
+        with flask.g.db_conn.begin():
+            flask.g.db_conn.execute(
+                _TABLE.delete().where(_TABLE.c.id == file['id']))
+            blobs.remove_reference(flask.g.db_conn, file['sha256'])
+        raise
+
+
+def get_file_path(file):
+    """Return the path of the content of a file in the files store."""
+    if file['sha256']:
+        return files_utils.build_blob_path(file['sha256'])
+    return files_utils.build_file_path(file['team_id'], file['job_id'],
+                                       file['id'])
+
+
 def get_all_files(user, job_id):
     """Get all files.
     """
@@ -211,11 +250,11 @@ def get_all_files(user, job_id):
     query.add_extra_condition(_TABLE.c.job_id == job_id)
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
-    return json.jsonify({'files': rows, '_meta': {'count': nb_rows}})
+                                  _EMBED_MANY, fields=args['fields'])
+    return json.jsonify({'files': rows, '_meta': meta})
 
 
 @api.route('/files/<uuid:file_id>', methods=['GET'])
@@ -227,9 +266,7 @@ def get_file_by_id(user, file_id):
 
 def get_file_descriptor(file_object):
     store = dci_config.get_store('files')
-    file_path = files_utils.build_file_path(file_object['team_id'],
-                                            file_object['job_id'],
-                                            file_object['id'])
+    file_path = get_file_path(file_object)
     # Check if file exist on the storage engine
     store.head(file_path)
     _, file_descriptor = store.get(file_path)
@@ -247,12 +284,15 @@ def get_file_content(user, file_id):
     if (user.is_not_in_team(file['team_id']) and user.is_not_read_only_user()
         and user.is_not_epm()):
         raise dci_exc.Unauthorized()
-    file_descriptor = get_file_descriptor(file)
-    return flask.send_file(
-        file_descriptor,
+    store = dci_config.get_store('files')
+    file_path = get_file_path(file)
+    return files_utils.send_stored_file(
+        store, file_path,
         mimetype=file['mime'] or 'text/plain',
-        as_attachment=True,
-        attachment_filename=file['name'].replace(' ', '_')
+        attachment_filename=file['name'].replace(' ', '_'),
+        etag=file['md5'] or file['etag'],
+        last_modified=file['created_at'],
+        size=file['size']
     )
 
 
@@ -336,12 +376,33 @@ def upload_certification(user, file_id):
     return flask.Response(None, 204, content_type='application/json')
 
 
+@api.route('/files/dedup', methods=['GET'])
+@decorators.login_required
+def get_files_dedup_report(user):
+    """Report how many files share the same stored contents and the bytes
+    saved."""
+    if user.is_not_super_admin():
+        raise dci_exc.Unauthorized()
+
+    return flask.jsonify({'dedup': blobs.get_report(flask.g.db_conn)})
+
+
 @api.route('/files/purge', methods=['GET'])
 @decorators.login_required
 def get_to_purge_archived_files(user):
     return base.get_to_purge_archived_resources(user, _TABLE)
 
 
+def _delete_blob(store, blob_path):
+    try:
+        store.delete(blob_path)
+    except dci_exc.StoreExceptions as e:
+        # an unreferenced blob is overwritten if its content is uploaded
+        # again
+        logger.error('unused blob %s not removed: %s'
+                     % (blob_path, e.message))
+
+
 @api.route('/files/purge', methods=['POST'])
 @decorators.login_required
 def purge_archived_files(user):
@@ -359,11 +420,18 @@ def purge_archived_files(user):
         try:
             q_delete_file = _TABLE.delete().where(_TABLE.c.id == file['id'])
             flask.g.db_conn.execute(q_delete_file)
-            file_path = files_utils.build_file_path(file['team_id'],
-                                                    file['job_id'],
-                                                    file['id'])
-            store.delete(file_path)
-            tx.commit()
+            file_path = get_file_path(file)
+            if not file['sha256']:
+                store.delete(file_path)
+                tx.commit()
+            else:
+                # the content of a blob is kept while other files use it,
+                # and only deleted once no committed row references it
+                unused_blob = blobs.remove_reference(flask.g.db_conn,
+                                                     file['sha256'])
+                tx.commit()
+                if unused_blob:
+                    _delete_blob(store, file_path)
             logger.debug('file %s removed' % file_path)
         except dci_exc.StoreExceptions as e:
             if e.status_code == 404:
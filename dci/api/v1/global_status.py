@@ -20,7 +20,6 @@ from sqlalchemy import text
 from dci.api.v1 import api
 from dci.api.v1 import components as v1_components
 from dci import decorators
-from dci.dci_config import get_engine
 
 
 def insert_component_with_no_job(components, latest_components):
@@ -78,9 +77,10 @@ def add_percentage_of_success(global_status):
 @api.route('/global_status', methods=['GET'])
 @decorators.login_required
 def get_global_status(user):
-    engine = get_engine()
+    # the latest jobs are maintained in the global_status table, see
+    # dci.db.global_status
     sql = text("""
-SELECT DISTINCT ON (components.id, jobs.remoteci_id)
+SELECT
     jobs.id,
     jobs.status,
     jobs.created_at,
@@ -93,28 +93,26 @@ SELECT DISTINCT ON (components.id, jobs.remoteci_id)
     products.name as product_name,
     remotecis.name as remoteci_name,
     teams.name as team_name
-FROM jobs
-LEFT JOIN remotecis ON jobs.remoteci_id = remotecis.id
-LEFT JOIN teams ON remotecis.team_id = teams.id
+FROM global_status
+JOIN jobs ON global_status.job_id = jobs.id
+JOIN remotecis ON global_status.remoteci_id = remotecis.id
+JOIN teams ON remotecis.team_id = teams.id
+JOIN components ON global_status.component_id = components.id
 LEFT JOIN topics ON jobs.topic_id = topics.id
-LEFT JOIN jobs_components ON jobs.id = jobs_components.job_id
-LEFT JOIN components ON components.id = jobs_components.component_id
 LEFT JOIN products ON topics.product_id = products.id
 WHERE
     teams.external = '1' AND
-    (jobs.status = 'failure' OR jobs.status = 'success') AND
     remotecis.state = 'active' AND
-    components.id IN (SELECT DISTINCT ON (topic_id) id
-                      FROM components
-                      WHERE state = 'active'
-                      ORDER BY topic_id, created_at DESC)
+    global_status.component_id IN (SELECT DISTINCT ON (topic_id) id
+                                   FROM components
+                                   WHERE state = 'active'
+                                   ORDER BY topic_id, created_at DESC)
 ORDER BY
-    components.id,
-    jobs.remoteci_id,
-    jobs.created_at DESC;
+    global_status.component_id,
+    global_status.remoteci_id;
 """)  # noqa
 
-    jobs = engine.execute(sql)
+    jobs = flask.g.db_ro_conn.execute(sql)
     global_status = format_global_status(jobs)
     global_status = insert_component_with_no_job(
         global_status, v1_components._get_latest_components()
@@ -27,6 +27,7 @@ from dci.common.schemas import (
 from dci.common import utils
 from dci.db import models
 from dci import decorators
+from dci.identity import forget_identity
 
 _TABLE = models.USERS
 
@@ -99,6 +100,7 @@ def put_identity(user):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('User', user.id)
+    forget_identity(user.id)
     _result = dict(result.fetchone())
     del _result['password']
 
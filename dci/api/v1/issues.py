@@ -203,11 +203,12 @@ def get_all_issues(user):
 
     query = v1_utils.QueryBuilder(_TABLE, args, _I_COLUMNS)
     query.add_extra_condition(_TABLE.c.state != 'archived')
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, _TABLE.name)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, _TABLE.name,
+                                  fields=args['fields'])
 
-    return flask.jsonify({'issues': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'issues': rows, '_meta': meta})
 
 
 @api.route('/issues/<uuid:issue_id>', methods=['GET'])
@@ -33,6 +33,7 @@ from dci.common import exceptions as dci_exc
 from dci.common.schemas import (
     check_json_is_valid,
     create_job_schema,
+    bulk_create_jobs_schema,
     update_job_schema,
     upgrade_job_schema,
     schedule_job_schema,
@@ -40,7 +41,10 @@ from dci.common.schemas import (
 )
 from dci.common import utils
 from dci.db import embeds
+from dci.db import global_status
+from dci.db import idempotency_keys
 from dci.db import models
+from dci.db import trends
 
 from dci.api.v1 import files
 from dci.api.v1 import export_control
@@ -75,24 +79,29 @@ def get_utc_now():
     return datetime.datetime.utcnow()
 
 
-@api.route('/jobs', methods=['POST'])
-@decorators.login_required
-def create_jobs(user):
-    values = flask.request.json
-    check_json_is_valid(create_job_schema, values)
+def _get_job_values(user, values, topics, previous_jobs, components_by_id):
+    """Return the values of a job to create from a valid request, the
+    resources it refers to being loaded beforehand."""
     values.update(v1_utils.common_values_dict())
-
     components_ids = values.pop('components')
 
-    if user.is_not_remoteci():
-        raise dci_exc.DCIException('Only remoteci can create job')
-
     topic_id = values.get('topic_id')
-    topic = v1_utils.verify_existence_and_get(topic_id, models.TOPICS)
+    topic = topics.get(str(topic_id))
+    if topic is None:
+        raise dci_exc.DCIException('Resource "%s" not found.' % topic_id,
+                                   status_code=404)
     export_control.verify_access_to_topic(user, topic)
     previous_job_id = values.get('previous_job_id')
-    if previous_job_id:
-        v1_utils.verify_existence_and_get(previous_job_id, _TABLE)
+    if previous_job_id and str(previous_job_id) not in previous_jobs:
+        raise dci_exc.DCIException(
+            'Resource "%s" not found.' % previous_job_id, status_code=404)
+
+    missing_ids = [cmpt_id for cmpt_id in components_ids
+                   if str(cmpt_id) not in components_by_id]
+    if missing_ids:
+        raise dci_exc.DCIException(
+            'Resource "%s" not found.' % missing_ids[0],
+            payload={'missing_ids': missing_ids}, status_code=404)
 
     values.update({
         'status': 'new',
@@ -105,26 +114,107 @@ def create_jobs(user):
         'product_id': topic['product_id'],
         'duration': 0
     })
+    return values, components_ids
+
+
+def _get_jobs_resources(jobs_values):
+    """Load the topics, previous jobs and components of the jobs to create
+    with one query each."""
+    topics = v1_utils.get_rows_by_ids(
+        models.TOPICS, [v.get('topic_id') for v in jobs_values])
+    previous_jobs = v1_utils.get_rows_by_ids(
+        _TABLE, [v['previous_job_id'] for v in jobs_values
+                 if v.get('previous_job_id')])
+    components_by_id = components.get_components_by_ids(
+        [c_id for v in jobs_values for c_id in v.get('components', [])])
+    return topics, previous_jobs, components_by_id
+
+
+@api.route('/jobs', methods=['POST'])
+@decorators.login_required
+def create_jobs(user):
+    values = flask.request.json
+    check_json_is_valid(create_job_schema, values)
+
+    if user.is_not_remoteci():
+        raise dci_exc.DCIException('Only remoteci can create job')
+
+    # verify the resources before opening the transaction
+    resources = _get_jobs_resources([values])
+    values, components_ids = _get_job_values(user, values, *resources)
 
     # create the job and feed the jobs_components table
     with flask.g.db_conn.begin():
         query = _TABLE.insert().values(**values)
         flask.g.db_conn.execute(query)
-
-        jobs_components_to_insert = []
-        for cmpt_id in components_ids:
-            v1_utils.verify_existence_and_get(cmpt_id, models.COMPONENTS)
-            jobs_components_to_insert.append({'job_id': values['id'],
-                                              'component_id': cmpt_id})
-        if jobs_components_to_insert:
-            flask.g.db_conn.execute(models.JOIN_JOBS_COMPONENTS.insert(),
-                                    jobs_components_to_insert)
+        _insert_jobs_components(values['id'], components_ids)
 
     return flask.Response(json.dumps({'job': values}), 201,
                           headers={'ETag': values['etag']},
                           content_type='application/json')
 
 
+@api.route('/jobs/bulk', methods=['POST'])
+@decorators.login_required
+def create_jobs_bulk(user):
+    """Create several jobs at once.
+
+    The invalid jobs are reported in the result of their position, the
+    valid ones are all created in one transaction.
+    """
+    values = flask.request.json
+    check_json_is_valid(bulk_create_jobs_schema, values)
+
+    if user.is_not_remoteci():
+        raise dci_exc.DCIException('Only remoteci can create job')
+
+    items = v1_utils.get_bulk_items(values, 'jobs')
+    valid_items = []
+    results = []
+    for item in items:
+        try:
+            check_json_is_valid(create_job_schema, item)
+            valid_items.append(item)
+            results.append(None)
+        except dci_exc.DCIException as e:
+            results.append(e.to_dict())
+
+    resources = _get_jobs_resources(valid_items)
+    jobs_to_insert = []
+    jobs_components = []
+    for i, item in enumerate(items):
+        if results[i] is not None:
+            continue
+        try:
+            job, components_ids = _get_job_values(user, item, *resources)
+        except dci_exc.DCIException as e:
+            results[i] = e.to_dict()
+            continue
+        jobs_to_insert.append(job)
+        jobs_components.extend({'job_id': job['id'], 'component_id': c_id}
+                               for c_id in components_ids)
+        results[i] = {'status_code': 201, 'job': job}
+
+    if jobs_to_insert:
+        with flask.g.db_conn.begin():
+            flask.g.db_conn.execute(_TABLE.insert().values(jobs_to_insert))
+            if jobs_components:
+                flask.g.db_conn.execute(
+                    models.JOIN_JOBS_COMPONENTS.insert().values(
+                        jobs_components))
+
+    return v1_utils.bulk_response('jobs', results)
+
+
+def _insert_jobs_components(job_id, components_ids):
+    """Add the components to a job with one multi-row insert."""
+    if components_ids:
+        flask.g.db_conn.execute(
+            models.JOIN_JOBS_COMPONENTS.insert().values(
+                [{'job_id': job_id, 'component_id': cmpt_id}
+                 for cmpt_id in components_ids]))
+
+
 def _build_job(product_id, topic_id, remoteci, components_ids, values,
                topic_id_secondary=None, previous_job_id=None,
                update_previous_job_id=None):
@@ -155,26 +245,9 @@ def _build_job(product_id, topic_id, remoteci, components_ids, values,
         # create the job
         flask.g.db_conn.execute(_TABLE.insert().values(**values))
 
-        if len(p_schedule_components_ids) > 0:
-            # Adds the components to the jobs using join_jobs_components
-            job_components = [
-                {'job_id': values['id'], 'component_id': sci}
-                for sci in p_schedule_components_ids
-            ]
-
-            flask.g.db_conn.execute(
-                models.JOIN_JOBS_COMPONENTS.insert(), job_components
-            )
-        if len(s_schedule_components_ids) > 0:
-            # Adds the components to the jobs using join_jobs_components
-            job_components = [
-                {'job_id': values['id'], 'component_id': sci}
-                for sci in s_schedule_components_ids
-            ]
-
-            flask.g.db_conn.execute(
-                models.JOIN_JOBS_COMPONENTS.insert(), job_components
-            )
+        _insert_jobs_components(
+            values['id'],
+            p_schedule_components_ids + s_schedule_components_ids)
 
     return values
 
@@ -182,7 +255,8 @@ def _build_job(product_id, topic_id, remoteci, components_ids, values,
 def _get_job(user, job_id, embed=None):
     # build the query thanks to the QueryBuilder class
     args = {'embed': embed}
-    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if (user.is_not_super_admin() and user.is_not_read_only_user()
         and user.is_not_epm()):
@@ -214,6 +288,12 @@ def schedule_jobs(user):
     """
     values = flask.request.json
     check_json_is_valid(schedule_job_schema, values)
+    idempotency_key = flask.request.headers.get('Idempotency-Key')
+    if idempotency_key is not None:
+        if not 0 < len(idempotency_key) <= 255:
+            msg = 'Idempotency-Key must have 1 to 255 characters.'
+            raise dci_exc.DCIException(msg, status_code=400)
+        request_hash = idempotency_keys.get_request_hash(values)
     values.update({
         'id': utils.gen_uuid(),
         'created_at': get_utc_now().isoformat(),
@@ -266,11 +346,31 @@ def schedule_jobs(user):
             raise dci_exc.DCIException(msg, status_code=412)
         export_control.verify_access_to_topic(user, topic_secondary)
 
-    remotecis.kill_existing_jobs(remoteci['id'])
-
     components_ids = values.pop('components_ids')
-    values = _build_job(product_id, topic_id, remoteci, components_ids, values,
-                        topic_id_secondary=topic_id_secondary)
+    ttl = dci_config.CONFIG['IDEMPOTENCY_KEY_TTL']
+    with flask.g.db_conn.begin():
+        idempotency_keys.lock_remoteci(flask.g.db_conn, remoteci['id'])
+        if idempotency_key is not None:
+            job_id = idempotency_keys.get_job_id(
+                flask.g.db_conn, remoteci['id'], idempotency_key,
+                request_hash, ttl)
+            if job_id is not None:
+                query = sql.select([_TABLE]).where(_TABLE.c.id == job_id)
+                job = flask.g.db_conn.execute(query).fetchone()
+                return flask.Response(
+                    json.dumps({'job': job}), 201,
+                    headers={'ETag': job['etag'],
+                             'Idempotent-Replayed': 'true'},
+                    content_type='application/json')
+
+        remotecis.kill_existing_jobs(remoteci['id'])
+        values = _build_job(product_id, topic_id, remoteci, components_ids,
+                            values, topic_id_secondary=topic_id_secondary)
+
+        if idempotency_key is not None:
+            idempotency_keys.save(flask.g.db_conn, remoteci['id'],
+                                  idempotency_key, request_hash,
+                                  values['id'], ttl)
 
     return flask.Response(json.dumps({'job': values}), 201,
                           headers={'ETag': values['etag']},
@@ -394,7 +494,8 @@ def get_all_jobs(user, topic_id=None):
     args = check_and_get_args(flask.request.args.to_dict())
 
     # build the query thanks to the QueryBuilder class
-    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JOBS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     # add extra conditions for filtering
 
@@ -410,12 +511,12 @@ def get_all_jobs(user, topic_id=None):
     # # Get only the non archived jobs
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'jobs': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'jobs': rows, '_meta': meta})
 
 
 @api.route('/jobs/<uuid:job_id>/components', methods=['GET'])
@@ -462,29 +563,35 @@ def update_job_by_id(user, job_id):
     if user.is_not_in_team(job['team_id']) and user.is_not_epm():
         raise dci_exc.Unauthorized()
 
-    # Update jobstate if needed
-    status = values.get('status')
-    if status and job.get('status') != status:
-        jobstates.insert_jobstate(user, {
-            'status': status,
-            'job_id': job_id
-        })
-        if status in models.FINAL_STATUSES:
-            jobs_events.create_event(job_id, status, job['topic_id'])
-
-    where_clause = sql.and_(_TABLE.c.etag == if_match_etag,
-                            _TABLE.c.id == job_id)
-
-    values['etag'] = utils.gen_etag()
-    query = _TABLE.update().returning(*_TABLE.columns).\
-        where(where_clause).values(**values)
+    # the jobstate, the job and its rollups change together
+    with flask.g.db_conn.begin():
+        # Update jobstate if needed
+        status = values.get('status')
+        if status and job.get('status') != status:
+            jobstates.insert_jobstate(user, {
+                'status': status,
+                'job_id': job_id
+            })
+            if status in models.FINAL_STATUSES:
+                jobs_events.create_event(job_id, status, job['topic_id'])
+
+        where_clause = sql.and_(_TABLE.c.etag == if_match_etag,
+                                _TABLE.c.id == job_id)
+
+        values['etag'] = utils.gen_etag()
+        query = _TABLE.update().returning(*_TABLE.columns).\
+            where(where_clause).values(**values)
 
-    result = flask.g.db_conn.execute(query)
-    if not result.rowcount:
-        raise dci_exc.DCIConflict('Job', job_id)
+        result = flask.g.db_conn.execute(query)
+        if not result.rowcount:
+            raise dci_exc.DCIConflict('Job', job_id)
+        updated_job = result.fetchone()
+        if status and job.get('status') != status:
+            global_status.update_job(flask.g.db_conn, job_id)
+            trends.update_job(flask.g.db_conn, job_id)
 
     return flask.Response(
-        json.dumps({'job': result.fetchone()}), 200,
+        json.dumps({'job': updated_job}), 200,
         headers={'ETag': values['etag']},
         content_type='application/json'
     )
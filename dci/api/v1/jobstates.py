@@ -30,10 +30,13 @@ from dci.common import exceptions as dci_exc
 from dci.common.schemas import (
     check_json_is_valid,
     jobstate_schema,
+    bulk_jobstates_schema,
     check_and_get_args
 )
 from dci.common import utils
+from dci.db import global_status
 from dci.db import models
+from dci.db import trends
 
 # associate column names with the corresponding SA Column object
 _TABLE = models.JOBSTATES
@@ -71,18 +74,24 @@ def create_jobstates(user):
         if job['status'] in ['new', 'pre-run']:
             values['status'] = 'error'
 
-    insert_jobstate(user, values)
+    # the jobstate, the job status and its rollups change together
+    with flask.g.db_conn.begin():
+        insert_jobstate(user, values)
 
-    # Update job status
-    job_duration = datetime.datetime.utcnow() - job['created_at']
-    query_update_job = (models.JOBS.update()
-                        .where(
-                            sql.and_(
-                                models.JOBS.c.id == job_id,
-                                models.JOBS.c.status != values.get('status')))
-                        .values(status=values.get('status'),
-                                duration=job_duration.seconds))
-    result = flask.g.db_conn.execute(query_update_job)
+        # Update job status
+        job_duration = datetime.datetime.utcnow() - job['created_at']
+        query_update_job = (models.JOBS.update()
+                            .where(
+                                sql.and_(
+                                    models.JOBS.c.id == job_id,
+                                    models.JOBS.c.status !=
+                                    values.get('status')))
+                            .values(status=values.get('status'),
+                                    duration=job_duration.seconds))
+        result = flask.g.db_conn.execute(query_update_job)
+        if result.rowcount:
+            global_status.update_job(flask.g.db_conn, job_id)
+            trends.update_job(flask.g.db_conn, job_id)
 
     # send notification in case of final jobstate status
     if result.rowcount and values.get('status') in models.FINAL_STATUSES:
@@ -104,6 +113,119 @@ def create_jobstates(user):
     return flask.Response(result, 201, content_type='application/json')
 
 
+@api.route('/jobstates/bulk', methods=['POST'])
+@decorators.login_required
+def create_jobstates_bulk(user):
+    """Create several jobstates at once.
+
+    The invalid jobstates are reported in the result of their position,
+    the valid ones are all created in one transaction. Each job whose
+    status changes is updated, and its final status notified, once for the
+    whole batch.
+    """
+    values = flask.request.json
+    check_json_is_valid(bulk_jobstates_schema, values)
+    items = v1_utils.get_bulk_items(values, 'jobstates')
+
+    results = []
+    for item in items:
+        try:
+            check_json_is_valid(jobstate_schema, item)
+            results.append(None)
+        except dci_exc.DCIException as e:
+            results.append(e.to_dict())
+
+    with flask.g.db_conn.begin():
+        jobs = v1_utils.get_rows_by_ids(
+            models.JOBS,
+            [item['job_id'] for i, item in enumerate(items)
+             if results[i] is None],
+            for_update=True)
+        jobs_statuses = dict((job_id, job['status'])
+                             for job_id, job in jobs.items())
+
+        jobstates_to_insert = []
+        for i, item in enumerate(items):
+            if results[i] is not None:
+                continue
+            job_id = str(item['job_id'])
+            if job_id not in jobs:
+                results[i] = dci_exc.DCIException(
+                    'Resource "%s" not found.' % job_id,
+                    status_code=404).to_dict()
+                continue
+            # same transitions as the jobstates created one by one
+            if item['status'] in ['failure', 'error']:
+                if jobs_statuses[job_id] in ['new', 'pre-run']:
+                    item['status'] = 'error'
+            item.update({
+                'id': utils.gen_uuid(),
+                'created_at': datetime.datetime.utcnow().isoformat()
+            })
+            jobs_statuses[job_id] = item['status']
+            jobstates_to_insert.append(item)
+            results[i] = {'status_code': 201, 'jobstate': item}
+
+        if jobstates_to_insert:
+            flask.g.db_conn.execute(
+                _TABLE.insert().values(jobstates_to_insert))
+
+        # each job is updated once, with the status of its last jobstate
+        updated_jobs = [jobs[job_id]
+                        for job_id, status in jobs_statuses.items()
+                        if status != jobs[job_id]['status']]
+        if updated_jobs:
+            now = datetime.datetime.utcnow()
+            query = (models.JOBS.update()
+                     .where(models.JOBS.c.id == sql.bindparam('_id'))
+                     .values(status=sql.bindparam('_status'),
+                             duration=sql.bindparam('_duration')))
+            flask.g.db_conn.execute(query, [
+                {'_id': job['id'],
+                 '_status': jobs_statuses[str(job['id'])],
+                 '_duration': (now - job['created_at']).seconds}
+                for job in updated_jobs])
+            for job in updated_jobs:
+                global_status.update_job(flask.g.db_conn, job['id'])
+                trends.update_job(flask.g.db_conn, job['id'])
+
+    final_jobs_ids = [
+        job['id'] for job in updated_jobs
+        if jobs_statuses[str(job['id'])] in models.FINAL_STATUSES]
+    if final_jobs_ids:
+        _notify_final_jobs(final_jobs_ids)
+
+    return v1_utils.bulk_response('jobstates', results)
+
+
+def _notify_final_jobs(jobs_ids):
+    """Add the events of the jobs which reached a final status and send the
+    notifications of the failed ones at once."""
+    embeds = ['components', 'topic', 'remoteci', 'results']
+    embeds_many = {'components': True, 'topic': False, 'remoteci': False,
+                   'results': True}
+    query = v1_utils.QueryBuilder(
+        models.JOBS, {'embed': embeds},
+        v1_utils.get_columns_name_with_objects(models.JOBS),
+        embed_many=embeds_many)
+    query.add_extra_condition(models.JOBS.c.id.in_(jobs_ids))
+    rows = query.execute(fetchall=True)
+    jobs = v1_utils.format_result(rows, models.JOBS.name, embeds,
+                                  embeds_many)
+
+    flask.g.db_conn.execute(models.JOBS_EVENTS.insert().values([
+        {'job_id': str(job['id']),
+         'status': job['status'],
+         'topic_id': str(job['topic_id'])} for job in jobs]))
+
+    events = []
+    for job in jobs:
+        if job['status'] in models.FINAL_FAILURE_STATUSES:
+            events.extend(notifications.get_events(job))
+    if events:
+        flask.g.sender.send_json(events)
+
+
 def get_all_jobstates(user, job_id):
     """Get all jobstates.
     """
@@ -114,15 +236,15 @@ def get_all_jobstates(user, job_id):
         if job['team_id'] not in user.teams_ids:
             raise dci_exc.Unauthorized()
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _JS_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _JS_COLUMNS,
+                                  embed_many=_EMBED_MANY)
     query.add_extra_condition(_TABLE.c.job_id == job_id)
 
-    # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
-    return flask.jsonify({'jobstates': rows, '_meta': {'count': nb_rows}})
+                                  _EMBED_MANY, fields=args['fields'])
+    return flask.jsonify({'jobstates': rows, '_meta': meta})
 
 
 @api.route('/jobstates/<uuid:js_id>', methods=['GET'])
@@ -102,7 +102,7 @@ def get_emails(remoteci_id):
     return [email['email'] for email in emails]
 
 
-def dispatcher(job):
+def get_events(job):
 
     events = []
     emails = get_emails(job['remoteci_id'])
@@ -115,5 +115,10 @@ def dispatcher(job):
     if dlrn_event:
         events.append(dlrn_event)
 
+    return events
+
+
+def dispatcher(job):
+    events = get_events(job)
     if events:
         flask.g.sender.send_json(events)
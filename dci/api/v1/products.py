@@ -23,6 +23,8 @@ from sqlalchemy import sql
 from dci import decorators
 from dci.api.v1 import api
 from dci.api.v1 import base
+from dci.api.v1 import certs
+from dci.api.v1 import export_control
 from dci.api.v1 import utils as v1_utils
 from dci.api.v1 import teams
 from dci.common import audits
@@ -95,6 +97,7 @@ def update_product(user, product_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('Product update error', product_id)
+    certs.forget_access_decisions()
 
     return flask.Response(
         json.dumps({'product': result.fetchone()}), 200,
@@ -106,7 +109,8 @@ def update_product(user, product_id):
 @decorators.login_required
 def get_all_products(user):
     args = check_and_get_args(flask.request.args.to_dict())
-    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
@@ -118,14 +122,15 @@ def get_all_products(user):
                                       _T_COLUMNS,
                                       root_join_table=_JPT,
                                       root_join_condition=sql.and_(_JPT.c.product_id == _TABLE.c.id,  # noqa
-                                                                   _JPT.c.team_id.in_(user.teams_ids)))  # noqa
+                                                                   _JPT.c.team_id.in_(user.teams_ids)),  # noqa
+                                      embed_many=_EMBED_MANY)
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'products': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'products': rows, '_meta': meta})
 
 
 @api.route('/products/<uuid:product_id>', methods=['GET'])
@@ -159,6 +164,7 @@ def delete_product_by_id(user, product_id):
     if not result.rowcount:
         raise dci_exc.DCIConflict('Product deletion error',
                                   product_id)
+    certs.forget_access_decisions()
 
     return flask.Response(None, 204, content_type='application/json')
 
@@ -185,6 +191,8 @@ def add_team_to_product(user, product_id):
     except sa_exc.IntegrityError:
         raise dci_exc.DCICreationConflict(models.JOIN_PRODUCTS_TEAMS.name,
                                           'product_id', 'team_id')
+    certs.forget_access_decisions()
+    export_control.add_product_team(product['id'], team_id)
 
     result = json.dumps(values)
     return flask.Response(result, 201, content_type='application/json')
@@ -208,6 +216,8 @@ def delete_team_from_product(user, product_id, team_id):
 
     if not result.rowcount:
         raise dci_exc.DCIConflict('Products_teams', team_id)
+    certs.forget_access_decisions()
+    export_control.remove_product_team(product['id'], team_id)
 
     return flask.Response(None, 204, content_type='application/json')
 
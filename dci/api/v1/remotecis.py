@@ -23,6 +23,7 @@ from OpenSSL import crypto
 
 from dci.api.v1 import api
 from dci.api.v1 import base
+from dci.api.v1 import certs
 from dci.api.v1 import utils as v1_utils
 from dci import dci_config
 from dci import decorators
@@ -38,6 +39,7 @@ from dci.common import signature
 from dci.common import utils
 from dci.db import embeds
 from dci.db import models
+from dci.identity import forget_identity
 
 # associate column names with the corresponding SA Column object
 _TABLE = models.REMOTECIS
@@ -86,7 +88,8 @@ def get_all_remotecis(user, t_id=None):
 
     # build the query thanks to the QueryBuilder class
     query = v1_utils.QueryBuilder(_TABLE, args, _R_COLUMNS,
-                                  ignore_columns=['keys', 'cert_fp'])
+                                  ignore_columns=['keys', 'cert_fp'],
+                                  embed_many=_EMBED_MANY)
 
     if (user.is_not_super_admin() and user.is_not_read_only_user()
         and user.is_not_epm()):
@@ -97,11 +100,12 @@ def get_all_remotecis(user, t_id=None):
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'remotecis': rows, '_meta': {'count': len(rows)}})
+    return flask.jsonify({'remotecis': rows, '_meta': meta})
 
 
 @api.route('/remotecis/<uuid:r_id>', methods=['GET'])
@@ -141,6 +145,8 @@ def put_remoteci(user, r_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('RemoteCI', r_id)
+    forget_identity(r_id)
+    certs.forget_access_decisions()
 
     _result = dict(result.fetchone())
     del _result['api_secret']
@@ -174,6 +180,8 @@ def delete_remoteci_by_id(user, remoteci_id):
 
         if not result.rowcount:
             raise dci_exc.DCIDeleteConflict('RemoteCI', remoteci_id)
+        forget_identity(remoteci_id)
+        certs.forget_access_decisions()
 
         for model in [models.JOBS]:
             query = model.update().where(model.c.remoteci_id == remoteci_id) \
@@ -333,6 +341,7 @@ def update_remoteci_keys(user, r_id):
              .values(**values))
 
     flask.g.db_conn.execute(query)
+    certs.forget_access_decisions()
 
     return flask.Response(
         json.dumps({'keys': keys}), 201,
@@ -14,51 +14,163 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-from cryptography.hazmat.primitives import serialization
+import hashlib
 import json
+import logging
+import threading
+import time
+
+from cryptography.hazmat.primitives import serialization
+import flask
+import jwt
 from jwt.algorithms import RSAAlgorithm
 import requests
 
 from dci import auth
 from dci import dci_config
+from dci.common import cache
 from dci.common import exceptions as dci_exc
 
 
 from jwt import exceptions as jwt_exc
 
-
-def get_latest_public_key(self):
-    sso_url = dci_config.CONFIG.get('SSO_URL')
-    realm = dci_config.CONFIG.get('SSO_REALM')
-    url = "%s/auth/realms/%s/.well-known/openid-configuration" % (sso_url, realm)
-    jwks_uri = requests.get(url).json()["jwks_uri"]
-    jwks = requests.get(jwks_uri).json()["keys"]
-    return RSAAlgorithm.from_jwk(json.dumps(jwks[0])).public_bytes(
-        encoding=serialization.Encoding.PEM,
-        format=serialization.PublicFormat.SubjectPublicKeyInfo,
-    )
+logger = logging.getLogger(__name__)
 
 
-def decode_token_with_latest_public_key(token):
-    """Get the latest public key and decode the JWT token with it. This
-    function is usefull when the SSO server rotated its key."""
+def get_public_keys():
+    """Get the public keys of the SSO server by key id, the first one is
+    also the key of the tokens without key id."""
     conf = dci_config.CONFIG
+    timeout = conf['SSO_REQUEST_TIMEOUT']
+    jwks_uri = conf.get('SSO_JWKS_URI')
+    if not jwks_uri:
+        url = "%s/auth/realms/%s/.well-known/openid-configuration" % (
+            conf['SSO_URL'], conf['SSO_REALM'])
+        jwks_uri = requests.get(url, timeout=timeout).json()["jwks_uri"]
+    jwks = requests.get(jwks_uri, timeout=timeout).json()["keys"]
+
+    public_keys = {}
+    for jwk in jwks:
+        if jwk.get('kty') != 'RSA':
+            continue
+        public_key = RSAAlgorithm.from_jwk(json.dumps(jwk)).public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        public_keys.setdefault(None, public_key)
+        public_keys[jwk.get('kid')] = public_key
+    return public_keys
+
+
+class JWKSCache(object):
+    """The public keys of the SSO server by key id.
+
+    The keys are fetched by one thread at a time when a token is signed with
+    an unknown key id, and in a background thread once they are older than
+    refresh_interval seconds. The key ids still unknown after a fetch are
+    not fetched again during unknown_kid_ttl seconds.
+    """
+
+    def __init__(self, refresh_interval, unknown_kid_ttl,
+                 get_keys=get_public_keys, timer=time.time):
+        self.refresh_interval = refresh_interval
+        self._get_keys = get_keys
+        self._timer = timer
+        self._keys = {}
+        self._refresh_at = None
+        self._generation = 0
+        self._unknown_kids = cache.TTLCache(1024, unknown_kid_ttl,
+                                            timer=timer)
+        self._fetch_lock = threading.Lock()
+
+    def get_key(self, kid):
+        public_key = self._keys.get(kid)
+        if public_key is not None:
+            if self._refresh_at <= self._timer():
+                self._refresh_in_background()
+            return public_key
+        if self._unknown_kids.get(kid) is not None:
+            return None
+
+        generation = self._generation
+        with self._fetch_lock:
+            # the keys may have been fetched while waiting for the lock
+            if self._generation == generation:
+                self._refresh()
+        public_key = self._keys.get(kid)
+        if public_key is None:
+            self._unknown_kids.put(kid, True)
+        return public_key
+
+    def _refresh(self):
+        try:
+            self._keys = self._get_keys()
+            self._generation += 1
+        finally:
+            self._refresh_at = self._timer() + self.refresh_interval
+
+    def _refresh_in_background(self):
+        if not self._fetch_lock.acquire(False):
+            return
+        thread = threading.Thread(target=self._background_refresh)
+        thread.daemon = True
+        try:
+            thread.start()
+        except Exception:
+            self._fetch_lock.release()
+            raise
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        except Exception:
+            logger.exception('Unable to refresh the SSO public keys')
+        finally:
+            self._fetch_lock.release()
+
+
+def _decode_token_with_jwks(token):
     try:
-        latest_public_key = get_latest_public_key()
+        kid = jwt.get_unverified_header(token).get('kid')
+    except jwt_exc.DecodeError:
+        raise dci_exc.DCIException('Invalid JWT token.', status_code=401)
+    try:
+        public_key = flask.current_app.sso_jwks.get_key(kid)
     except Exception as e:
-        raise dci_exc.DCIException('Unable to get last SSO public key: %s' % str(e),  # noqa
-                                    status_code=401)
-    # SSO server didn't update its public key
-    if conf['SSO_PUBLIC_KEY'] == latest_public_key:
-        raise dci_exc.DCIException('Invalid JWT token.', status_code=401)  # noqa
+        raise dci_exc.DCIException(
+            'Unable to get last SSO public key: %s' % str(e), status_code=401)
+    if public_key is None:
+        raise dci_exc.DCIException('Invalid JWT token.', status_code=401)
     try:
-        decoded_token = auth.decode_jwt(token,
-                                        latest_public_key,
-                                        conf['SSO_CLIENT_ID'])
-        conf['SSO_PUBLIC_KEY'] = latest_public_key
-        return decoded_token
+        return auth.decode_jwt(token, public_key,
+                               dci_config.CONFIG['SSO_CLIENT_ID'])
     except (jwt_exc.DecodeError, TypeError):
-        raise dci_exc.DCIException('Invalid JWT token.', status_code=401)  # noqa
+        raise dci_exc.DCIException('Invalid JWT token.', status_code=401)
+
+
+def decode_token(token):
+    """Verify and decode the JWT token with the SSO_PUBLIC_KEY or else with
+    the SSO server key of its key id, the SSO server may have rotated its
+    keys. The decoded tokens are kept until they expire."""
+    conf = dci_config.CONFIG
+    token_cache = flask.current_app.sso_token_cache
+    digest = hashlib.sha256(token.encode('utf-8')).hexdigest()
+    decoded_token = token_cache.get(digest)
+    if decoded_token is not None:
+        return decoded_token
+
+    try:
+        try:
+            decoded_token = auth.decode_jwt(token,
+                                            conf['SSO_PUBLIC_KEY'],
+                                            conf['SSO_CLIENT_ID'])
+        except (jwt_exc.DecodeError, ValueError):
+            decoded_token = _decode_token_with_jwks(token)
     except jwt_exc.ExpiredSignatureError:
-        raise dci_exc.DCIException('JWT token expired, please refresh.',  # noqa
-                                    status_code=401)
+        raise dci_exc.DCIException('JWT token expired, please refresh.',
+                                   status_code=401)
+
+    # exp is optional, the cache ttl caps the lifetime of the entry
+    token_cache.put(digest, decoded_token,
+                    expires_at=decoded_token.get('exp'))
+    return decoded_token
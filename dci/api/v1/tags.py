@@ -104,10 +104,11 @@ def get_tags(user):
     """Get all tags."""
     args = check_and_get_args(flask.request.args.to_dict())
     query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, _TABLE.name)
-    return flask.jsonify({'tags': rows, '_meta': {'count': nb_rows}})
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, _TABLE.name,
+                                  fields=args['fields'])
+    return flask.jsonify({'tags': rows, '_meta': meta})
 
 
 @api.route('/tags/<uuid:tag_id>', methods=['DELETE'])
@@ -20,6 +20,7 @@ from sqlalchemy import sql
 
 from dci.api.v1 import api
 from dci.api.v1 import base
+from dci.api.v1 import certs
 from dci.api.v1 import remotecis
 from dci.api.v1 import tests
 from dci.api.v1 import utils as v1_utils
@@ -35,6 +36,7 @@ from dci.common.schemas import (
 from dci.common import utils
 from dci.db import embeds
 from dci.db import models
+from dci.identity import forget_team_identities
 
 # associate column names with the corresponding SA Column object
 _TABLE = models.TEAMS
@@ -75,19 +77,20 @@ def create_teams(user):
 def get_all_teams(user):
     args = check_and_get_args(flask.request.args.to_dict())
 
-    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                  embed_many=_EMBED_MANY)
 
     if user.is_not_super_admin() and user.is_not_epm():
         query.add_extra_condition(_TABLE.c.id.in_(user.teams_ids))
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'teams': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'teams': rows, '_meta': meta})
 
 
 @api.route('/teams/<uuid:t_id>', methods=['GET'])
@@ -142,6 +145,8 @@ def put_team(user, t_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('Team', t_id)
+    forget_team_identities(t_id)
+    certs.forget_access_decisions()
 
     return flask.Response(
         json.dumps({'team': result.fetchone()}), 200,
@@ -171,6 +176,8 @@ def delete_team_by_id(user, t_id):
 
         if not result.rowcount:
             raise dci_exc.DCIDeleteConflict('Team', t_id)
+        forget_team_identities(t_id)
+        certs.forget_access_decisions()
 
         for model in [models.FILES, models.REMOTECIS,
                       models.USERS, models.JOBS]:
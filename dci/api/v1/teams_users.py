@@ -26,6 +26,7 @@ from dci.common.schemas import (
     check_and_get_args
 )
 from dci.db import models
+from dci.identity import forget_identity
 
 
 @api.route('/teams/<uuid:team_id>/users/<uuid:user_id>', methods=['POST'])
@@ -48,6 +49,7 @@ def add_user_to_team(user, team_id, user_id):
         flask.g.db_conn.execute(query)
     except sa_exc.IntegrityError as e:
         raise dci_exc.DCIException('Adding user to team failed: %s' % str(e))
+    forget_identity(user_id)
 
     return flask.Response(None, 201, content_type='application/json')
 
@@ -69,11 +71,13 @@ def get_users_from_team(user, team_id):
 
     query.add_extra_condition(models.USERS.c.state != 'archived')
 
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     team_users = v1_utils.format_result(rows, models.USERS.name, args['embed'],
-                                        users._EMBED_MANY)
+                                        users._EMBED_MANY,
+                                        fields=args['fields'])
 
-    return flask.jsonify({'users': team_users, '_meta': {'count': len(rows)}})
+    return flask.jsonify({'users': team_users, '_meta': meta})
 
 
 @api.route('/users/<uuid:user_id>/teams', methods=['GET'])
@@ -92,14 +96,14 @@ def get_teams_of_user(user, user_id):
 
     query.add_extra_condition(models.TEAMS.c.state != 'archived')
 
-    # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     users_teams = v1_utils.format_result(rows, models.TEAMS.name,
                                          args['embed'],
-                                         teams._EMBED_MANY)
+                                         teams._EMBED_MANY,
+                                         fields=args['fields'])
 
-    return flask.jsonify({'teams': users_teams, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'teams': users_teams, '_meta': meta})
 
 
 @api.route('/teams/<uuid:team_id>/users/<uuid:user_id>', methods=['DELETE'])
@@ -113,5 +117,6 @@ def remove_user_from_team(user, team_id, user_id):
     query = _JUTR.delete().where(sql.and_(_JUTR.c.user_id == user_id,
                                           _JUTR.c.team_id == team_id))
     flask.g.db_conn.execute(query)
+    forget_identity(user_id)
 
     return flask.Response(None, 204, content_type='application/json')
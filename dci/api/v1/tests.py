@@ -117,12 +117,12 @@ def get_all_tests_by_team(user, team_id):
     query = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
-    rows = v1_utils.format_result(rows, _TABLE.name)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
+    rows = v1_utils.format_result(rows, _TABLE.name,
+                                  fields=args['fields'])
 
-    return flask.jsonify({'tests': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'tests': rows, '_meta': meta})
 
 
 @api.route('/tests', methods=['GET'])
@@ -20,6 +20,7 @@ from sqlalchemy import sql
 
 from dci.api.v1 import api
 from dci.api.v1 import base
+from dci.api.v1 import certs
 from dci.api.v1 import components
 from dci.api.v1 import export_control
 from dci.api.v1 import utils as v1_utils
@@ -101,7 +102,8 @@ def get_all_topics(user):
 
     args = check_and_get_args(flask.request.args.to_dict())
     # if the user is an admin then he can get all the topics
-    q_get_topics = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS)
+    q_get_topics = v1_utils.QueryBuilder(_TABLE, args, _T_COLUMNS,
+                                         embed_many=_EMBED_MANY)
 
     if (user.is_not_super_admin() and user.is_not_read_only_user()
         and user.is_not_epm()):
@@ -118,13 +120,12 @@ def get_all_topics(user):
 
     q_get_topics.add_extra_condition(_TABLE.c.state != 'archived')
 
-    # get the number of rows for the '_meta' section
-    nb_rows = q_get_topics.get_number_of_rows()
-    rows = q_get_topics.execute(fetchall=True)
+    rows = q_get_topics.execute(fetchall=True, with_count=True)
+    meta = q_get_topics.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'topics': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'topics': rows, '_meta': meta})
 
 
 @api.route('/topics/<uuid:topic_id>', methods=['PUT'])
@@ -149,6 +150,9 @@ def put_topic(user, topic_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('Topic', topic_id)
+    certs.forget_access_decisions()
+    export_control.forget_topic(topic_id)
+    components.forget_latest_components(topic_id)
 
     return flask.Response(
         json.dumps({'topic': result.fetchone()}), 200,
@@ -174,6 +178,9 @@ def delete_topic_by_id(user, topic_id):
 
         if not result.rowcount:
             raise dci_exc.DCIDeleteConflict('Topic', topic_id)
+        certs.forget_access_decisions()
+        export_control.forget_topic(topic_id)
+        components.forget_latest_components(topic_id)
 
         query = models.COMPONENTS.update().where(
             models.COMPONENTS.c.topic_id == topic_id).values(**values)
@@ -214,6 +221,8 @@ def add_team_to_topic(user, topic_id):
     except sa_exc.IntegrityError:
         raise dci_exc.DCICreationConflict(models.JOINS_TOPICS_TEAMS.name,
                                           'team_id, topic_id')
+    certs.forget_access_decisions()
+    export_control.add_topic_team(topic, team_id)
 
     result = json.dumps(values)
     return flask.Response(result, 201, content_type='application/json')
@@ -237,6 +246,8 @@ def delete_team_from_topic(user, topic_id, team_id):
 
     if not result.rowcount:
         raise dci_exc.DCIConflict('Topics_teams', team_id)
+    certs.forget_access_decisions()
+    export_control.remove_topic_team(topic['id'], team_id)
 
     return flask.Response(None, 204, content_type='application/json')
 
@@ -20,35 +20,16 @@ from sqlalchemy import text
 
 from dci.api.v1 import api
 from dci import decorators
-from dci.dci_config import get_engine
+from dci.common.schemas import check_json_is_valid, trends_args_schema
 
 
-def get_timestamp_of_the_day(datetime_object):
-    midnight = datetime_object.replace(
-        hour=0,
-        minute=0,
-        second=0,
-        microsecond=0
-    )
-    return calendar.timegm(midnight.timetuple())
-
-
-def get_trends_from_jobs(jobs):
-    trends = dict()
-    for job in jobs:
-        topic_id = str(job['topic_id'])
-        timestamp = get_timestamp_of_the_day(job['created_at'])
-        trend = trends.get(topic_id, {})
-        stats = trend.get(timestamp, {'success': 0, 'failure': 0})
-        stats[job['status']] += 1
-        trend[timestamp] = stats
-        trends[topic_id] = trend
-
+def get_trends_from_days(days):
     results = dict()
-    for topic_id, stats in trends.items():
+    for day in days:
+        topic_id = str(day['topic_id'])
+        timestamp = calendar.timegm(day['day'].timetuple())
         result = results.get(topic_id, [])
-        for timestamp, stat in stats.items():
-            result.append([int(timestamp), stat['success'], stat['failure']])
+        result.append([timestamp, day['success'], day['failure']])
         results[topic_id] = result
     return results
 
@@ -56,20 +37,44 @@ def get_trends_from_jobs(jobs):
 @api.route('/trends/topics', methods=['GET'])
 @decorators.login_required
 def get_trends_of_topics(user):
-    engine = get_engine()
+    args = flask.request.args.to_dict()
+    check_json_is_valid(trends_args_schema, args)
+
+    conditions = ''
+    jobs_conditions = ''
+    if 'since' in args:
+        conditions += ' AND trends.day >= :since'
+        jobs_conditions += ' AND CAST(jobs.created_at AS DATE) >= :since'
+    if 'until' in args:
+        conditions += ' AND trends.day <= :until'
+        jobs_conditions += ' AND CAST(jobs.created_at AS DATE) <= :until'
+
+    # the days are counted in the trends table, see dci.db.trends, but the
+    # ones of the jobs without topic
     sql = text("""
-SELECT jobs.id,
-    jobs.status,
-    jobs.created_at,
-    jobs.topic_id
+SELECT trends.topic_id,
+    trends.day,
+    CAST(SUM(trends.success) AS INTEGER) AS success,
+    CAST(SUM(trends.failure) AS INTEGER) AS failure
+FROM trends
+JOIN teams ON trends.team_id = teams.id
+WHERE
+    teams.external = true %s
+GROUP BY trends.topic_id, trends.day
+UNION ALL
+SELECT NULL,
+    CAST(jobs.created_at AS DATE) AS day,
+    CAST(COUNT(*) FILTER (WHERE jobs.status = 'success') AS INTEGER),
+    CAST(COUNT(*) FILTER (WHERE jobs.status = 'failure') AS INTEGER)
 FROM jobs
-LEFT JOIN teams ON jobs.team_id = teams.id
-LEFT JOIN topics ON jobs.topic_id = topics.id
+JOIN teams ON jobs.team_id = teams.id
 WHERE
+    jobs.topic_id IS NULL AND
     (jobs.status = 'failure' OR jobs.status = 'success') AND
-    teams.external = true
-ORDER BY jobs.created_at DESC;
-    """)  # noqa
+    teams.external = true %s
+GROUP BY day
+ORDER BY topic_id, day;
+    """ % (conditions, jobs_conditions))  # noqa
 
-    jobs = engine.execute(sql)
-    return flask.jsonify({'topics': get_trends_from_jobs(jobs)})
+    days = flask.g.db_ro_conn.execute(sql, **args)
+    return flask.jsonify({'topics': get_trends_from_days(days)})
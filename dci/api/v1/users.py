@@ -27,6 +27,7 @@ from dci.common import exceptions as dci_exc
 from dci.common import utils
 from dci.db import embeds
 from dci.db import models
+from dci.identity import forget_identity
 from dci.common.schemas import (
     check_json_is_valid,
     create_user_schema,
@@ -99,20 +100,20 @@ def create_users(user):
 @decorators.login_required
 def get_all_users(user):
     args = check_and_get_args(flask.request.args.to_dict())
-    query = v1_utils.QueryBuilder(_TABLE, args, _USERS_COLUMNS, ['password'])
+    query = v1_utils.QueryBuilder(_TABLE, args, _USERS_COLUMNS, ['password'],
+                                  embed_many=_EMBED_MANY)
 
     if user.is_not_super_admin() and user.is_not_epm():
         query.add_extra_condition(_TABLE.c.team_id.in_(user.teams_ids))
 
     query.add_extra_condition(_TABLE.c.state != 'archived')
 
-    # get the number of rows for the '_meta' section
-    nb_rows = query.get_number_of_rows()
-    rows = query.execute(fetchall=True)
+    rows = query.execute(fetchall=True, with_count=True)
+    meta = query.get_meta(rows)
     rows = v1_utils.format_result(rows, _TABLE.name, args['embed'],
-                                  _EMBED_MANY)
+                                  _EMBED_MANY, fields=args['fields'])
 
-    return flask.jsonify({'users': rows, '_meta': {'count': nb_rows}})
+    return flask.jsonify({'users': rows, '_meta': meta})
 
 
 def user_by_id(user, user_id):
@@ -169,6 +170,7 @@ def put_current_user(user):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('User', user.id)
+    forget_identity(user.id)
     _result = dict(result.fetchone())
     del _result['password']
 
@@ -204,6 +206,7 @@ def put_user(user, user_id):
     result = flask.g.db_conn.execute(query)
     if not result.rowcount:
         raise dci_exc.DCIConflict('User', user_id)
+    forget_identity(user_id)
 
     _result = dict(result.fetchone())
     del _result['password']
@@ -236,6 +239,7 @@ def delete_user_by_id(user, user_id):
 
     if not result.rowcount:
         raise dci_exc.DCIDeleteConflict('User', user_id)
+    forget_identity(user_id)
 
     return flask.Response(None, 204, content_type='application/json')
 
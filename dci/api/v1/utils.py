@@ -14,12 +14,24 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import base64
 import datetime
 import flask
+import json
+import operator
+from six.moves.urllib.parse import urlencode
+import sqlalchemy as sa
 from sqlalchemy import sql, func
+from sqlalchemy.dialects import postgresql as pg
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import visitors
+from sqlalchemy.sql.expression import (BindParameter, ClauseElement,
+                                       ColumnClause, Executable)
 import uuid
 from OpenSSL import crypto
 
+from dci.api.v1 import export_control
+from dci import dci_config
 from dci.common import exceptions as dci_exc
 from dci.common import utils
 from dci.db import models
@@ -118,6 +130,30 @@ def verify_existence_and_get(id, table, name=None, get_id=False, _raise=True):
     return result
 
 
+def get_rows_by_ids(table, ids, db_conn=None, for_update=False):
+    """Return the non archived rows of the given ids, by id, with one
+    query. The ids which are not valid uuids are ignored.
+    """
+    db_conn = db_conn or flask.g.db_conn
+    valid_ids = set()
+    for _id in ids:
+        try:
+            valid_ids.add(uuid.UUID(str(_id)))
+        except ValueError:
+            pass
+    if not valid_ids:
+        return {}
+
+    where_clause = table.c.id.in_(list(valid_ids))
+    if 'state' in table.columns:
+        where_clause = sql.and_(table.c.state != 'archived', where_clause)
+    query = sql.select([table]).where(where_clause)
+    if for_update:
+        query = query.with_for_update()
+    return dict((str(row['id']), dict(row))
+                for row in db_conn.execute(query))
+
+
 def user_topic_ids(user):
     """Retrieve the list of topics IDs a user has access to."""
 
@@ -128,16 +164,10 @@ def user_topic_ids(user):
         or user.is_feeder()
     ):
         query = sql.select([models.TOPICS])
-    else:
-        query = (sql.select([models.JOINS_TOPICS_TEAMS.c.topic_id])
-                 .select_from(
-                     models.JOINS_TOPICS_TEAMS.join(
-                         models.TOPICS, sql.and_(models.JOINS_TOPICS_TEAMS.c.topic_id == models.TOPICS.c.id,  # noqa
-                                                 models.TOPICS.c.state == 'active'))  # noqa
-                  ).where(models.JOINS_TOPICS_TEAMS.c.team_id.in_(user.teams_ids)))  # noqa
+        rows = flask.g.db_conn.execute(query).fetchall()
+        return [str(row[0]) for row in rows]
 
-    rows = flask.g.db_conn.execute(query).fetchall()
-    return [str(row[0]) for row in rows]
+    return export_control.get_teams_topic_ids(user.teams_ids)
 
 
 def get_columns_name_with_objects(table, table_prefix=False):
@@ -250,6 +280,119 @@ def add_where_to_query(query, where_list):
     return query
 
 
+# column types usable as keyset pagination keys, their values are ordered
+# the same way by python and postgresql
+_KEYSET_TYPES = (sa.DateTime, sa.Integer, pg.UUID)
+
+
+def encode_cursor(values):
+    cursor = json.dumps(values, cls=utils.JSONEncoder).encode('utf8')
+    return base64.urlsafe_b64encode(cursor).decode('utf8').rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Decode a cursor into the values of the given keyset columns."""
+    try:
+        raw_cursor = cursor.encode('utf8')
+        raw_cursor += b'=' * (-len(raw_cursor) % 4)
+        values = json.loads(
+            base64.urlsafe_b64decode(raw_cursor).decode('utf8'))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError()
+        return [_parse_cursor_value(value, column)
+                for value, column in zip(values, columns)]
+    except (TypeError, ValueError):
+        raise dci_exc.DCIException('Invalid cursor: "%s"' % cursor)
+
+
+def _parse_cursor_value(value, column):
+    if isinstance(column.type, sa.DateTime):
+        for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'):
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+        raise ValueError()
+    elif isinstance(column.type, sa.Integer):
+        return int(value)
+    return str(uuid.UUID(value))
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN statement of a query, the plan is returned as json."""
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, 'postgresql')
+def _compile_explain(element, compiler, **kw):
+    return 'EXPLAIN (FORMAT JSON) %s' % compiler.process(element.statement,
+                                                         **kw)
+
+
+# label of the window function counting the rows of a list query
+_COUNT_LABEL = 'dci_total_count'
+
+# the limit and offset of a query are parameters so that its compiled form
+# can be reused with other values
+_LIMIT_PARAM = sql.bindparam('dci_limit', type_=sa.Integer)
+_OFFSET_PARAM = sql.bindparam('dci_offset', type_=sa.Integer)
+
+# label of the root id in the queries loading the select-in embeds and the
+# maximum number of root ids given to one of them
+_PARENT_ID_LABEL = 'dci_parent_id'
+_SELECT_IN_BATCH_SIZE = 500
+
+
+def clause_shape(clauses):
+    """Return the structure of the given clauses, regardless of the values
+    they compare to, and their bound parameters in traversal order."""
+    shape = []
+    binds = []
+    for clause in clauses:
+        for elem in visitors.iterate(clause, {}):
+            if isinstance(elem, BindParameter):
+                binds.append(elem)
+                shape.append(('bindparam', type(elem.type)))
+            elif isinstance(elem, ColumnClause):
+                table = getattr(elem.table, 'name', None)
+                shape.append(('column', table, elem.name))
+            else:
+                shape.append((elem.__visit_name__,
+                              getattr(elem, 'operator', None),
+                              getattr(elem, 'modifier', None),
+                              getattr(elem, 'name', None),
+                              getattr(elem, 'text', None)))
+    return tuple(shape), binds
+
+
+def keyset_condition(keyset, values):
+    """Build the condition selecting the rows located after the given
+    values according to the keyset (column, descending) ordering."""
+    if len(set(descending for _, descending in keyset)) == 1:
+        # a row comparison can use a multi-column index
+        columns = sql.tuple_(*[column for column, _ in keyset])
+        if keyset[0][1]:
+            return columns < sql.tuple_(*values)
+        return columns > sql.tuple_(*values)
+
+    conditions = []
+    for i, (column, descending) in enumerate(keyset):
+        equalities = [c == v for (c, _), v in zip(keyset[:i], values[:i])]
+        if descending:
+            conditions.append(sql.and_(*(equalities + [column < values[i]])))
+        else:
+            conditions.append(sql.and_(*(equalities + [column > values[i]])))
+    return sql.or_(*conditions)
+
+
+def _get_columns(select_elem):
+    if isinstance(select_elem, list):
+        return select_elem
+    return list(select_elem.columns)
+
+
 def request_wants_html():
     best = (flask.request.accept_mimetypes
             .best_match(['text/html', 'application/json']))
@@ -262,21 +405,115 @@ def request_wants_html():
 class QueryBuilder(object):
 
     def __init__(self, root_table, args={}, strings_to_columns={},
-                 ignore_columns=None, root_join_table=None, root_join_condition=None):  # noqa
+                 ignore_columns=None, root_join_table=None, root_join_condition=None,  # noqa
+                 embed_many=None):
         self._root_table = root_table
         self._root_join_table = root_join_table
         self._root_join_condition = root_join_condition
         self._embeds = args.get('embed', [])
         self._limit = args.get('limit', None)
         self._offset = args.get('offset', None)
+        self._cursor = args.get('cursor', None)
+        self._count = args.get('count', None)
+        self._window_count = None
         self._sort = self._get_sort_query_with_embeds(args.get('sort', []),
                                                       root_table.name,
                                                       strings_to_columns)
+        self._keyset = self._get_keyset(args.get('sort', []),
+                                        strings_to_columns)
+        if self._keyset is not None and self._limit:
+            # the id is the tie-breaker between the rows of a page
+            if self._keyset[-1][0] is not self._root_table.c.id:
+                self._keyset.append((self._root_table.c.id,
+                                     self._keyset[-1][1]))
+                sort_order = sql.desc if self._keyset[-1][1] else sql.asc
+                self._sort.append(sort_order(self._root_table.c.id))
+        if self._cursor:
+            if self._offset is not None or not self._limit:
+                raise dci_exc.DCIException(
+                    'cursor requires limit and excludes offset')
+            if self._keyset is None:
+                raise dci_exc.DCIException(
+                    'Cursor pagination requires sorting on non nullable '
+                    'date, integer or uuid columns of %s' % root_table.name)
+            self._cursor_condition = keyset_condition(
+                self._keyset,
+                decode_cursor(self._cursor,
+                              [column for column, _ in self._keyset]))
         self._where = where_query(args.get('where', []), self._root_table,
                                   strings_to_columns)
         self._strings_to_columns = strings_to_columns
         self._extras_conditions = []
         self._ignored_columns = ignore_columns or []
+        self._embed_many = embed_many or {}
+        # embeds filtered or sorted on must be joined to the root query
+        self._embeds_in_conditions = set(
+            elem.split(':', 1)[0].split('.')[0].strip(' -')
+            for elem in args.get('where', []) + args.get('sort', [])
+            if '.' in elem.split(':', 1)[0])
+        self._select_in_embeds = []
+        self._fields = args.get('fields') or []
+        self._embed_fields = {}
+        if self._fields:
+            self._ignored_columns = (self._ignored_columns +
+                                     self._parse_fields())
+
+    def _parse_fields(self):
+        """Validate the requested fields, keep the ones of the embeds and
+        return the root columns which are not needed by the query."""
+        root_valid_fields = [name for name in self._strings_to_columns
+                             if name not in self._ignored_columns]
+        embed_objects = embeds.EMBED_STRING_TO_OBJECT.get(
+            self._root_table.name, {})
+        root_fields = []
+        for field in self._fields:
+            if '.' in field:
+                embed_elem, name = field.rsplit('.', 1)
+                valid_fields = []
+                if embed_elem in self._embeds and embed_elem in embed_objects:
+                    valid_fields = [column.name for column in
+                                    _get_columns(embed_objects[embed_elem])]
+                if name not in valid_fields:
+                    raise dci_exc.DCIException(
+                        'Invalid field: "%s"' % field,
+                        payload={'Valid fields': [
+                            '%s.%s' % (embed_elem, f) for f in valid_fields]})
+                self._embed_fields.setdefault(embed_elem, []).append(name)
+            elif field in root_valid_fields:
+                root_fields.append(field)
+            else:
+                raise dci_exc.DCIException(
+                    'Invalid field: "%s"' % field,
+                    payload={'Valid fields': sorted(root_valid_fields)})
+        if not root_fields:
+            return []
+        # the query itself needs the root columns used to sort, paginate
+        # and join the embeds, all the join conditions are built against
+        # the root subquery
+        needed_columns = set(root_fields + ['id'])
+        clauses = list(self._sort)
+        if self._keyset is not None:
+            clauses.extend(column for column, _ in self._keyset)
+        embed_joins = embeds.EMBED_JOINS.get(self._root_table.name)
+        if embed_joins is not None:
+            for params in embed_joins(self._root_table).values():
+                clauses.extend(param['onclause'] for param in params)
+        for clause in clauses:
+            for elem in visitors.iterate(clause, {}):
+                if (isinstance(elem, ColumnClause) and
+                        elem.table is self._root_table):
+                    needed_columns.add(elem.name)
+        return [name for name in root_valid_fields
+                if name not in root_fields and
+                self._strings_to_columns[name].name not in needed_columns]
+
+    def _get_embed_columns(self, embed_elem):
+        select_elem = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name][embed_elem]  # noqa
+        columns = _get_columns(select_elem)
+        if embed_elem in self._embed_fields:
+            fields = self._embed_fields[embed_elem] + ['id']
+            columns = [column for column in columns if column.name in fields]
+        return columns
 
     def _get_sort_query_with_embeds(self, args_sort, root_table_name, strings_to_columns):  # noqa
         # add embeds field for the sorting
@@ -291,6 +528,20 @@ class QueryBuilder(object):
                         get_columns_name_with_objects(embed_elem, table_prefix=True))  # noqa
         return sort_query(args_sort, strings_to_columns, strings_to_columns_with_embeds)  # noqa
 
+    def _get_keyset(self, args_sort, strings_to_columns):
+        """Return the (column, descending) list the root rows are sorted
+        by or None if it can't be used for keyset pagination."""
+        if not strings_to_columns:
+            return None
+        keyset = []
+        for sort_elem in args_sort or ['-created_at']:
+            column = strings_to_columns.get(sort_elem.strip(' -'))
+            if (column is None or column.nullable or
+                    not isinstance(column.type, _KEYSET_TYPES)):
+                return None
+            keyset.append((column, sort_elem.startswith('-')))
+        return keyset
+
     def add_extra_condition(self, condition):
         self._extras_conditions.append(condition)
 
@@ -313,10 +564,15 @@ class QueryBuilder(object):
             query = query.where(e_c)
         return query
 
-    def _do_subquery(self):
+    def _add_cursor_to_query(self, query):
+        if self._cursor:
+            query = query.where(self._cursor_condition)
+        return query
+
+    def _do_subquery(self, embed_list):
         # if embed with limit or offset requested then we will use a subquery
         # for the root table
-        return self._embeds and (self._limit or self._offset)
+        return embed_list and (self._limit or self._offset)
 
     def _get_embed_list(self, embed_joins):
         valid_embed = embed_joins.keys()
@@ -333,19 +589,55 @@ class QueryBuilder(object):
             embed_list.append(embed_elem)
         return sorted(set(embed_list))
 
-    def get_query(self, use_labels=True):
+    def _get_select_in_embeds(self, embed_joins, embed_list):
+        """Return the one-to-many embeds loaded by a separate query instead
+        of a join which would multiply the root rows."""
+        if flask.current_app.config['EMBED_LOADING'] != 'selectin':
+            return []
+        select_in_embeds = []
+        for embed_elem in embed_list:
+            if (self._embed_many.get(embed_elem) and
+                    embed_elem not in self._embeds_in_conditions and
+                    all(param.get('isouter', False)
+                        for param in embed_joins[embed_elem]) and
+                    not any(e.startswith(embed_elem + '.')
+                            for e in embed_list)):
+                select_in_embeds.append(embed_elem)
+        return select_in_embeds
+
+    def _do_window_count(self, with_count):
+        # the window counts the rows before the limit is applied, the cursor
+        # condition would restrict it to the next pages. Only the exact
+        # count uses it.
+        return bool(with_count and self._limit and not self._cursor and
+                    self._get_count_mode() == 'exact')
+
+    def get_query(self, use_labels=True, with_count=False):
+        embed_list = []
+        if self._embeds:
+            embed_joins = embeds.EMBED_JOINS.get(self._root_table.name)(self._root_table)  # noqa
+            embed_list = self._get_embed_list(embed_joins)
+            self._select_in_embeds = self._get_select_in_embeds(embed_joins,
+                                                                embed_list)
+            embed_list = [e for e in embed_list
+                          if e not in self._select_in_embeds]
+
         select_clause = [self._root_table]
         if self._ignored_columns:
             select_clause = self._filtered_root_columns()
         root_select = self._root_table
-        if self._do_subquery():
+        window_count = func.count().over().label(_COUNT_LABEL)
+        if self._do_subquery(embed_list):
+            if self._do_window_count(with_count):
+                select_clause = select_clause + [window_count]
             root_subquery = sql.select(select_clause)
             root_subquery = self._add_where_to_query(root_subquery)
+            root_subquery = self._add_cursor_to_query(root_subquery)
             root_subquery = self._add_sort_to_query(root_subquery)
             if self._limit:
-                root_subquery = root_subquery.limit(self._limit)
+                root_subquery = root_subquery.limit(_LIMIT_PARAM)
             if self._offset:
-                root_subquery = root_subquery.offset(self._offset)
+                root_subquery = root_subquery.offset(_OFFSET_PARAM)
             root_subquery = root_subquery.alias(self._root_table.name)
             select_clause = [root_subquery]
             root_select = root_subquery
@@ -357,64 +649,279 @@ class QueryBuilder(object):
             select_clause.append(self._root_join_table)
 
         query = sql.select(select_clause, use_labels=use_labels, from_obj=children)  # noqa
+        embed_sorts = []
         if self._embeds:
             embed_joins = embeds.EMBED_JOINS.get(self._root_table.name)(root_select)  # noqa
-            embed_list = self._get_embed_list(embed_joins)
-            embed_sorts = []
             for embed_elem in embed_list:
                 for param in embed_joins[embed_elem]:
                     children = children.join(param['right'], param['onclause'],
                                              param.get('isouter', False))
                     if param.get('sort', None) is not None:
                         embed_sorts.append(param.get('sort'))
-                select_elem = embeds.EMBED_STRING_TO_OBJECT[self._root_table.name][embed_elem]  # noqa
-                if isinstance(select_elem, list):
-                    select_clause.extend(select_elem)
-                else:
-                    select_clause.append(select_elem)
+                select_clause.extend(self._get_embed_columns(embed_elem))
             query = sql.select(select_clause, use_labels=True, from_obj=children)  # noqa
 
-        if self._embeds:
-            for embed_sort in embed_sorts:
-                query = query.order_by(embed_sort)
+        for embed_sort in embed_sorts:
+            query = query.order_by(embed_sort)
 
-        if not self._do_subquery():
+        if not self._do_subquery(embed_list):
+            if self._do_window_count(with_count):
+                query = query.column(window_count)
             query = self._add_where_to_query(query)
+            query = self._add_cursor_to_query(query)
 
             if self._limit:
-                query = query.limit(self._limit)
+                query = query.limit(_LIMIT_PARAM)
             if self._offset:
-                query = query.offset(self._offset)
+                query = query.offset(_OFFSET_PARAM)
         query = self._add_sort_to_query(query)
         return query
 
-    def get_number_of_rows(self, root_table=None, where=None):
-        if root_table is not None:
-            query = sql.select([func.count(root_table.c.id)])
-            query = query.where(where)
-        else:
-            query = sql.select([func.count(self._root_table.c.id)])
-            query = self._add_where_to_query(query)
-        return flask.g.db_conn.execute(query).scalar()
+    def get_number_of_rows(self):
+        query = sql.select([func.count(self._root_table.c.id)])
+        query = self._add_where_to_query(query)
+        return flask.g.db_ro_conn.execute(query).scalar()
 
-    def execute(self, fetchall=False, fetchone=False, use_labels=True):
+    def get_estimated_number_of_rows(self):
+        """Return the number of rows estimated by the query planner."""
+        query = sql.select([self._root_table.c.id])
+        query = self._add_where_to_query(query)
+        plan = flask.g.db_ro_conn.execute(Explain(query)).scalar()
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def execute(self, fetchall=False, fetchone=False, use_labels=True,
+                with_count=False):
         """
         :param fetchall: get all rows
         :param fetchone:  get only one row
         :param use_labels: prefix row columns names by the table name
+        :param with_count: count the rows in the same statement for get_meta
         :return:
         """
-        query = self.get_query(use_labels=use_labels)
+        query, params = self._get_compiled_query(use_labels, with_count)
         if fetchall:
-            return flask.g.db_conn.execute(query).fetchall()
+            rows = flask.g.db_ro_conn.execute(query, params).fetchall()
+            if with_count:
+                rows = self._pop_window_count(rows)
+            if self._select_in_embeds:
+                rows = self._add_select_in_embeds(rows)
+            return rows
         elif fetchone:
-            return flask.g.db_conn.execute(query).fetchone()
+            return flask.g.db_ro_conn.execute(query, params).fetchone()
+
+    def _get_compiled_query(self, use_labels, with_count):
+        """Return the compiled query and its parameters, the compiled query
+        is shared by the requests of the same shape."""
+        conditions = self._where + self._extras_conditions
+        if self._cursor:
+            conditions = conditions + [self._cursor_condition]
+        if self._root_join_condition is not None:
+            conditions = conditions + [self._root_join_condition]
+        conditions_shape, binds = clause_shape(conditions)
+        params = {_LIMIT_PARAM.key: self._limit,
+                  _OFFSET_PARAM.key: self._offset}
+
+        dialect = flask.g.db_ro_conn.dialect
+        config = flask.current_app.config
+        key = (dialect.name,
+               self._root_table.name,
+               tuple(self._embeds),
+               tuple(sorted(e for e, many in self._embed_many.items()
+                            if many)),
+               config['EMBED_LOADING'],
+               clause_shape(self._sort)[0],
+               clause_shape(self._filtered_root_columns())[0]
+               if self._ignored_columns else None,
+               getattr(self._root_join_table, 'name', None),
+               bool(self._limit),
+               bool(self._offset),
+               bool(self._cursor),
+               self._do_window_count(with_count),
+               use_labels,
+               tuple(self._fields),
+               conditions_shape)
+        cache = flask.current_app.statement_cache
+        cached = cache.get(key)
+        if cached is None:
+            query = self.get_query(use_labels=use_labels,
+                                   with_count=with_count)
+            cached = (query.compile(dialect=dialect),
+                      [bind.key for bind in binds],
+                      self._select_in_embeds)
+            cache.put(key, cached)
+        compiled, bind_keys, self._select_in_embeds = cached
+        params.update(zip(bind_keys, [b.effective_value for b in binds]))
+        return compiled, params
+
+    def _get_select_in_query(self, embed_elem, root_ids):
+        root_table = self._root_table
+        embed_joins = embeds.EMBED_JOINS[root_table.name](root_table)
+        children = root_table
+        embed_sorts = []
+        for param in embed_joins[embed_elem]:
+            # only the roots having children are of interest
+            children = children.join(param['right'], param['onclause'])
+            if param.get('sort', None) is not None:
+                embed_sorts.append(param.get('sort'))
+        select_clause = [root_table.c.id.label(_PARENT_ID_LABEL)]
+        select_clause += [column.label('%s_%s' % (embed_elem, column.name))
+                          for column in self._get_embed_columns(embed_elem)]
+        query = (sql.select(select_clause, from_obj=children)
+                 .where(root_table.c.id.in_(root_ids)))
+        for embed_sort in embed_sorts:
+            query = query.order_by(embed_sort)
+        return query
+
+    def _add_select_in_embeds(self, rows):
+        """Load the one-to-many embeds of the fetched root rows with one
+        query per embed and add a row per child, shaped like the rows of
+        the join strategy, so that format_result output is unchanged."""
+        root_id_label = '%s_id' % self._root_table.name
+        rows = [dict(row) for row in rows]
+        rows_by_id = {}
+        for row in rows:
+            rows_by_id.setdefault(row[root_id_label], row)
+        root_ids = list(rows_by_id.keys())
+
+        children_rows = []
+        for embed_elem in self._select_in_embeds:
+            for i in range(0, len(root_ids), _SELECT_IN_BATCH_SIZE):
+                query = self._get_select_in_query(
+                    embed_elem, root_ids[i:i + _SELECT_IN_BATCH_SIZE])
+                for child in flask.g.db_ro_conn.execute(query):
+                    child = dict(child)
+                    child_row = dict(rows_by_id[child.pop(_PARENT_ID_LABEL)])
+                    child_row.update(child)
+                    children_rows.append(child_row)
+        return rows + children_rows
+
+    def _pop_window_count(self, rows):
+        result = []
+        for row in rows:
+            row = dict(row)
+            for label in list(row.keys()):
+                if label.endswith(_COUNT_LABEL):
+                    self._window_count = row.pop(label)
+            result.append(row)
+        return result
+
+    def _get_count_mode(self):
+        config = flask.current_app.config
+        return self._count or config['COUNT_MODES'].get(
+            flask.request.endpoint, config['DEFAULT_COUNT_MODE'])
+
+    def _get_exact_count(self, rows):
+        if not self._limit and not self._offset:
+            # all the rows have been fetched
+            return len(set(row.get('%s_id' % self._root_table.name,
+                                   row.get('id')) for row in map(dict, rows)))
+        if self._window_count is not None:
+            return self._window_count
+        # empty page or cursor pagination
+        return self.get_number_of_rows()
+
+    def get_next_cursor(self, rows):
+        """Return the cursor of the page following the given rows or None
+        if it is the last page."""
+        if self._keyset is None or not self._limit:
+            return None
+
+        root_values = {}
+        for row in rows:
+            row = dict(row)
+            values = []
+            for column, _ in self._keyset:
+                label = '%s_%s' % (self._root_table.name, column.name)
+                values.append(row[label] if label in row else row[column.name])
+            root_values[values[-1]] = values
+        if len(root_values) < self._limit:
+            return None
+
+        # the last root row according to the keyset ordering
+        values = list(root_values.values())
+        for i, (_, descending) in reversed(list(enumerate(self._keyset))):
+            values.sort(key=lambda v: v[i], reverse=descending)
+        return encode_cursor(values[-1])
+
+    def get_meta(self, rows):
+        """Build the '_meta' section of a list response."""
+        meta = {}
+        count_mode = self._get_count_mode()
+        if count_mode == 'exact':
+            meta['count'] = self._get_exact_count(rows)
+        elif count_mode == 'estimate':
+            if not self._limit and not self._offset:
+                meta['count'] = self._get_exact_count(rows)
+            else:
+                meta['count'] = self.get_estimated_number_of_rows()
+        cursor = self.get_next_cursor(rows)
+        if cursor is not None:
+            args = flask.request.args.to_dict()
+            args.pop('offset', None)
+            args['cursor'] = cursor
+            meta['next'] = '%s?%s' % (flask.request.base_url,
+                                      urlencode(sorted(args.items())))
+        return meta
 
     def _get_pg_query(self):
         from sqlalchemy.dialects import postgresql
         return str(self.get_query().compile(dialect=postgresql.dialect()))
 
 
+def _split_label(label):
+    if label.startswith('next_topic'):
+        suffix = label[11:]
+        if suffix == 'id_1':
+            suffix = 'id'
+        return 'next_topic', suffix
+    prefix, suffix = label.split('_', 1)
+    return prefix, suffix
+
+
+class _RowShaper(object):
+    """Transform the rows of a given shape into nested dicts.
+
+    The labels are split once for all the rows of the shape, each row is
+    then mapped by fetching the values of every prefix at once.
+    """
+
+    def __init__(self, labels, root_table_name):
+        self._root_table_name = root_table_name
+        prefixes = []
+        fields_by_prefix = {}
+        for label in labels:
+            prefix, suffix = _split_label(label)
+            if prefix not in fields_by_prefix:
+                prefixes.append(prefix)
+                fields_by_prefix[prefix] = []
+            fields_by_prefix[prefix].append((label, suffix))
+
+        self._groups = []
+        for prefix in prefixes:
+            group_labels, suffixes = zip(*fields_by_prefix[prefix])
+            if len(group_labels) == 1:
+                def getter(row, label=group_labels[0]):
+                    return (row[label],)
+            else:
+                getter = operator.itemgetter(*group_labels)
+            # a prefix with a null id comes from an unmatched outer join
+            id_indexes = [i for i, suffix in enumerate(suffixes)
+                          if suffix == 'id']
+            self._groups.append((prefix, getter, suffixes, id_indexes))
+
+    def __call__(self, row):
+        result_row = {}
+        for prefix, getter, suffixes, id_indexes in self._groups:
+            values = getter(row)
+            for i in id_indexes:
+                if values[i] is None:
+                    break
+            else:
+                result_row[prefix] = dict(zip(suffixes, values))
+        result_row.update(result_row.pop(self._root_table_name))
+        return result_row
+
+
 def _format_level_1(rows, root_table_name):
     """
     Transform sqlalchemy source:
@@ -436,31 +943,14 @@ def _format_level_1(rows, root_table_name):
       'b' : {'id': 'id4', 'name': 'name4'}
     ]
     """
+    shapers = {}
     result_rows = []
     for row in rows:
-        row = dict(row)
-        result_row = {}
-        prefixes_to_remove = []
-        for field in row:
-            if field.startswith('next_topic'):
-                prefix = 'next_topic'
-                suffix = field[11:]
-                if suffix == 'id_1':
-                    suffix = 'id'
-            else:
-                prefix, suffix = field.split('_', 1)
-            if suffix == 'id' and row[field] is None:
-                prefixes_to_remove.append(prefix)
-            if prefix not in result_row:
-                result_row[prefix] = {suffix: row[field]}
-            else:
-                result_row[prefix].update({suffix: row[field]})
-        # remove field with id == null
-        for prefix_to_remove in prefixes_to_remove:
-            result_row.pop(prefix_to_remove)
-        root_table_fields = result_row.pop(root_table_name)
-        result_row.update(root_table_fields)
-        result_rows.append(result_row)
+        labels = tuple(row.keys())
+        shaper = shapers.get(labels)
+        if shaper is None:
+            shaper = shapers[labels] = _RowShaper(labels, root_table_name)
+        result_rows.append(shaper(row))
     return result_rows
 
 
@@ -576,11 +1066,26 @@ def _format_level_2(rows, list_embeds, embed_many):
     return result
 
 
-def format_result(rows, root_table_name, list_embeds=None, embed_many=None):
+def _filter_fields(rows, fields, list_embeds):
+    root_fields = [field for field in fields if '.' not in field]
+    if not root_fields:
+        return rows
+    # drop the root columns only fetched for the query itself
+    kept_fields = set(root_fields + ['id'])
+    kept_fields.update(embed.split('.')[0] for embed in list_embeds or [])
+    return [{field: value for field, value in row.items()
+             if field in kept_fields}
+            for row in rows]
+
+
+def format_result(rows, root_table_name, list_embeds=None, embed_many=None,
+                  fields=None):
     result_rows = _format_level_1(rows, root_table_name)
 
     if list_embeds is not None and embed_many is not None:
-        return _format_level_2(result_rows, list_embeds, embed_many)
+        result_rows = _format_level_2(result_rows, list_embeds, embed_many)
+    if fields:
+        result_rows = _filter_fields(result_rows, fields, list_embeds)
     return result_rows
 
 
@@ -601,3 +1106,24 @@ def common_values_dict():
     }
 
     return values
+
+
+def get_bulk_items(values, key):
+    """Return the items of a bulk request, at most BULK_MAX_ITEMS."""
+    items = values[key]
+    max_items = dci_config.CONFIG['BULK_MAX_ITEMS']
+    if len(items) > max_items:
+        msg = 'A bulk request can not have more than %s %s.' % (max_items,
+                                                                key)
+        raise dci_exc.DCIException(msg, status_code=400)
+    return items
+
+
+def bulk_response(key, results):
+    """Return the per item results of a bulk request, with a 201 status if
+    all the items were created or a 207 one otherwise."""
+    status_code = 201
+    if any(result['status_code'] != 201 for result in results):
+        status_code = 207
+    return flask.Response(json.dumps({key: results}, cls=utils.JSONEncoder),
+                          status_code, content_type='application/json')
@@ -14,15 +14,18 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 from dci.api import v1 as api_v1
+from dci.api.v1 import sso
+from dci import auth
+from dci.common import cache
 from dci.common import exceptions
 from dci.common import utils
+from dci.db import connection
 from dci.db import models
 from dci import dci_config
 
 import flask
 import logging
 import sys
-import time
 import zmq
 
 import sqlalchemy
@@ -32,6 +35,10 @@ logger = logging.getLogger(__name__)
 
 zmq_sender = None
 
+# cookie set on writes to route the next reads of the client to the primary
+# database
+READ_PRIMARY_COOKIE = 'dci_read_primary'
+
 
 class DciControlServer(flask.Flask):
     def __init__(self):
@@ -39,12 +46,35 @@ class DciControlServer(flask.Flask):
         self.config.update(dci_config.CONFIG)
         self.url_map.strict_slashes = False
         self.engine = dci_config.get_engine()
+        self.read_only_engine = dci_config.get_engine(dci_config.READ_ONLY)
         conf = dci_config.CONFIG
         self.sender = self._get_zmq_sender(conf['ZMQ_CONN'])
-        engine = dci_config.get_engine()
-        self.team_admin_id = self._get_team_id(engine, 'admin')
-        self.team_redhat_id = self._get_team_id(engine, 'Red Hat')
-        self.team_epm_id = self._get_team_id(engine, 'EPM')
+        self.db_circuit_breaker = connection.CircuitBreaker(
+            conf['DB_CIRCUIT_BREAKER_THRESHOLD'],
+            conf['DB_CIRCUIT_BREAKER_TIMEOUT'])
+        self.read_only_db_circuit_breaker = connection.CircuitBreaker(
+            conf['DB_CIRCUIT_BREAKER_THRESHOLD'],
+            conf['DB_CIRCUIT_BREAKER_TIMEOUT'])
+        self.statement_cache = cache.LRUCache(conf['STATEMENT_CACHE_SIZE'])
+        self.identity_cache = cache.TTLCache(conf['IDENTITY_CACHE_SIZE'],
+                                             conf['IDENTITY_CACHE_TTL'])
+        self.verified_passwords = auth.VerifiedPasswords(
+            conf['VERIFIED_PASSWORDS_CACHE_SIZE'],
+            conf['VERIFIED_PASSWORDS_CACHE_TTL'])
+        self.sso_jwks = sso.JWKSCache(conf['SSO_JWKS_REFRESH_INTERVAL'],
+                                      conf['SSO_UNKNOWN_KID_TTL'])
+        self.sso_token_cache = cache.TTLCache(conf['SSO_TOKEN_CACHE_SIZE'],
+                                              conf['SSO_TOKEN_CACHE_TTL'])
+        self.certs_access_cache = cache.TTLCache(
+            conf['CERTS_ACCESS_CACHE_SIZE'], conf['CERTS_ACCESS_CACHE_TTL'])
+        self.team_access_cache = cache.TTLCache(
+            conf['TEAM_ACCESS_CACHE_SIZE'], conf['TEAM_ACCESS_CACHE_TTL'])
+        self.latest_components_cache = cache.TTLCache(
+            conf['LATEST_COMPONENTS_CACHE_SIZE'],
+            conf['LATEST_COMPONENTS_CACHE_TTL'])
+        self.team_admin_id = self._get_team_id(self.engine, 'admin')
+        self.team_redhat_id = self._get_team_id(self.engine, 'Red Hat')
+        self.team_epm_id = self._get_team_id(self.engine, 'EPM')
 
     def _get_zmq_sender(self, zmq_conn):
         global zmq_sender
@@ -133,26 +163,44 @@ def create_app(param=None):
         flask.g.team_admin_id = dci_app.team_admin_id
         flask.g.team_redhat_id = dci_app.team_redhat_id
         flask.g.team_epm_id = dci_app.team_epm_id
-
-        for i in range(5):
-            try:
-                flask.g.db_conn = dci_app.engine.connect()
-                break
-            except:
-                logging.warning('failed to connect to the database, '
-                                'will retry in 1 second...')
-                time.sleep(1)
-                pass
-
+        # the connection is checked out from the pool on its first use
+        flask.g.db_conn = connection.LazyConnection(
+            dci_app.engine, dci_app.db_circuit_breaker)
+        # connection used by the read only queries
+        if _use_read_only_db():
+            flask.g.db_ro_conn = connection.LazyConnection(
+                dci_app.read_only_engine,
+                dci_app.read_only_db_circuit_breaker)
+        else:
+            flask.g.db_ro_conn = flask.g.db_conn
         flask.g.sender = dci_app.sender
 
+    def _use_read_only_db():
+        return (dci_app.config['SQLALCHEMY_READ_ONLY_DATABASE_URI'] and
+                flask.request.method in ('GET', 'HEAD') and
+                READ_PRIMARY_COOKIE not in flask.request.cookies)
+
+    @dci_app.after_request
+    def after_request(response):
+        # the client will read its own writes during the replication lag
+        if (dci_app.config['SQLALCHEMY_READ_ONLY_DATABASE_URI'] and
+                flask.request.method in ('POST', 'PUT', 'DELETE') and
+                response.status_code < 400):
+            response.set_cookie(
+                READ_PRIMARY_COOKIE, '1',
+                max_age=dci_app.config['READ_YOUR_WRITES_TIMEOUT'])
+        return response
+
     @dci_app.teardown_request
     def teardown_request(_):
         try:
             flask.g.db_conn.close()
-        except:
+        except Exception:
             logging.warning('disconnected from the database..')
-            pass
+        try:
+            flask.g.db_ro_conn.close()
+        except Exception:
+            logging.warning('disconnected from the read only database..')
 
     # Registering REST error handler
     dci_app.register_error_handler(exceptions.DCIException,
@@ -14,9 +14,15 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+import hmac
+import os
+
 import jwt
 from passlib.apps import custom_app_context as pwd_context
 
+from dci.common import cache
+
 
 def hash_password(password):
     return pwd_context.encrypt(password)
@@ -26,6 +32,42 @@ def check_passwords_equal(password, encrypted_password):
     return pwd_context.verify(password, encrypted_password)
 
 
+class VerifiedPasswords(object):
+    """Remember the successful password checks of the users during ttl
+    seconds, the password hash being slow on purpose.
+
+    Only a HMAC of the user id, etag, password hash and password is kept,
+    with a random key which never leaves the process, a change of the
+    user's password or etag doesn't match the previous checks.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self._key = os.urandom(32)
+        self._cache = cache.TTLCache(maxsize, ttl)
+
+    def _digest(self, user, password):
+        values = (user.id, user.etag, user.password, password)
+        message = u'\0'.join(u'%s' % value for value in values)
+        return hmac.new(self._key, message.encode('utf-8'),
+                        hashlib.sha256).digest()
+
+    def check(self, user, password):
+        digest = self._digest(user, password)
+        if self._cache.get(digest) is not None:
+            return True
+        if not check_passwords_equal(password, user.password):
+            return False
+        self._cache.put(digest, user.id)
+        return True
+
+    def forget(self, user_id):
+        user_id = str(user_id)
+        self._cache.discard(lambda cached_user_id: cached_user_id == user_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
 def decode_jwt(access_token, pem_public_key, audience):
     return jwt.decode(access_token, verify=True, key=pem_public_key,
                       audience=audience, algorithms=['RS256'])
@@ -19,7 +19,6 @@ from sqlalchemy import exc as sa_exc
 from sqlalchemy import sql
 
 from dci.api.v1 import sso
-from dci import auth
 from dci import dci_config
 from dci.common import exceptions as dci_exc
 from dciauth.request import AuthRequest
@@ -29,8 +28,6 @@ from dciauth.v2.signature import is_valid
 from dci.db import models
 from dci.identity import Identity
 
-from jwt import exceptions as jwt_exc
-
 
 class BaseMechanism(object):
 
@@ -43,6 +40,17 @@ class BaseMechanism(object):
         method must raise an exception with proper error message."""
         pass
 
+    def cached_identity_from_db(self, cache_key, model_cls, model_constraint):
+        """Get the identity from the identity cache, or from the database if
+        it is not cached yet or expired."""
+        identity_cache = flask.current_app.identity_cache
+        identity = identity_cache.get(cache_key)
+        if identity is None:
+            identity = self.identity_from_db(model_cls, model_constraint)
+            if identity is not None:
+                identity_cache.put(cache_key, identity)
+        return identity
+
     def identity_from_db(self, model_cls, model_constraint):
 
         q_get_user_teams = (
@@ -139,12 +147,14 @@ class BasicAuthMechanism(BaseMechanism):
             models.USERS.c.email == username
         )
 
-        user = self.identity_from_db(models.USERS, constraint)
+        user = self.cached_identity_from_db(('user', username), models.USERS,
+                                            constraint)
         if user is None:
             raise dci_exc.DCIException('User %s does not exists.' % username,
                                        status_code=401)
 
-        return user, auth.check_passwords_equal(password, user.password)
+        verified_passwords = flask.current_app.verified_passwords
+        return user, verified_passwords.check(user, password)
 
 
 class HmacMechanism(BaseMechanism):
@@ -233,7 +243,9 @@ class HmacMechanism(BaseMechanism):
         if identity_model is None:
             return None
         constraint = identity_model.c.id == client_info['client_id']
-        return self.identity_from_db(identity_model, constraint)
+        return self.cached_identity_from_db(
+            (client_info['client_type'], client_info['client_id']),
+            identity_model, constraint)
 
 
 class Hmac2Mechanism(HmacMechanism):
@@ -268,15 +280,7 @@ class OpenIDCAuth(BaseMechanism):
         bearer, token = auth_header
 
         conf = dci_config.CONFIG
-        try:
-            decoded_token = auth.decode_jwt(token,
-                                            conf['SSO_PUBLIC_KEY'],
-                                            conf['SSO_CLIENT_ID'])
-        except (jwt_exc.DecodeError, ValueError):
-            decoded_token = sso.decode_token_with_latest_public_key(token)
-        except jwt_exc.ExpiredSignatureError:
-            raise dci_exc.DCIException('JWT token expired, please refresh.',
-                                       status_code=401)
+        decoded_token = sso.decode_token(token)
 
         team_id = None
         ro_group = conf['SSO_READ_ONLY_GROUP']
@@ -308,8 +312,9 @@ class OpenIDCAuth(BaseMechanism):
             models.USERS.c.email == user_info['sso_username'],
             models.USERS.c.email == user_info['email']
         )
-        identity = self.identity_from_db(models.USERS,
-                                         constraint)
+        cache_key = ('sso', user_info['sso_username'], user_info['email'])
+        identity = self.cached_identity_from_db(cache_key, models.USERS,
+                                                constraint)
         if identity is None:
             u_id = flask.g.db_conn.execute(models.USERS.insert().values(user_info)).inserted_primary_key[0]  # noqa
             flask.g.db_conn.execute(
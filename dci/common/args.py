@@ -22,4 +22,7 @@ def parse_args(args):
         "sort": _get_csv("sort", args),
         "where": _get_csv("where", args),
         "embed": _get_csv("embed", args),
+        "cursor": args.get("cursor"),
+        "count": args.get("count"),
+        "fields": _get_csv("fields", args),
     }
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import threading
+import time
+
+
+class LRUCache(object):
+    """Thread safe mapping keeping the maxsize most recently used entries.
+
+    A maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            # move the entry to the most recently used end
+            self._entries[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+class TTLCache(LRUCache):
+    """LRU cache whose entries expire ttl seconds after they were put.
+
+    The expired entries count as misses, the discard method removes the
+    entries whose value matches a predicate.
+    """
+
+    def __init__(self, maxsize, ttl, timer=time.time):
+        super(TTLCache, self).__init__(maxsize)
+        self.ttl = ttl
+        self.expirations = 0
+        self._timer = timer
+
+    def get(self, key, default=None):
+        entry = super(TTLCache, self).get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= self._timer():
+            with self._lock:
+                # the hit of an expired entry is a miss
+                self.hits -= 1
+                self.misses += 1
+                self.expirations += 1
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            return default
+        return value
+
+    def put(self, key, value, expires_at=None):
+        """Put the value for ttl seconds, or until expires_at if it is
+        sooner."""
+        if self.ttl <= 0:
+            return
+        now = self._timer()
+        if expires_at is None or expires_at > now + self.ttl:
+            expires_at = now + self.ttl
+        elif expires_at <= now:
+            return
+        super(TTLCache, self).put(key, (expires_at, value))
+
+    def pop(self, key, default=None):
+        entry = super(TTLCache, self).pop(key)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def discard(self, predicate):
+        """Remove the entries whose value matches the predicate."""
+        with self._lock:
+            keys = [key for key, (_, value) in self._entries.items()
+                    if predicate(value)]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self.expirations = 0
+        super(TTLCache, self).clear()
+
+    def stats(self):
+        stats = super(TTLCache, self).stats()
+        stats['ttl'] = self.ttl
+        stats['expirations'] = self.expirations
+        return stats
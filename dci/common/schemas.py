@@ -41,6 +41,7 @@ class Properties(object):
         "pattern": "[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}",
     }
     email = {"type": "string", "format": "email"}
+    date = {"type": "string", "format": "date"}
     url = {"type": "string", "format": "uri", "pattern": "^https?://"}
     json = {"type": "object"}
     array = {"type": "array"}
@@ -52,6 +53,10 @@ class Properties(object):
     string_integer = {"type": "string", "pattern": "^([+-]?[1-9]\d*|0)$"}
     positive_string_integer = {"type": "string", "pattern": "^[1-9]\d*$"}
     positive_or_null_string_integer = {"type": "string", "pattern": "^\d+$"}
+    fields_csv = {
+        "type": "string",
+        "pattern": r"^[a-z0-9_]+(\.[a-z0-9_]+)*(,[a-z0-9_]+(\.[a-z0-9_]+)*)*$",
+    }
 
     @staticmethod
     def enum(accepted_values):
@@ -95,6 +100,7 @@ def _get_error_message(error):
             "string_integer": "is not an integer",
             "positive_string_integer": "is not a positive integer",
             "positive_or_null_string_integer": "is not a positive or null integer",
+            "fields": "is not a comma separated list of fields",
         }
         property_name = error.relative_path[0]
         value = error.instance
@@ -122,6 +128,8 @@ def check_json_is_valid(schema, json):
 
 valid_resource_states = ["active", "inactive", "archived"]
 
+valid_count_modes = ["exact", "estimate", "none"]
+
 
 ###############################################################################
 #                                                                             #
@@ -136,6 +144,9 @@ args_schema = {
         "sort": Properties.string,
         "where": Properties.key_value_csv,
         "embed": Properties.string,
+        "cursor": Properties.string,
+        "count": Properties.enum(valid_count_modes),
+        "fields": Properties.fields_csv,
     },
     "dependencies": {
         "limit": {"required": ["offset"]},
@@ -193,6 +204,14 @@ create_job_schema = {
     "additionalProperties": False,
 }
 
+bulk_create_jobs_schema = {
+    "type": "object",
+    "properties": {"jobs": {"type": "array", "items": {"type": "object"},
+                            "minItems": 1}},
+    "required": ["jobs"],
+    "additionalProperties": False,
+}
+
 update_job_properties = {
     "comment": Properties.string,
     "status": Properties.enum(
@@ -479,6 +498,15 @@ jobstate_schema = {
     "additionalProperties": False,
 }
 
+bulk_jobstates_schema = {
+    "type": "object",
+    "properties": {"jobstates": {"type": "array",
+                                 "items": {"type": "object"},
+                                 "minItems": 1}},
+    "required": ["jobstates"],
+    "additionalProperties": False,
+}
+
 ###############################################################################
 #                                                                             #
 #                                 Topic schema                                #
@@ -588,3 +616,17 @@ performance_schema = {
     "required": ["base_job_id", "jobs"],
     "additionalProperties": False,
 }
+
+###############################################################################
+#                                                                             #
+#                                  Trends schema                              #
+#                                                                             #
+###############################################################################
+trends_args_schema = {
+    "type": "object",
+    "properties": {
+        "since": Properties.date,
+        "until": Properties.date,
+    },
+    "additionalProperties": False,
+}
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The blobs table counts the files referencing each content stored by
+sha256, when the files store deduplicates the uploads.
+
+A new reference to a blob waits for the transaction removing the last
+one, and the other way around, thanks to the lock of the blob row.
+"""
+
+import datetime
+
+from sqlalchemy import sql, text
+
+from dci.db import models
+
+_TABLE = models.BLOBS
+
+_ADD_REFERENCE = text("""
+INSERT INTO blobs (sha256, md5, size, refcount, created_at)
+VALUES (:sha256, :md5, :size, 1, :created_at)
+ON CONFLICT (sha256) DO UPDATE SET refcount = blobs.refcount + 1
+RETURNING refcount
+""")
+
+_REMOVE_REFERENCE = text("""
+UPDATE blobs SET refcount = refcount - 1
+WHERE sha256 = :sha256
+RETURNING refcount
+""")
+
+
+def add_reference(db_conn, digests):
+    """Reference the blob of the digests and return True if the blob is
+    new, and so its content has to be stored."""
+    refcount = db_conn.execute(
+        _ADD_REFERENCE,
+        sha256=digests['sha256'],
+        md5=digests['md5'],
+        size=digests['size'],
+        created_at=datetime.datetime.utcnow()).scalar()
+    return refcount == 1
+
+
+def remove_reference(db_conn, sha256):
+    """Remove a reference to the blob and return True if it is not
+    referenced anymore, and so its content has to be deleted."""
+    refcount = db_conn.execute(_REMOVE_REFERENCE, sha256=sha256).scalar()
+    if refcount is None or refcount > 0:
+        return False
+    db_conn.execute(_TABLE.delete().where(_TABLE.c.sha256 == sha256))
+    return True
+
+
+def get_report(db_conn):
+    """Return how much space the deduplication of the files saves."""
+    files = db_conn.execute(
+        sql.select([sql.func.count(),
+                    sql.func.coalesce(sql.func.sum(models.FILES.c.size), 0)])
+        .where(models.FILES.c.sha256.isnot(None))).fetchone()
+    blobs = db_conn.execute(
+        sql.select([sql.func.count(),
+                    sql.func.coalesce(sql.func.sum(_TABLE.c.size), 0)])
+    ).fetchone()
+    files_size, blobs_size = int(files[1]), int(blobs[1])
+    return {
+        'files': files[0],
+        'files_size': files_size,
+        'blobs': blobs[0],
+        'blobs_size': blobs_size,
+        'bytes_saved': files_size - blobs_size,
+        'dedup_ratio': (round(float(files_size) / blobs_size, 2)
+                        if blobs_size else 1.0)
+    }
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import threading
+import time
+
+from sqlalchemy import exc as sa_exc
+
+from dci.common import exceptions as dci_exc
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker(object):
+    """Stop trying to connect to the database for reset_timeout seconds
+    after failure_threshold consecutive connection failures."""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            # half open: let one caller try again once the timeout expired
+            if time.time() - self._opened_at >= self.reset_timeout:
+                self._opened_at = time.time()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error('database unreachable, failing fast for '
+                                 '%s seconds' % self.reset_timeout)
+                self._opened_at = time.time()
+
+
+class LazyConnection(object):
+    """Proxy of an engine connection, the connection is checked out from
+    the pool on its first use only."""
+
+    def __init__(self, engine, circuit_breaker):
+        self._engine = engine
+        self._circuit_breaker = circuit_breaker
+        self._connection = None
+
+    @property
+    def connected(self):
+        return self._connection is not None
+
+    def _connect(self):
+        if self._connection is None:
+            if not self._circuit_breaker.allow():
+                raise dci_exc.DCIException('Database unavailable.',
+                                           status_code=503)
+            try:
+                self._connection = self._engine.connect()
+            except sa_exc.DBAPIError as e:
+                logger.warning('failed to connect to the database: %s' % e)
+                self._circuit_breaker.record_failure()
+                raise dci_exc.DCIException('Database unavailable.',
+                                           status_code=503)
+            self._circuit_breaker.record_success()
+        return self._connection
+
+    def __getattr__(self, name):
+        return getattr(self._connect(), name)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The global_status table keeps the latest success or failure job of each
+component and remoteci. It is updated each time the status of a job
+changes and read by the /global_status endpoint, which only shows the
+latest component of each topic.
+"""
+
+from sqlalchemy import text
+
+_LATEST_JOBS = """
+SELECT DISTINCT ON (jobs_components.component_id, jobs.remoteci_id)
+    jobs_components.component_id,
+    jobs.remoteci_id,
+    jobs.id,
+    jobs.status,
+    jobs.created_at
+FROM jobs
+JOIN jobs_components ON jobs.id = jobs_components.job_id
+WHERE
+    (jobs.status = 'failure' OR jobs.status = 'success') %s
+ORDER BY
+    jobs_components.component_id,
+    jobs.remoteci_id,
+    jobs.created_at DESC
+"""
+
+_JOB_COMPONENTS_CONDITION = """AND
+    jobs.remoteci_id = (SELECT remoteci_id FROM jobs WHERE id = :job_id) AND
+    jobs_components.component_id IN (SELECT component_id
+                                     FROM jobs_components
+                                     WHERE job_id = :job_id)
+"""
+
+_INSERT = """
+INSERT INTO global_status
+    (component_id, remoteci_id, job_id, status, created_at)
+%s
+ON CONFLICT (component_id, remoteci_id) DO UPDATE SET
+    job_id = EXCLUDED.job_id,
+    status = EXCLUDED.status,
+    created_at = EXCLUDED.created_at
+WHERE global_status.created_at <= EXCLUDED.created_at
+"""
+
+_DELETE_JOB = text('DELETE FROM global_status WHERE job_id = :job_id')
+
+_UPDATE_JOB = text(_INSERT % (_LATEST_JOBS % _JOB_COMPONENTS_CONDITION))
+
+_DELETE_ALL = text('DELETE FROM global_status')
+
+_INSERT_ALL = text(_INSERT % (_LATEST_JOBS % ''))
+
+
+def update_job(db_conn, job_id):
+    """Update the global status of the components of a job after a change
+    of its status."""
+    with db_conn.begin():
+        # the job may not be a success or a failure anymore
+        db_conn.execute(_DELETE_JOB, job_id=job_id)
+        db_conn.execute(_UPDATE_JOB, job_id=job_id)
+
+
+def rebuild(db_conn):
+    """Rebuild the whole global status from the jobs."""
+    with db_conn.begin():
+        db_conn.execute(_DELETE_ALL)
+        db_conn.execute(_INSERT_ALL)
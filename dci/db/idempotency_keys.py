@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The idempotency_keys table keeps, for a while, the job created by each
+/jobs/schedule request sent with an Idempotency-Key header, so that the
+retries of the request get the same job instead of a new one.
+
+The schedulings of a remoteci are serialised by a transaction level
+advisory lock, the ones of different remotecis do not wait for each other.
+"""
+
+import datetime
+import hashlib
+import json
+
+from sqlalchemy import sql, text
+
+from dci.common import exceptions as dci_exc
+from dci.db import models
+
+_TABLE = models.IDEMPOTENCY_KEYS
+
+# first key of the advisory locks taken on the remotecis
+_LOCK_NAMESPACE = 0x64636901
+
+_LOCK_REMOTECI = text(
+    'SELECT pg_advisory_xact_lock(:namespace, hashtext(:remoteci_id))')
+
+
+def get_request_hash(values):
+    """Return the fingerprint of a request body."""
+    body = json.dumps(values, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def lock_remoteci(db_conn, remoteci_id):
+    """Wait for the other schedulings of the remoteci, until the end of the
+    current transaction."""
+    db_conn.execute(_LOCK_REMOTECI, namespace=_LOCK_NAMESPACE,
+                    remoteci_id=str(remoteci_id))
+
+
+def _expired_before(ttl):
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=ttl)
+
+
+def get_job_id(db_conn, remoteci_id, key, request_hash, ttl):
+    """Return the id of the job created with the key in the last ttl
+    seconds, or None."""
+    query = sql.select([_TABLE.c.job_id, _TABLE.c.request_hash]).where(
+        sql.and_(_TABLE.c.remoteci_id == remoteci_id,
+                 _TABLE.c.key == key,
+                 _TABLE.c.created_at > _expired_before(ttl)))
+    row = db_conn.execute(query).fetchone()
+    if row is None:
+        return None
+    if row['request_hash'] != request_hash:
+        msg = 'Idempotency-Key "%s" already used by another request.' % key
+        raise dci_exc.DCIException(msg, status_code=422)
+    return row['job_id']
+
+
+def save(db_conn, remoteci_id, key, request_hash, job_id, ttl):
+    """Keep the job created with the key and purge the expired keys of the
+    remoteci."""
+    db_conn.execute(_TABLE.delete().where(
+        sql.and_(_TABLE.c.remoteci_id == remoteci_id,
+                 _TABLE.c.created_at <= _expired_before(ttl))))
+    db_conn.execute(_TABLE.insert().values(
+        remoteci_id=remoteci_id,
+        key=key,
+        request_hash=request_hash,
+        job_id=job_id,
+        created_at=datetime.datetime.utcnow()))
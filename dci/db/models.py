@@ -205,6 +205,7 @@ REMOTECIS = sa.Table(
     sa.UniqueConstraint('name', 'team_id', name='remotecis_name_team_id_key'),
     sa.Column('public', sa.BOOLEAN, default=False),
     sa.Column('cert_fp', sa.String(255)),
+    sa.Index('remotecis_cert_fp_idx', 'cert_fp'),
     sa.Column('state', STATES, default='active')
 )
 
@@ -255,7 +256,8 @@ JOBS = sa.Table(
               nullable=True, default=None),
     sa.Index('jobs_update_previous_job_id_idx', 'update_previous_job_id'),
     sa.Column('state', STATES, default='active'),
-    sa.Column('tag', pg.ARRAY(sa.Text), default=[])
+    sa.Column('tag', pg.ARRAY(sa.Text), default=[]),
+    sa.Index('jobs_created_at_id_idx', 'created_at', 'id')
 )
 
 TESTS_RESULTS = sa.Table(
@@ -293,7 +295,57 @@ JOIN_JOBS_COMPONENTS = sa.Table(
               nullable=False, primary_key=True),
     sa.Column('component_id', pg.UUID(as_uuid=True),
               sa.ForeignKey('components.id', ondelete='CASCADE'),
-              nullable=False, primary_key=True)
+              nullable=False, primary_key=True),
+    sa.Index('jobs_components_component_id_idx', 'component_id')
+)
+
+# latest success or failure job of each component and remoteci, maintained
+# from the jobs, see dci.db.global_status
+GLOBAL_STATUS = sa.Table(
+    'global_status', metadata,
+    sa.Column('component_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('components.id', ondelete='CASCADE'),
+              nullable=False, primary_key=True),
+    sa.Column('remoteci_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('remotecis.id', ondelete='CASCADE'),
+              nullable=False, primary_key=True),
+    sa.Column('job_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+              nullable=False),
+    sa.Index('global_status_job_id_idx', 'job_id'),
+    sa.Column('status', STATUSES, nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False)
+)
+
+# number of success and failure jobs of each topic, team and day, maintained
+# from the jobs, see dci.db.trends
+TRENDS = sa.Table(
+    'trends', metadata,
+    sa.Column('topic_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('topics.id', ondelete='CASCADE'),
+              nullable=False, primary_key=True),
+    sa.Column('team_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('teams.id', ondelete='CASCADE'),
+              nullable=False, primary_key=True),
+    sa.Column('day', sa.Date(), nullable=False, primary_key=True),
+    sa.Column('success', sa.Integer, nullable=False),
+    sa.Column('failure', sa.Integer, nullable=False)
+)
+
+# job created by a /jobs/schedule request sent with an Idempotency-Key
+# header, see dci.db.idempotency_keys
+IDEMPOTENCY_KEYS = sa.Table(
+    'idempotency_keys', metadata,
+    sa.Column('remoteci_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('remotecis.id', ondelete='CASCADE'),
+              nullable=False, primary_key=True),
+    sa.Column('key', sa.String(255), nullable=False, primary_key=True),
+    sa.Column('request_hash', sa.String(64), nullable=False),
+    sa.Column('job_id', pg.UUID(as_uuid=True),
+              sa.ForeignKey('jobs.id', ondelete='CASCADE'),
+              nullable=False),
+    sa.Index('idempotency_keys_job_id_idx', 'job_id'),
+    sa.Column('created_at', sa.DateTime(), nullable=False)
 )
 
 JOIN_JOBS_ISSUES = sa.Table(
@@ -320,10 +372,23 @@ JOBSTATES = sa.Table(
     sa.Column('job_id', pg.UUID(as_uuid=True),
               sa.ForeignKey('jobs.id', ondelete='CASCADE'),
               nullable=False),
-    sa.Index('jobstates_job_id_idx', 'job_id')
+    sa.Index('jobstates_job_id_idx', 'job_id'),
+    sa.Index('jobstates_created_at_id_idx', 'created_at', 'id')
 )
 
 
+# the contents of the files stored once by sha256, refcount is the number of
+# files referencing them
+BLOBS = sa.Table(
+    'blobs', metadata,
+    sa.Column('sha256', sa.String(64), primary_key=True),
+    sa.Column('md5', sa.String(32), nullable=False),
+    sa.Column('size', sa.BIGINT, nullable=False),
+    sa.Column('refcount', sa.Integer, nullable=False, default=1),
+    sa.Column('created_at', sa.DateTime(),
+              default=datetime.datetime.utcnow, nullable=False)
+)
+
 FILES = sa.Table(
     'files', metadata,
     sa.Column('id', pg.UUID(as_uuid=True), primary_key=True,
@@ -337,6 +402,10 @@ FILES = sa.Table(
     sa.Column('mime', sa.String),
     sa.Column('md5', sa.String(32)),
     sa.Column('size', sa.BIGINT, nullable=True),
+    # set when the content is stored in the blob of this sha256
+    sa.Column('sha256', sa.String(64), sa.ForeignKey('blobs.sha256'),
+              nullable=True),
+    sa.Index('files_sha256_idx', 'sha256'),
     sa.Column('jobstate_id', pg.UUID(as_uuid=True),
               sa.ForeignKey('jobstates.id', ondelete='CASCADE'),
               nullable=True),
@@ -354,7 +423,8 @@ FILES = sa.Table(
     sa.Index('files_job_id_idx', 'job_id'),
     sa.Column('state', STATES, default='active'),
     sa.Column('etag', sa.String(40), nullable=False, default=utils.gen_etag,
-              onupdate=utils.gen_etag)
+              onupdate=utils.gen_etag),
+    sa.Index('files_created_at_id_idx', 'created_at', 'id')
 )
 
 JOBS_EVENTS = sa.Table(
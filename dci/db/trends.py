@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""The trends table counts the success and failure jobs of each topic, team
+and day. The counters of a day are computed again from the jobs each time
+the status of one of its jobs changes, and read by the /trends endpoint.
+
+The counts of a day are serialised by a transaction level advisory lock,
+so that the last one sees the status of all the jobs of the day. The jobs
+without topic are not in the table, the endpoint counts them from the jobs.
+"""
+
+from sqlalchemy import text
+
+_COUNT_JOBS = """
+SELECT
+    jobs.topic_id,
+    jobs.team_id,
+    CAST(jobs.created_at AS DATE) AS day,
+    COUNT(*) FILTER (WHERE jobs.status = 'success'),
+    COUNT(*) FILTER (WHERE jobs.status = 'failure')
+FROM jobs
+WHERE
+    (jobs.status = 'failure' OR jobs.status = 'success') AND
+    jobs.topic_id IS NOT NULL %s
+GROUP BY jobs.topic_id, jobs.team_id, day
+"""
+
+_JOB_DAY_CONDITION = """AND
+    jobs.topic_id = (SELECT topic_id FROM jobs WHERE id = :job_id) AND
+    jobs.team_id = (SELECT team_id FROM jobs WHERE id = :job_id) AND
+    jobs.created_at >= (SELECT CAST(created_at AS DATE)
+                        FROM jobs WHERE id = :job_id) AND
+    jobs.created_at < (SELECT CAST(created_at AS DATE) + 1
+                       FROM jobs WHERE id = :job_id)
+"""
+
+_INSERT = """
+INSERT INTO trends (topic_id, team_id, day, success, failure)
+%s
+ON CONFLICT (topic_id, team_id, day) DO UPDATE SET
+    success = EXCLUDED.success,
+    failure = EXCLUDED.failure
+"""
+
+# first key of the advisory locks taken on the days of the trends
+_LOCK_NAMESPACE = 0x64636902
+
+_LOCK_JOB_DAY = text("""
+SELECT pg_advisory_xact_lock(
+    :namespace,
+    hashtext(CAST(topic_id AS TEXT) || CAST(team_id AS TEXT) ||
+             CAST(CAST(created_at AS DATE) AS TEXT)))
+FROM jobs
+WHERE id = :job_id AND topic_id IS NOT NULL
+""")
+
+_DELETE_JOB_DAY = text("""
+DELETE FROM trends
+USING jobs
+WHERE
+    jobs.id = :job_id AND
+    trends.topic_id = jobs.topic_id AND
+    trends.team_id = jobs.team_id AND
+    trends.day = CAST(jobs.created_at AS DATE)
+""")
+
+_UPDATE_JOB_DAY = text(_INSERT % (_COUNT_JOBS % _JOB_DAY_CONDITION))
+
+_DELETE_ALL = text('DELETE FROM trends')
+
+_INSERT_ALL = text(_INSERT % (_COUNT_JOBS % ''))
+
+
+def update_job(db_conn, job_id):
+    """Count again the jobs of the day of a job after a change of its
+    status."""
+    with db_conn.begin():
+        db_conn.execute(_LOCK_JOB_DAY, namespace=_LOCK_NAMESPACE,
+                        job_id=job_id)
+        db_conn.execute(_DELETE_JOB_DAY, job_id=job_id)
+        db_conn.execute(_UPDATE_JOB_DAY, job_id=job_id)
+
+
+def rebuild(db_conn):
+    """Rebuild all the trends from the jobs."""
+    with db_conn.begin():
+        db_conn.execute(_DELETE_ALL)
+        db_conn.execute(_INSERT_ALL)
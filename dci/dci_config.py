@@ -15,35 +15,129 @@
 # under the License.
 
 import os
+import threading
+import time
 
 from dci.stores import filesystem, swift
 
 import flask
 import sqlalchemy
+from sqlalchemy import pool
 
 # this is an application global variable
 CONFIG = flask.Config('')
 CONFIG.from_object('dci.settings')
 CONFIG.from_object(os.environ.get('DCI_SETTINGS_MODULE'))
 
+# engine roles handled by the engine registry
+PRIMARY = 'primary'
+READ_ONLY = 'read_only'
+ADMIN = 'admin'
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+_STORES = {}
+_STORES_LOCK = threading.Lock()
+
 
 # todo(yassine): remove the param used by client's CI.
 def generate_conf(param=None):
     return CONFIG
 
 
-def get_engine():
-    sa_engine = sqlalchemy.create_engine(
-        CONFIG['SQLALCHEMY_DATABASE_URI'],
-        pool_size=CONFIG['SQLALCHEMY_POOL_SIZE'],
-        max_overflow=CONFIG['SQLALCHEMY_MAX_OVERFLOW'],
+class StatsQueuePool(pool.QueuePool):
+    """QueuePool which records how long the callers waited for a
+    connection."""
+
+    def __init__(self, *args, **kwargs):
+        super(StatsQueuePool, self).__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _do_get(self):
+        start = time.time()
+        try:
+            return super(StatsQueuePool, self)._do_get()
+        finally:
+            elapsed = time.time() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_time += elapsed
+                self.max_wait_time = max(self.max_wait_time, elapsed)
+
+    def stats(self):
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            'overflow': self.overflow(),
+            'checkouts': self.checkouts,
+            'wait_time': self.wait_time,
+            'max_wait_time': self.max_wait_time
+        }
+
+
+def _create_engine(role):
+    if role == PRIMARY:
+        db_uri = CONFIG['SQLALCHEMY_DATABASE_URI']
+        pool_size = CONFIG['SQLALCHEMY_POOL_SIZE']
+        max_overflow = CONFIG['SQLALCHEMY_MAX_OVERFLOW']
+    elif role == READ_ONLY:
+        db_uri = CONFIG['SQLALCHEMY_READ_ONLY_DATABASE_URI']
+        pool_size = CONFIG['SQLALCHEMY_POOL_SIZE']
+        max_overflow = CONFIG['SQLALCHEMY_MAX_OVERFLOW']
+    elif role == ADMIN:
+        db_uri = CONFIG['SQLALCHEMY_DATABASE_URI']
+        pool_size = CONFIG['SQLALCHEMY_ADMIN_POOL_SIZE']
+        max_overflow = 0
+    else:
+        raise ValueError('Unknown engine role: %s' % role)
+
+    return sqlalchemy.create_engine(
+        db_uri,
+        poolclass=StatsQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
         encoding='utf8',
         convert_unicode=CONFIG['SQLALCHEMY_NATIVE_UNICODE'],
         echo=CONFIG['SQLALCHEMY_ECHO'])
-    return sa_engine
 
 
-def get_store(container):
+def get_engine(role=PRIMARY):
+    """Return the process wide engine of the given role, the engine and its
+    connection pool are created on the first call."""
+    # without a dedicated database, reads go through the primary
+    if role == READ_ONLY and not CONFIG['SQLALCHEMY_READ_ONLY_DATABASE_URI']:
+        role = PRIMARY
+    engine = _ENGINES.get(role)
+    if engine is None:
+        with _ENGINES_LOCK:
+            engine = _ENGINES.get(role)
+            if engine is None:
+                engine = _ENGINES[role] = _create_engine(role)
+    return engine
+
+
+def dispose_engines():
+    with _ENGINES_LOCK:
+        for engine in _ENGINES.values():
+            engine.dispose()
+        _ENGINES.clear()
+
+
+def get_pool_stats():
+    """Return the connection pool statistics of each created engine."""
+    stats = {}
+    for role, engine in list(_ENGINES.items()):
+        if isinstance(engine.pool, StatsQueuePool):
+            stats[role] = engine.pool.stats()
+    return stats
+
+
+def _create_store(container):
     configuration = {}
     if container == 'files':
         configuration['container'] = CONFIG['STORE_FILES_CONTAINER']
@@ -64,8 +158,28 @@ def get_store(container):
         configuration['os_project_domain_name'] = CONFIG.get(
             'STORE_PROJECT_DOMAIN_NAME'
         )
+        configuration['pool_size'] = CONFIG['STORE_POOL_SIZE']
+        configuration['token_ttl'] = CONFIG['STORE_TOKEN_TTL']
         store_engine = swift.Swift(configuration)
     else:
         configuration['path'] = CONFIG['STORE_FILE_PATH']
         store_engine = filesystem.FileSystem(configuration)
     return store_engine
+
+
+def get_store(container):
+    """Return the process wide store of the container, the store and its
+    connections are created on the first call."""
+    store = _STORES.get(container)
+    if store is None:
+        with _STORES_LOCK:
+            store = _STORES.get(container)
+            if store is None:
+                store = _STORES[container] = _create_store(container)
+    return store
+
+
+def reset_stores():
+    with _STORES_LOCK:
+        _STORES.clear()
+    swift.clear_connection_pools()
@@ -16,6 +16,8 @@
 
 import uuid
 
+import flask
+
 
 class Identity:
 
@@ -100,3 +102,22 @@ class Identity:
 
     def is_not_feeder(self):
         return not self.is_feeder()
+
+
+def forget_identity(identity_id):
+    """Remove a user, remoteci or feeder from the identity cache after a
+    change of it."""
+
+    identity_id = str(identity_id)
+    flask.current_app.identity_cache.discard(
+        lambda identity: identity.id == identity_id)
+    flask.current_app.verified_passwords.forget(identity_id)
+
+
+def forget_team_identities(team_id):
+    """Remove the members of a team from the identity cache after a change
+    of the team."""
+
+    team_id = uuid.UUID(str(team_id))
+    flask.current_app.identity_cache.discard(
+        lambda identity: team_id in identity.teams)
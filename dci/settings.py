@@ -39,6 +39,13 @@ DEFAULT_SQLALCHEMY_DATABASE_URI = 'postgresql://{db_user}:{db_password}@{db_host
 )
 SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI',
                                     DEFAULT_SQLALCHEMY_DATABASE_URI)
+# Optional read-only database (e.g. a streaming replica), when unset the
+# read-only engine is the primary one
+SQLALCHEMY_READ_ONLY_DATABASE_URI = os.getenv(
+    'SQLALCHEMY_READ_ONLY_DATABASE_URI')
+# Seconds during which the GET requests of a client which just wrote are
+# routed to the primary database, to read its own writes
+READ_YOUR_WRITES_TIMEOUT = 5
 
 # The following two lines will output the SQL statements
 # executed by SQLAlchemy. Useful while debugging and in
@@ -49,8 +56,15 @@ SQLALCHEMY_RECORD_QUERIES = False
 
 SQLALCHEMY_POOL_SIZE = 20
 SQLALCHEMY_MAX_OVERFLOW = 0
+# pool size of the engine used by the command line tools
+SQLALCHEMY_ADMIN_POOL_SIZE = 2
 SQLALCHEMY_NATIVE_UNICODE = True
 
+# Number of consecutive database connection failures after which the
+# requests fail fast during DB_CIRCUIT_BREAKER_TIMEOUT seconds
+DB_CIRCUIT_BREAKER_THRESHOLD = 3
+DB_CIRCUIT_BREAKER_TIMEOUT = 10
+
 # Stores configuration, to store files and components
 # STORE
 FILE_STORE = 'file'
@@ -72,6 +86,13 @@ STORE_CONTAINER = os.getenv('STORE_CONTAINER', 'dci_components')
 STORE_FILES_CONTAINER = os.getenv('STORE_FILES_CONTAINER', 'dci_files')
 STORE_COMPONENTS_CONTAINER = os.getenv('STORE_COMPONENTS_CONTAINER',
                                        'dci_components')
+# Store the uploaded files once by sha256 in the files container
+STORE_FILES_DEDUP = os.getenv('STORE_FILES_DEDUP', 'false').lower() == 'true'
+# Number of idle Swift connections kept open by each process
+STORE_POOL_SIZE = int(os.getenv('STORE_POOL_SIZE', '8'))
+# Seconds after which the token shared by the Swift connections is renewed,
+# before the one hour default lifetime of the keystone tokens
+STORE_TOKEN_TTL = int(os.getenv('STORE_TOKEN_TTL', '3000'))
 
 # ZMQ Connection
 ZMQ_HOST = os.getenv('ZMQ_HOST', '127.0.0.1')
@@ -100,6 +121,34 @@ X_DOMAINS = '*'
 X_HEADERS = 'Authorization, Content-Type, If-Match, ETag, X-Requested-With'
 MAX_CONTENT_LENGTH = 20 * 1024 * 1024
 
+# How the list endpoints compute '_meta.count': 'exact' counts the rows in
+# the statement fetching the page, 'estimate' uses the query planner
+# estimation and 'none' skips it. COUNT_MODES overrides the default by
+# endpoint name (e.g. 'api_v1.get_all_jobs'), the 'count' query parameter
+# overrides both.
+DEFAULT_COUNT_MODE = 'exact'
+COUNT_MODES = {}
+
+# How the one-to-many embeds are loaded: 'selectin' runs one extra query per
+# embed for all the listed resources, 'join' joins them to the listing query
+# which returns one row per combination of the embedded resources.
+EMBED_LOADING = 'selectin'
+
+# Number of compiled list queries kept for the requests of the same shape:
+# same embeds, sort and filtered columns but other values.
+STATEMENT_CACHE_SIZE = 128
+
+# Number of authenticated users, remotecis and feeders kept in memory and
+# for how many seconds, their changes through the API are seen at once by
+# the process which handles them, the other ones see them after the TTL.
+IDENTITY_CACHE_SIZE = 1024
+IDENTITY_CACHE_TTL = 30
+
+# Number of successful Basic auth password checks kept in memory and for how
+# many seconds, only a keyed hash of the credentials is stored.
+VERIFIED_PASSWORDS_CACHE_SIZE = 1024
+VERIFIED_PASSWORDS_CACHE_TTL = 300
+
 FILES_UPLOAD_FOLDER = os.getenv('FILES_UPLOAD_FOLDER', '/var/lib/dci-control-server/files')  # noqa
 
 # SSO_PUBLIC_KEY is set by bin/dci-gen-pem-ks-key.py
@@ -108,6 +157,50 @@ SSO_CLIENT_ID = os.getenv('SSO_CLIENT_ID', 'dci')
 SSO_READ_ONLY_GROUP = os.getenv('SSO_READ_ONLY_GROUP', 'redhat:employees')
 SSO_URL = os.getenv('SSO_URL', 'https://sso.redhat.com')
 SSO_REALM = os.getenv('SSO_REALM', 'redhat-external')
+# The SSO public keys are read from SSO_JWKS_URI, or from the jwks_uri of
+# the SSO_URL openid configuration if it is not set.
+SSO_JWKS_URI = os.getenv('SSO_JWKS_URI')
+SSO_REQUEST_TIMEOUT = 10
+# seconds before the SSO public keys are refreshed in the background, and
+# before a key id unknown to the SSO server is looked for again
+SSO_JWKS_REFRESH_INTERVAL = 3600
+SSO_UNKNOWN_KID_TTL = 300
+# Number of verified SSO tokens kept until they expire, at most
+# SSO_TOKEN_CACHE_TTL seconds.
+SSO_TOKEN_CACHE_SIZE = 1024
+SSO_TOKEN_CACHE_TTL = 300
+
+# Number of /certs/verify decisions kept in memory and for how many seconds,
+# it is also the max-age of the successful responses.
+CERTS_ACCESS_CACHE_SIZE = 4096
+CERTS_ACCESS_CACHE_TTL = 60
+
+# Number of teams whose products and topics are kept in memory and for how
+# many seconds, the changes through the API are seen at once by the process
+# which handles them, the other ones see them after the TTL.
+TEAM_ACCESS_CACHE_SIZE = 1024
+TEAM_ACCESS_CACHE_TTL = 60
+
+# Number of topics whose latest components are kept in memory for the jobs
+# scheduling and for how many seconds.
+LATEST_COMPONENTS_CACHE_SIZE = 1024
+LATEST_COMPONENTS_CACHE_TTL = 60
+
+# Number of seconds during which the retries of a /jobs/schedule request
+# with the same Idempotency-Key header get the job of the first request.
+IDEMPOTENCY_KEY_TTL = 86400
+
+# Max number of jobs or jobstates created by a /jobs/bulk or /jobstates/bulk
+# request.
+BULK_MAX_ITEMS = 500
+
+# How the files and component files contents are sent: '' to let the API
+# send them, with the WSGI server file_wrapper for the filesystem store,
+# 'x-accel-redirect' to let nginx send them from the internal location
+# DOWNLOAD_OFFLOAD_PREFIX/<container>/<path>, mapped to the store, or
+# 'x-sendfile' to let Apache send the files of the filesystem store.
+DOWNLOAD_OFFLOAD = os.getenv('DOWNLOAD_OFFLOAD', '')
+DOWNLOAD_OFFLOAD_PREFIX = os.getenv('DOWNLOAD_OFFLOAD_PREFIX', '/_store')
 
 CA_CERT = '/etc/ssl/repo/ca.crt'
 CA_KEY = '/etc/ssl/repo/ca.key'
@@ -14,6 +14,41 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import hashlib
+
+import six
+
+CHUNK_SIZE = 65536
+
+
+class HashingReader(object):
+    """File like object reading a stream, or a content, and computing the
+    size, md5 and sha256 of the data read through it."""
+
+    def __init__(self, iterable):
+        if not hasattr(iterable, 'read'):
+            if isinstance(iterable, six.text_type):
+                iterable = iterable.encode('utf-8')
+            iterable = six.BytesIO(iterable)
+        self._stream = iterable
+        self.size = 0
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size=CHUNK_SIZE):
+        data = self._stream.read(size)
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        self.size += len(data)
+        self._md5.update(data)
+        self._sha256.update(data)
+        return data
+
+    def digests(self):
+        return {'size': self.size,
+                'md5': self._md5.hexdigest(),
+                'sha256': self._sha256.hexdigest()}
+
 
 class Store(object):
 
@@ -26,6 +61,22 @@ class Store(object):
     def get(self, filename):
         pass
 
+    def get_range(self, filename, start, stop):
+        """Return an iterator over the bytes of a file from start to stop,
+        excluded."""
+        pass
+
+    def get_local_path(self, filename):
+        """Return the path of the file on the local filesystem, or None for
+        the remote stores."""
+        return None
+
+    def rename(self, filename, new_filename):
+        """Move a stored file, without transferring its content."""
+        pass
+
     def upload(self, filename, iterable, pseudo_folder=None,
                create_container=True):
+        """Store a stream or a content and return its size, md5 and
+        sha256."""
         pass
@@ -17,6 +17,14 @@
 
 import logging
 import hashlib
+import os
+import uuid
+
+import flask
+from six.moves.urllib.parse import quote
+from werkzeug.http import http_date
+
+from dci.common import exceptions
 
 logger = logging.getLogger(__name__)
 
@@ -41,6 +49,181 @@ def get_stream_or_content_from_request(request):
         return request.stream
 
 
+# above this number of ranges the whole file is sent
+MAX_RANGES = 32
+
+
+def _parse_ranges(header, size):
+    """Return the (start, stop) byte ranges of a Range header which are
+    satisfiable for a file of size bytes, or None if the header is not a
+    valid bytes range."""
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs.strip():
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        first, sep, last = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if not first:
+                # suffix range, the last bytes of the file
+                length = int(last)
+                if length > 0 and size > 0:
+                    ranges.append((max(size - length, 0), size))
+                continue
+            start = int(first)
+            stop = int(last) + 1 if last else size
+        except ValueError:
+            return None
+        if start < 0 or stop <= start:
+            return None
+        if start < size:
+            ranges.append((start, min(stop, size)))
+    return ranges
+
+
+def _is_not_modified(etag, last_modified):
+    request = flask.request
+    if request.if_none_match:
+        return etag is not None and request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return (last_modified.replace(microsecond=0) <=
+                request.if_modified_since.replace(tzinfo=None))
+    return False
+
+
+def _if_range_matches(etag, last_modified):
+    if_range = flask.request.if_range
+    if if_range.etag is not None:
+        return etag is not None and if_range.etag == etag
+    if if_range.date is not None:
+        return (last_modified is not None and
+                last_modified.replace(microsecond=0) ==
+                if_range.date.replace(tzinfo=None))
+    return True
+
+
+def _multipart_byteranges(store, file_path, mimetype, ranges, size):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for start, stop in ranges:
+        part_headers = ('\r\n--%s\r\nContent-Type: %s\r\n'
+                        'Content-Range: bytes %d-%d/%d\r\n\r\n' %
+                        (boundary, mimetype, start, stop - 1, size))
+        parts.append((part_headers.encode('utf-8'), start, stop))
+    end = ('\r\n--%s--\r\n' % boundary).encode('utf-8')
+    length = (sum(len(h) + stop - start for h, start, stop in parts) +
+              len(end))
+
+    def generate():
+        for part_headers, start, stop in parts:
+            yield part_headers
+            for data in store.get_range(file_path, start, stop):
+                yield data
+        yield end
+
+    response = flask.Response(
+        generate(), 206,
+        content_type='multipart/byteranges; boundary=%s' % boundary)
+    response.headers['Content-Length'] = str(length)
+    return response
+
+
+def send_stored_file(store, file_path, mimetype, attachment_filename=None,
+                     etag=None, last_modified=None, size=None):
+    """Return the response sending a stored file.
+
+    The etag, last modification date and size come from the database. They
+    answer the conditional requests with a 304 and the Range requests
+    with the requested bytes only, read with store.get_range.
+
+    According to DOWNLOAD_OFFLOAD the bytes are sent by the front proxy
+    (x-accel-redirect for nginx, x-sendfile for Apache and the filesystem
+    store), which then also serves the ranges, or by the WSGI server, with
+    its wsgi.file_wrapper, for the whole files of the filesystem store.
+    The other files are streamed by the worker.
+    """
+    offload = flask.current_app.config['DOWNLOAD_OFFLOAD']
+    local_path = store.get_local_path(file_path)
+    headers = {}
+    if etag is not None:
+        headers['ETag'] = '"%s"' % etag
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+
+    if _is_not_modified(etag, last_modified):
+        return flask.Response(status=304, headers=headers)
+
+    if offload == 'x-accel-redirect':
+        response = flask.Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = quote('%s/%s/%s' % (
+            flask.current_app.config['DOWNLOAD_OFFLOAD_PREFIX'].rstrip('/'),
+            store.container, file_path))
+    elif offload == 'x-sendfile' and local_path is not None:
+        _check_local_file(local_path, file_path)
+        response = flask.Response(mimetype=mimetype)
+        response.headers['X-Sendfile'] = local_path
+    else:
+        if local_path is not None:
+            _check_local_file(local_path, file_path)
+            if size is None:
+                size = os.path.getsize(local_path)
+        response = _send_stored_bytes(store, file_path, local_path,
+                                      mimetype, size, etag, last_modified)
+
+    response.headers.extend(headers)
+    if attachment_filename is not None:
+        response.headers.set('Content-Disposition', 'attachment',
+                             filename=attachment_filename)
+    return response
+
+
+def _send_stored_bytes(store, file_path, local_path, mimetype, size, etag,
+                       last_modified):
+    ranges = None
+    range_header = flask.request.headers.get('Range')
+    if (size is not None and range_header and
+            _if_range_matches(etag, last_modified)):
+        ranges = _parse_ranges(range_header, size)
+        if ranges is not None and len(ranges) > MAX_RANGES:
+            ranges = None
+
+    if ranges == []:
+        response = flask.Response(status=416)
+        response.headers['Content-Range'] = 'bytes */%d' % size
+    elif ranges and len(ranges) == 1:
+        start, stop = ranges[0]
+        response = flask.Response(store.get_range(file_path, start, stop),
+                                  206, mimetype=mimetype)
+        response.headers['Content-Range'] = 'bytes %d-%d/%d' % (
+            start, stop - 1, size)
+        response.headers['Content-Length'] = str(stop - start)
+    elif ranges:
+        response = _multipart_byteranges(store, file_path, mimetype, ranges,
+                                         size)
+    elif local_path is not None:
+        response = flask.send_file(local_path, mimetype=mimetype,
+                                   add_etags=False, conditional=False)
+    else:
+        _, file_descriptor = store.get(file_path)
+        response = flask.send_file(file_descriptor, mimetype=mimetype,
+                                   add_etags=False, conditional=False)
+        if size is not None:
+            response.headers['Content-Length'] = str(size)
+
+    if size is not None:
+        response.headers['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _check_local_file(local_path, file_path):
+    if not os.path.isfile(local_path):
+        raise exceptions.StoreExceptions('Error while accessing file %s: '
+                                         'not found' % file_path,
+                                         status_code=404)
+
+
 def build_file_path(root, middle, file_id):
     root = str(root)
     middle = str(middle)
@@ -48,6 +231,10 @@ def build_file_path(root, middle, file_id):
     return "%s/%s/%s" % (root, middle, file_id)
 
 
+def build_blob_path(sha256):
+    return "blobs/%s/%s" % (sha256[:2], sha256)
+
+
 def md5Checksum(filePath):
     with open(filePath, 'rb') as fh:
         m = hashlib.md5()
@@ -20,6 +20,7 @@ from dci.stores import files_utils
 
 import os
 import errno
+import tempfile
 
 
 class FileSystem(stores.Store):
@@ -44,7 +45,7 @@ class FileSystem(stores.Store):
     def get(self, filename):
         file_path = os.path.join(self._root_directory, filename)
         try:
-            return ([], open(file_path, 'r'))
+            return ([], open(file_path, 'rb'))
         except IOError as e:
             status_code = 400
             if e.errno == errno.ENOENT:
@@ -53,6 +54,24 @@ class FileSystem(stores.Store):
                                              '%s: %s' % (filename, str(e)),
                                              status_code=status_code)
 
+    def get_range(self, filename, start, stop):
+        _, f = self.get(filename)
+        f.seek(start)
+        return self._read(f, stop - start)
+
+    @staticmethod
+    def _read(f, length):
+        with f:
+            while length > 0:
+                data = f.read(min(length, stores.CHUNK_SIZE))
+                if not data:
+                    break
+                length -= len(data)
+                yield data
+
+    def get_local_path(self, filename):
+        return os.path.join(self._root_directory, filename)
+
     def head(self, filename):
         file_path = os.path.join(self._root_directory, filename)
         try:
@@ -68,6 +87,20 @@ class FileSystem(stores.Store):
         return {'content-length': file_size, 'etag': md5,
                 'content-type': 'application/octet-stream'}
 
+    def rename(self, filename, new_filename):
+        new_path = os.path.join(self._root_directory, new_filename)
+        if not os.path.exists(os.path.dirname(new_path)):
+            os.makedirs(os.path.dirname(new_path))
+        try:
+            os.rename(os.path.join(self._root_directory, filename), new_path)
+        except OSError as e:
+            status_code = 400
+            if e.errno == errno.ENOENT:
+                status_code = 404
+            raise exceptions.StoreExceptions('Error while renaming file '
+                                             '%s: %s' % (filename, str(e)),
+                                             status_code=status_code)
+
     def upload(self, filename, iterable, pseudo_folder=None,
                create_container=True):
         file_path = os.path.join(self._root_directory, filename)
@@ -75,12 +108,20 @@ class FileSystem(stores.Store):
         if not os.path.exists(path):
             os.makedirs(path)
 
-        with open(file_path, 'wb') as f:
-            if hasattr(iterable, 'read'):
+        # the file appears under its name only once completely written
+        fd, tmp_path = tempfile.mkstemp(dir=path, prefix='.upload-')
+        # same mode as the files created with open()
+        os.chmod(tmp_path, 0o644)
+        reader = stores.HashingReader(iterable)
+        try:
+            with os.fdopen(fd, 'wb') as f:
                 while True:
-                    data = iterable.read(1024)
+                    data = reader.read()
                     if not data:
                         break
                     f.write(data)
-            else:
-                f.write(iterable)
+            os.rename(tmp_path, file_path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        return reader.digests()
@@ -17,9 +17,182 @@
 from dci import stores
 from dci.common import exceptions
 
+import contextlib
+import json
 import os
+import threading
+import time
+
 import swiftclient
 
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+class ConnectionPool(object):
+    """Thread safe pool of swift connections sharing one token.
+
+    The token is requested once for the whole pool and renewed token_ttl
+    seconds later, before keystone expires it. A connection is used by one
+    thread at a time and up to maxsize idle connections are kept open.
+    """
+
+    def __init__(self, options, maxsize=8, token_ttl=3000, timer=time.time):
+        self.maxsize = maxsize
+        self.token_ttl = token_ttl
+        self.authentications = 0
+        self.created = 0
+        self._options = options
+        self._timer = timer
+        self._url = None
+        self._token = None
+        self._expires_at = 0
+        self._idle = []
+        self._tokens_in_use = {}
+        self._lock = threading.Lock()
+        self._auth_lock = threading.Lock()
+
+    def _create_connection(self, **kwargs):
+        options = dict(self._options, **kwargs)
+        options['os_options'] = dict(options.get('os_options') or {})
+        return swiftclient.client.Connection(**options)
+
+    def get_token(self):
+        """Return the storage url and the token, authenticate if the token
+        is missing or about to expire."""
+        with self._auth_lock:
+            if self._token is None or self._expires_at <= self._timer():
+                self._url, self._token = self._create_connection().get_auth()
+                self._expires_at = self._timer() + self.token_ttl
+                self.authentications += 1
+            return self._url, self._token
+
+    def get(self):
+        url, token = self.get_token()
+        with self._lock:
+            connection = self._idle.pop() if self._idle else None
+            if connection is None:
+                self.created += 1
+        if connection is None:
+            connection = self._create_connection(preauthurl=url,
+                                                 preauthtoken=token)
+        else:
+            connection.url, connection.token = url, token
+        with self._lock:
+            self._tokens_in_use[id(connection)] = token
+        return connection
+
+    def put(self, connection, discard=False):
+        with self._lock:
+            token = self._tokens_in_use.pop(id(connection), None)
+        if connection.token and connection.token != token:
+            # swiftclient authenticated again after a 401, the token
+            # expired sooner than expected so share the new one
+            with self._auth_lock:
+                if self._token == token:
+                    self._url, self._token = connection.url, connection.token
+                    self._expires_at = self._timer() + self.token_ttl
+        with self._lock:
+            if not discard and len(self._idle) < self.maxsize:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    @contextlib.contextmanager
+    def connection(self):
+        connection = self.get()
+        try:
+            yield connection
+        except swiftclient.exceptions.ClientException:
+            self.put(connection)
+            raise
+        except Exception:
+            self.put(connection, discard=True)
+            raise
+        self.put(connection)
+
+    def clear(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def stats(self):
+        return {'idle': len(self._idle),
+                'in_use': len(self._tokens_in_use),
+                'maxsize': self.maxsize,
+                'created': self.created,
+                'authentications': self.authentications}
+
+
+class _PooledBody(object):
+    """File like object reading an object body and giving its connection
+    back to the pool at the end of the content, or when it is closed
+    before."""
+
+    def __init__(self, pool, connection, body):
+        self._pool = pool
+        self._connection = connection
+        self._body = body
+
+    def read(self, size=-1):
+        if self._body is None:
+            return b''
+        data = self._body.read(size if size is not None and size >= 0
+                               else None)
+        if not data:
+            self._release(discard=False)
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(stores.CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        # a partially read response leaves the connection unusable
+        self._release(discard=True)
+
+    def _release(self, discard):
+        body, self._body = self._body, None
+        if body is None:
+            return
+        if discard:
+            body.close()
+        self._pool.put(self._connection, discard=discard)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def get_connection_pool(options, maxsize=8, token_ttl=3000):
+    """Return the process wide pool of the connections using these
+    credentials, the pool is created on the first call."""
+    key = json.dumps(options, sort_keys=True)
+    pool = _POOLS.get(key)
+    if pool is None:
+        with _POOLS_LOCK:
+            pool = _POOLS.get(key)
+            if pool is None:
+                pool = _POOLS[key] = ConnectionPool(options, maxsize,
+                                                    token_ttl)
+    return pool
+
+
+def clear_connection_pools():
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.clear()
+        _POOLS.clear()
+
 
 class Swift(stores.Store):
 
@@ -67,53 +240,112 @@ class Swift(stores.Store):
                     del(self.os_options[opt])
 
         self.container = conf.get('container')
-        self.connection = self.get_connection()
-
-    def get_connection(self):
-        return swiftclient.client.Connection(auth_version=self.os_auth_version,
-                                             user=self.os_username,
-                                             key=self.os_password,
-                                             tenant_name=self.os_tenant_name,
-                                             os_options=self.os_options,
-                                             authurl=self.os_auth_url)
+        self._container_exists = False
+        self.pool = get_connection_pool(
+            {'auth_version': self.os_auth_version,
+             'user': self.os_username,
+             'key': self.os_password,
+             'tenant_name': self.os_tenant_name,
+             'os_options': self.os_options,
+             'authurl': self.os_auth_url},
+            maxsize=conf.get('pool_size', 8),
+            token_ttl=conf.get('token_ttl', 3000))
 
     def delete(self, filename):
         try:
-            self.connection.delete_object(self.container, filename,
-                                          headers={'X-Delete-After': 1})
+            with self.pool.connection() as connection:
+                connection.delete_object(self.container, filename,
+                                         headers={'X-Delete-After': 1})
         except swiftclient.exceptions.ClientException as e:
             raise exceptions.StoreExceptions('Error while deleting file '
                                              '%s: %s' % (filename, str(e)),
                                              status_code=e.http_status)
 
     def get(self, filename):
+        connection = self.pool.get()
+        try:
+            headers, body = connection.get_object(
+                self.container, filename, resp_chunk_size=stores.CHUNK_SIZE)
+        except swiftclient.exceptions.ClientException as exc:
+            self.pool.put(connection)
+            raise exceptions.StoreExceptions('Error while getting file '
+                                             '%s: %s' % (filename, str(exc)),
+                                             status_code=exc.http_status)
+        return headers, _PooledBody(self.pool, connection, body)
+
+    def get_range(self, filename, start, stop):
+        headers = {'Range': 'bytes=%d-%d' % (start, stop - 1)}
+        connection = self.pool.get()
         try:
-            return self.connection.get_object(self.container, filename,
-                                              resp_chunk_size=65535)
+            _, body = connection.get_object(
+                self.container, filename, headers=headers,
+                resp_chunk_size=stores.CHUNK_SIZE)
         except swiftclient.exceptions.ClientException as exc:
+            self.pool.put(connection)
             raise exceptions.StoreExceptions('Error while getting file '
                                              '%s: %s' % (filename, str(exc)),
                                              status_code=exc.http_status)
+        return _PooledBody(self.pool, connection, body)
 
     def head(self, filename):
         try:
-            return self.connection.head_object(self.container, filename)
+            with self.pool.connection() as connection:
+                return connection.head_object(self.container, filename)
         except swiftclient.exceptions.ClientException as exc:
             raise exceptions.StoreExceptions('Error while heading file '
                                              '%s: %s' % (filename, str(exc)),
                                              status_code=exc.http_status)
 
+    def rename(self, filename, new_filename):
+        try:
+            with self.pool.connection() as connection:
+                # server side copy
+                connection.copy_object(
+                    self.container, filename,
+                    destination='/%s/%s' % (self.container, new_filename))
+                connection.delete_object(self.container, filename)
+        except swiftclient.exceptions.ClientException as exc:
+            raise exceptions.StoreExceptions('Error while renaming file '
+                                             '%s: %s' % (filename, str(exc)),
+                                             status_code=exc.http_status)
+
     def upload(self, file_path, iterable, pseudo_folder=None,
                create_container=True):
+        if create_container and not self._container_exists:
+            self._create_container(file_path)
+
+        reader = stores.HashingReader(iterable)
         try:
-            self.connection.head_container(self.container)
+            with self.pool.connection() as connection:
+                etag = connection.put_object(self.container, file_path,
+                                             reader,
+                                             chunk_size=stores.CHUNK_SIZE)
         except swiftclient.exceptions.ClientException as exc:
-            if exc.http_status == 404 and create_container:
+            if exc.http_status == 404:
+                # the container was removed, check it on the next upload
+                self._container_exists = False
+            raise exceptions.StoreExceptions('Error while uploading file '
+                                             '%s: %s' % (file_path, str(exc)),
+                                             status_code=exc.http_status)
+        digests = reader.digests()
+        if etag and etag != digests['md5']:
+            raise exceptions.StoreExceptions('Error while uploading file '
+                                             '%s: corrupted upload' % file_path,
+                                             status_code=500)
+        return digests
+
+    def _create_container(self, file_path):
+        with self.pool.connection() as connection:
+            try:
+                connection.head_container(self.container)
+            except swiftclient.exceptions.ClientException as exc:
+                if exc.http_status != 404:
+                    # let the upload report the error
+                    return
                 try:
-                    self.connection.put_container(self.container)
+                    connection.put_container(self.container)
                 except swiftclient.exceptions.ClientException as exc:
                     raise exceptions.StoreExceptions('Error while creating file '  # noqa
                                                      '%s: %s' % (file_path, str(exc)),  # noqa
                                                      status_code=exc.http_status)  # noqa
-
-        self.connection.put_object(self.container, file_path, iterable)
+        self._container_exists = True
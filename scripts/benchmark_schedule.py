@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+Load benchmark of POST /jobs/schedule.
+
+It creates a team, a product, a topic with one component and as many
+remotecis as requested, then each remoteci schedules its jobs from its own
+thread, like hundreds of remotecis starting at once. A part of the
+requests are retried with the same Idempotency-Key to also measure the
+deduplicated ones. The throughput and the latency percentiles are
+printed at the end.
+
+Run it against a server started with scripts/start_api.sh on a local
+PostgreSQL:
+
+    python scripts/benchmark_schedule.py --remotecis 200 --jobs 10
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from dciauth.v2.headers import generate_headers
+import requests
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--remotecis', type=int, default=50,
+                        help='number of concurrent remotecis')
+    parser.add_argument('--jobs', type=int, default=10,
+                        help='number of jobs scheduled by each remoteci')
+    parser.add_argument('--retries', type=float, default=0.1,
+                        help='ratio of the requests sent twice with the '
+                             'same Idempotency-Key')
+    return parser.parse_args()
+
+
+def admin_post(args, endpoint, data):
+    r = requests.post('%s/api/v1/%s' % (args.url, endpoint), json=data,
+                      auth=(args.login, args.password))
+    r.raise_for_status()
+    return r.json()
+
+
+def provision(args):
+    suffix = uuid.uuid4().hex[:8]
+    team = admin_post(args, 'teams', {'name': 'bench-%s' % suffix})['team']
+    product = admin_post(args, 'products',
+                         {'name': 'bench-%s' % suffix})['product']
+    admin_post(args, 'products/%s/teams' % product['id'],
+               {'team_id': team['id']})
+    topic = admin_post(args, 'topics', {'name': 'bench-%s' % suffix,
+                                        'product_id': product['id'],
+                                        'component_types': ['bench']})['topic']
+    admin_post(args, 'topics/%s/teams' % topic['id'], {'team_id': team['id']})
+    admin_post(args, 'components', {'name': 'bench-%s' % suffix,
+                                    'type': 'bench',
+                                    'topic_id': topic['id']})
+    remotecis = [admin_post(args, 'remotecis',
+                            {'name': 'bench-%s-%s' % (suffix, i),
+                             'team_id': team['id']})['remoteci']
+                 for i in range(args.remotecis)]
+    return topic, remotecis
+
+
+def schedule(args, remoteci, data, idempotency_key):
+    url = '%s/api/v1/jobs/schedule' % args.url
+    body = json.dumps(data)
+    headers = generate_headers(
+        {'method': 'POST',
+         'endpoint': '/api/v1/jobs/schedule',
+         'params': {},
+         'data': body,
+         'host': urlparse(url).netloc},
+        {'access_key': 'remoteci/%s' % remoteci['id'],
+         'secret_key': remoteci['api_secret']})
+    headers.update({'Content-Type': 'application/json',
+                    'Idempotency-Key': idempotency_key})
+    return requests.post(url, data=body, headers=headers)
+
+
+def run_remoteci(args, topic, remoteci, results):
+    session_results = []
+    retry_every = int(1 / args.retries) if args.retries > 0 else 0
+    for i in range(args.jobs):
+        key = str(uuid.uuid4())
+        sends = 2 if retry_every and i % retry_every == 0 else 1
+        for _ in range(sends):
+            start = time.time()
+            r = schedule(args, remoteci, {'topic_id': topic['id']}, key)
+            session_results.append((time.time() - start, r.status_code,
+                                    r.headers.get('Idempotent-Replayed')))
+    results.extend(session_results)
+
+
+def percentile(values, p):
+    index = min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def main():
+    args = parse_args()
+    topic, remotecis = provision(args)
+
+    results = []
+    threads = [threading.Thread(target=run_remoteci,
+                                args=(args, topic, remoteci, results))
+               for remoteci in remotecis]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.time() - start
+
+    latencies = sorted(r[0] for r in results)
+    errors = len([r for r in results if r[1] != 201])
+    replayed = len([r for r in results if r[2] == 'true'])
+    print('requests:   %s (%s replayed, %s errors)'
+          % (len(results), replayed, errors))
+    print('duration:   %.2fs' % duration)
+    print('throughput: %.1f req/s' % (len(results) / duration))
+    for p in (50, 90, 99):
+        print('p%s:        %.1f ms' % (p, percentile(latencies, p) * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""
+Throughput benchmark of the Swift store.
+
+It starts the in memory Swift server of the tests, with a delay on each
+authentication to emulate keystone, then each thread uploads and
+downloads files. The pooled mode uses the process wide connection pool,
+the fresh mode authenticates and connects for each file like the stores
+did before. The throughput and the number of authentications and TCP
+connections are printed at the end.
+
+    python scripts/benchmark_swift_store.py --threads 8 --files 50
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dci.stores import swift  # noqa
+from tests import fake_swift  # noqa
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--mode', choices=['pooled', 'fresh'],
+                        default='pooled')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--files', type=int, default=50,
+                        help='number of files uploaded by each thread')
+    parser.add_argument('--size', type=int, default=65536,
+                        help='size of the files in bytes')
+    parser.add_argument('--auth-delay', type=float, default=0.05,
+                        help='seconds spent in each authentication')
+    return parser.parse_args()
+
+
+def get_store(args, configuration):
+    store = swift.Swift(configuration)
+    if args.mode == 'fresh':
+        store.pool = swift.ConnectionPool(store.pool._options)
+    return store
+
+
+def run(args, configuration, index):
+    content = os.urandom(args.size)
+    for i in range(args.files):
+        file_path = 'thread-%s/file-%s' % (index, i)
+        get_store(args, configuration).upload(file_path, content)
+        _, body = get_store(args, configuration).get(file_path)
+        assert b''.join(body) == content
+
+
+def main():
+    args = parse_args()
+    server = fake_swift.FakeSwift(auth_delay=args.auth_delay).start()
+    configuration = server.store_configuration('benchmark')
+
+    threads = [threading.Thread(target=run, args=(args, configuration, i))
+               for i in range(args.threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.time() - start
+    server.stop()
+
+    operations = args.threads * args.files * 2
+    print('mode:            %s' % args.mode)
+    print('operations:      %s' % operations)
+    print('duration:        %.2fs' % duration)
+    print('throughput:      %.1f op/s' % (operations / duration))
+    print('authentications: %s' % server.counters['authentications'])
+    print('connections:     %s' % server.counters['connections'])
+
+
+if __name__ == '__main__':
+    main()
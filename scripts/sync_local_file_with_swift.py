@@ -10,7 +10,7 @@ from sqlalchemy import sql
 
 conf = dci_config.CONFIG
 swift = dci_config.get_store('files')
-engine = dci_config.get_engine(conf).connect()
+engine = dci_config.get_engine(dci_config.ADMIN).connect()
 
 _TABLE = models.FILES
 
@@ -64,5 +64,7 @@ setuptools.setup(
     scripts=[
         'bin/dci-dbsync',
         'bin/dci-dbinit',
-        'bin/dci-purge-swift-components'
+        'bin/dci-purge-swift-components',
+        'bin/dci-rebuild-global-status',
+        'bin/dci-rebuild-trends'
     ])
@@ -15,6 +15,8 @@
 # under the License.
 from OpenSSL.crypto import load_certificate, FILETYPE_PEM
 
+from dci.db import models
+
 
 def get_certificate_headers(remoteci_context, remoteci, product, topic, component):
     keys = remoteci_context.put(
@@ -86,3 +88,56 @@ def test_user_cert_verified_if_user_team_in_RHEL81(
     )
     request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
     assert request.status_code == 200
+
+
+def test_verify_repo_access_decisions_cache(
+    admin, app, engine, remoteci, RHELProduct, RHEL81Topic, RHEL81Component
+):
+    with engine.begin() as db_conn:
+        db_conn.execute(
+            models.REMOTECIS.update()
+            .where(models.REMOTECIS.c.id == remoteci["id"])
+            .values(cert_fp="0a1b2c3d")
+        )
+    certificate_headers = {
+        "SSLVerify": "SUCCESS",
+        "SSLFingerprint": "0a1b2c3d",
+        "X-Original-URI": "%s/%s/%s/" % (
+            RHELProduct["id"], RHEL81Topic["id"], RHEL81Component["id"]),
+    }
+    request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
+    assert request.status_code == 403
+    admin.post(
+        "/api/v1/products/%s/teams" % RHELProduct["id"],
+        data={"team_id": remoteci["team_id"]},
+    )
+    admin.post(
+        "/api/v1/topics/%s/teams" % RHEL81Topic["id"],
+        data={"team_id": remoteci["team_id"]},
+    )
+    request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
+    assert request.status_code == 200
+    assert request.headers["Cache-Control"] == "private, max-age=60"
+
+    hits = app.certs_access_cache.hits
+    request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
+    assert request.status_code == 200
+    assert app.certs_access_cache.hits == hits + 1
+
+    admin.delete(
+        "/api/v1/topics/%s/teams/%s" % (RHEL81Topic["id"], remoteci["team_id"])
+    )
+    request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
+    assert request.status_code == 403
+    assert "is not associated to the topic" in request.data["message"]
+
+
+def test_verify_repo_access_invalid_url(admin, RHELProduct, RHEL81Topic):
+    certificate_headers = {
+        "SSLVerify": "SUCCESS",
+        "SSLFingerprint": "0a1b2c3d",
+        "X-Original-URI": "%s/%s/not-an-id/" % (
+            RHELProduct["id"], RHEL81Topic["id"]),
+    }
+    request = admin.get("/api/v1/certs/verify", headers=certificate_headers)
+    assert request.status_code == 403
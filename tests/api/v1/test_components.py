@@ -119,6 +119,16 @@ def test_get_all_components(admin, topic_id):
     assert db_all_cs_ids == created_c_ids
 
 
+def test_get_all_components_with_fields(admin, topic_id):
+    admin.post('/api/v1/components',
+               data={'name': 'pname', 'type': 'gerrit_review',
+                     'topic_id': topic_id, 'data': {'foo': 'bar'}})
+    cs = admin.get('/api/v1/topics/%s/components?fields=name,type'
+                   % topic_id).data['components']
+    assert sorted(cs[0].keys()) == ['id', 'name', 'type']
+    assert cs[0]['name'] == 'pname'
+
+
 def test_get_all_components_not_in_topic(admin, user, product_openstack):
     topic = admin.post('/api/v1/topics',
                        data={'name': 'topic_test',
@@ -499,6 +509,29 @@ def test_verify_and_get_components_ids(engine, admin, topic, topic_user_id):
     assert set(cids) == {c1, c3}
 
 
+def test_verify_and_get_components_ids_errors(engine, admin, topic,
+                                              topic_user_id):
+    c1 = create_component(admin, topic_user_id, 'type1', 'n1')
+    c2 = create_component(admin, topic_user_id, 'type1', 'n2')
+    c3 = create_component(admin, topic['id'], 'type2', 'n3')
+    missing_id = str(uuid.uuid4())
+    with pytest.raises(dci_exc.DCIException) as e:
+        components.verify_and_get_components_ids(
+            topic_user_id,
+            [c1, c2, c3, missing_id, 'not-an-uuid'],
+            ['type_1', 'type_2', 'type_3', 'type_4', 'type_5'],
+            db_conn=engine)
+    assert e.value.status_code == 412
+    assert e.value.message == 'Component types malformed: type type1 ' \
+                              'duplicated.'
+    errors = [(error['id'], error['error'])
+              for error in e.value.payload['errors']]
+    assert errors == [(c2, 'duplicated_type'),
+                      (c3, 'wrong_topic'),
+                      (missing_id, 'not_found'),
+                      ('not-an-uuid', 'not_found')]
+
+
 def test_add_tags_components(admin, components_ids):
     pt = admin.post('/api/v1/components/%s/tags' % (components_ids[0]),
                     data={'name': 'my_tag'})
@@ -123,3 +123,19 @@ def test_components_export_control_false(user, epm, team_user_id,
         assert user.get('/api/v1/components/%s/files' % components_user_ids[0]).status_code == 401  # noqa
         assert user.get('/api/v1/components/%s/files/%s' % (components_user_ids[0], c_file_1_id)).status_code == 401  # noqa
         assert user.get('/api/v1/components/%s/files/%s/content' % (components_user_ids[0], c_file_1_id)).status_code == 401  # noqa
+
+
+def test_team_access_cache(app, user, admin, team_user_id, topic_user_id):
+    url = '/api/v1/topics/%s/components' % topic_user_id
+    assert user.get(url).status_code == 200
+    misses = app.team_access_cache.misses
+    assert user.get(url).status_code == 200
+    assert app.team_access_cache.misses == misses
+
+    # the cached access of the team is updated, not loaded again
+    admin.delete('/api/v1/topics/%s/teams/%s' % (topic_user_id, team_user_id))
+    assert user.get(url).status_code == 401
+    admin.post('/api/v1/topics/%s/teams' % topic_user_id,
+               data={'team_id': team_user_id})
+    assert user.get(url).status_code == 200
+    assert app.team_access_cache.misses == misses
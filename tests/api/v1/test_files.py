@@ -17,6 +17,9 @@
 from __future__ import unicode_literals
 
 import base64
+import hashlib
+import os
+import uuid
 
 import flask
 import mock
@@ -43,6 +46,7 @@ def test_create_files(user, jobstate_user_id):
 
     assert file['name'] == 'kikoolol'
     assert file['size'] == 7
+    assert file['md5'] == hashlib.md5(b'content').hexdigest()
 
 
 def test_create_files_jobstate_id_and_job_id_missing(admin):
@@ -191,6 +195,95 @@ def test_get_file_content_as_user(user, jobstate_user_id):
     assert get_file.data == content
 
 
+def test_get_file_content_offload(app, user, jobstate_user_id):
+    file_id = t_utils.post_file(user, jobstate_user_id,
+                                FileDesc('foo bar', 'content'))
+    file = user.get('/api/v1/files/%s' % file_id).data['file']
+    file_path = files_utils.build_file_path(file['team_id'], file['job_id'],
+                                            file_id)
+    url = '/api/v1/files/%s/content' % file_id
+
+    with mock.patch.dict(app.config, {'DOWNLOAD_OFFLOAD': 'x-accel-redirect'}):
+        r = user.get(url)
+    assert r.status_code == 200
+    assert r.data == ''
+    assert (r.headers['X-Accel-Redirect'] ==
+            '/_store/%s/%s' % (dci_config.CONFIG['STORE_FILES_CONTAINER'],
+                               file_path))
+    assert 'filename=foo_bar' in r.headers['Content-Disposition']
+
+    with mock.patch.dict(app.config, {'DOWNLOAD_OFFLOAD': 'x-sendfile'}):
+        r = user.get(url)
+    assert r.status_code == 200
+    local_path = dci_config.get_store('files').get_local_path(file_path)
+    assert r.headers['X-Sendfile'] == local_path
+
+    os.remove(local_path)
+    with mock.patch.dict(app.config, {'DOWNLOAD_OFFLOAD': 'x-sendfile'}):
+        assert user.get(url).status_code == 404
+    assert user.get(url).status_code == 404
+
+
+def test_get_file_content_ranges(user, jobstate_user_id):
+    content = '0123456789'
+    file_id = t_utils.post_file(user, jobstate_user_id,
+                                FileDesc('foo', content))
+    file = user.get('/api/v1/files/%s' % file_id).data['file']
+
+    def _get(**headers):
+        # the headers of the client are kept from one request to the other
+        request_headers = dict.fromkeys(['Range', 'If-Range',
+                                         'If-None-Match',
+                                         'If-Modified-Since'], '')
+        request_headers.update(headers)
+        return user.get('/api/v1/files/%s/content' % file_id,
+                        headers=request_headers)
+
+    r = _get()
+    assert r.status_code == 200
+    assert r.data == content
+    assert r.headers['ETag'] == '"%s"' % file['md5']
+    assert r.headers['Accept-Ranges'] == 'bytes'
+    last_modified = r.headers['Last-Modified']
+
+    assert _get(**{'If-None-Match': r.headers['ETag']}).status_code == 304
+    assert _get(**{'If-None-Match': '"other"'}).status_code == 200
+    r = _get(**{'If-Modified-Since': last_modified})
+    assert r.status_code == 304
+
+    r = _get(Range='bytes=2-4')
+    assert r.status_code == 206
+    assert r.data == '234'
+    assert r.headers['Content-Range'] == 'bytes 2-4/10'
+
+    r = _get(Range='bytes=-3')
+    assert r.status_code == 206
+    assert r.data == '789'
+
+    r = _get(Range='bytes=8-')
+    assert r.data == '89'
+
+    r = _get(Range='bytes=0-1,5-6')
+    assert r.status_code == 206
+    assert r.headers['Content-Type'].startswith('multipart/byteranges')
+    assert 'Content-Range: bytes 0-1/10\r\n\r\n01\r\n' in r.data
+    assert 'Content-Range: bytes 5-6/10\r\n\r\n56\r\n' in r.data
+    assert int(r.headers['Content-Length']) == len(r.data)
+
+    r = _get(Range='bytes=20-30')
+    assert r.status_code == 416
+    assert r.headers['Content-Range'] == 'bytes */10'
+
+    # the whole file is sent when it changed or the range is not valid
+    r = _get(Range='bytes=2-4', **{'If-Range': '"other"'})
+    assert r.status_code == 200
+    r = _get(Range='bytes=2-4', **{'If-Range': r.headers['ETag']})
+    assert r.status_code == 206
+    r = _get(Range='lines=2-4')
+    assert r.status_code == 200
+    assert r.data == content
+
+
 def test_change_file_to_invalid_state(admin, file_user_id):
     t = admin.get('/api/v1/files/' + file_user_id).data['file']
     data = {'state': 'kikoolol'}
@@ -334,6 +427,96 @@ def test_purge(app, admin, user, jobstate_user_id, team_user_id, job_user_id):
     assert len(to_purge['files']) == 0
 
 
+def test_files_dedup(monkeypatch, admin, user, jobstate_user_id):
+    monkeypatch.setitem(dci_config.CONFIG, 'STORE_FILES_DEDUP', True)
+    content = 'same ansible log'
+    sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    file_id1 = t_utils.post_file(user, jobstate_user_id,
+                                 FileDesc('log1', content))
+    file_id2 = t_utils.post_file(user, jobstate_user_id,
+                                 FileDesc('log2', content))
+    t_utils.post_file(user, jobstate_user_id, FileDesc('other', 'other'))
+
+    file = user.get('/api/v1/files/%s' % file_id2).data['file']
+    assert file['sha256'] == sha256
+    for file_id in (file_id1, file_id2):
+        r = user.get('/api/v1/files/%s/content' % file_id)
+        assert r.data == content
+
+    store = dci_config.get_store('files')
+    blob_path = files_utils.build_blob_path(sha256)
+    local_dir = os.path.dirname(store.get_local_path(blob_path))
+    assert os.listdir(local_dir) == [sha256]
+
+    assert user.get('/api/v1/files/dedup').status_code == 401
+    report = admin.get('/api/v1/files/dedup').data['dedup']
+    assert report == {'files': 3,
+                      'files_size': 2 * len(content) + 5,
+                      'blobs': 2,
+                      'blobs_size': len(content) + 5,
+                      'bytes_saved': len(content),
+                      'dedup_ratio': round((2. * len(content) + 5) /
+                                           (len(content) + 5), 2)}
+
+    # the blob is kept until the last file using it is purged
+    user.delete('/api/v1/files/%s' % file_id1)
+    assert admin.post('/api/v1/files/purge').status_code == 204
+    assert user.get('/api/v1/files/%s/content' % file_id2).data == content
+    assert admin.get('/api/v1/files/dedup').data['dedup']['files'] == 2
+
+    user.delete('/api/v1/files/%s' % file_id2)
+    assert admin.post('/api/v1/files/purge').status_code == 204
+    with pytest.raises(dci_exc.StoreExceptions):
+        store.get(blob_path)
+    report = admin.get('/api/v1/files/dedup').data['dedup']
+    assert report['blobs'] == 1
+    assert report['bytes_saved'] == 0
+
+
+def test_files_dedup_insert_failure(monkeypatch, app, user,
+                                    jobstate_user_id):
+    monkeypatch.setitem(dci_config.CONFIG, 'STORE_FILES_DEDUP', True)
+    content = 'junit %s' % uuid.uuid4()
+    blob_path = files_utils.build_blob_path(
+        hashlib.sha256(content.encode('utf-8')).hexdigest())
+
+    with mock.patch('dci.api.v1.files._process_junit_file') as m_process:
+        m_process.side_effect = dci_exc.DCIException('error')
+        r = user.post('/api/v1/files',
+                      headers={'DCI-JOBSTATE-ID': jobstate_user_id,
+                               'DCI-NAME': 'junit',
+                               'DCI-MIME': 'application/junit',
+                               'Content-Type': 'text/plain'},
+                      data=content)
+    assert r.status_code == 400
+
+    # the refcount is rolled back and the content was not moved to a blob
+    with pytest.raises(dci_exc.StoreExceptions):
+        dci_config.get_store('files').get(blob_path)
+    with app.engine.connect() as conn:
+        assert conn.execute('SELECT count(*) FROM blobs').scalar() == 0
+
+
+def test_files_dedup_purge_after_commit(monkeypatch, app, admin, user,
+                                        jobstate_user_id):
+    monkeypatch.setitem(dci_config.CONFIG, 'STORE_FILES_DEDUP', True)
+    file_id = t_utils.post_file(user, jobstate_user_id,
+                                FileDesc('log', 'content'))
+    user.delete('/api/v1/files/%s' % file_id)
+
+    def delete(file_path):
+        # the blob is only deleted once its removal is committed
+        with app.engine.connect() as conn:
+            assert conn.execute('SELECT count(*) FROM blobs').scalar() == 0
+        raise dci_exc.StoreExceptions('error')
+
+    with mock.patch('dci.stores.filesystem.FileSystem.delete') as m_delete:
+        m_delete.side_effect = delete
+        assert admin.post('/api/v1/files/purge').status_code == 204
+        assert m_delete.call_count == 1
+    assert len(admin.get('/api/v1/files/purge').data['files']) == 0
+
+
 def test_purge_failure(app, admin, user, jobstate_user_id, job_user_id,
                        team_user_id):
     # create two files and archive them
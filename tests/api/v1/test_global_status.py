@@ -16,6 +16,9 @@
 from dci.api.v1.global_status import add_percentage_of_success
 from dci.api.v1.global_status import format_global_status
 from dci.api.v1.global_status import insert_component_with_no_job
+from dci.db import global_status as db_global_status
+
+from tests.conftest import create_components
 
 
 def test_global_status(admin, user, job_user_id):
@@ -28,6 +31,48 @@ def test_global_status(admin, user, job_user_id):
     assert global_status[0]['percentageOfSuccess'] == 100
 
 
+def _get_components_jobs(admin):
+    global_status = admin.get('/api/v1/global_status').data['globalStatus']
+    return {c['id']: [(j['id'], j['status']) for j in c['jobs']]
+            for c in global_status}
+
+
+def test_global_status_is_maintained(admin, user, remoteci_context, engine,
+                                     components_user_ids, topic_user_id):
+    data = {'components_ids': components_user_ids,
+            'topic_id': topic_user_id}
+    job_1 = remoteci_context.post('/api/v1/jobs/schedule',
+                                  data=data).data['job']['id']
+    job_2 = remoteci_context.post('/api/v1/jobs/schedule',
+                                  data=data).data['job']['id']
+    latest_component_id = components_user_ids[-1]
+    assert _get_components_jobs(admin)[latest_component_id] == []
+
+    user.post('/api/v1/jobstates', data={'job_id': job_1, 'status': 'success'})
+    components_jobs = _get_components_jobs(admin)
+    assert components_jobs[latest_component_id] == [(job_1, 'success')]
+
+    user.post('/api/v1/jobstates', data={'job_id': job_2, 'status': 'running'})
+    user.post('/api/v1/jobstates', data={'job_id': job_2, 'status': 'failure'})
+    components_jobs = _get_components_jobs(admin)
+    assert components_jobs[latest_component_id] == [(job_2, 'failure')]
+
+    # the latest job isn't finished anymore
+    user.post('/api/v1/jobstates', data={'job_id': job_2, 'status': 'running'})
+    components_jobs = _get_components_jobs(admin)
+    assert components_jobs[latest_component_id] == [(job_1, 'success')]
+
+    with engine.connect() as db_conn:
+        db_global_status.rebuild(db_conn)
+    assert _get_components_jobs(admin) == components_jobs
+
+    # a new component becomes the latest one of the topic, the jobs of the
+    # previous one aren't shown anymore
+    create_components(admin, topic_user_id, ['type_1'])
+    components_jobs = _get_components_jobs(admin)
+    assert all(jobs == [] for jobs in components_jobs.values())
+
+
 def test_insert_component_with_no_job():
 
     jobs = [{
@@ -70,6 +70,50 @@ def test_create_jobs_bad_previous_job_id(remoteci_context,
     assert r.status_code == 400
 
 
+def test_create_jobs_unknown_components(admin, remoteci_context,
+                                        components_user_ids, topic_user_id):
+    missing_id = str(uuid.uuid4())
+    data = {'components': components_user_ids + [missing_id],
+            'topic_id': topic_user_id}
+    nb_jobs = admin.get('/api/v1/jobs').data['_meta']['count']
+    r = remoteci_context.post('/api/v1/jobs', data=data)
+    assert r.status_code == 404
+    assert r.data['payload']['missing_ids'] == [missing_id]
+    assert admin.get('/api/v1/jobs').data['_meta']['count'] == nb_jobs
+
+
+def test_create_jobs_bulk(admin, remoteci_context, components_user_ids,
+                          topic_user_id):
+    job = {'components': components_user_ids, 'topic_id': topic_user_id}
+    data = {'jobs': [
+        dict(job, comment='first'),
+        dict(job, components=[str(uuid.uuid4())]),
+        dict(job, topic_id='foo'),
+        dict(job, comment='second'),
+    ]}
+    r = remoteci_context.post('/api/v1/jobs/bulk', data=data)
+    assert r.status_code == 207
+    results = r.data['jobs']
+    assert [result['status_code'] for result in results] == [201, 404, 400,
+                                                             201]
+
+    for result, comment in ((results[0], 'first'), (results[3], 'second')):
+        job_id = result['job']['id']
+        created = admin.get('/api/v1/jobs/%s?embed=components' % job_id).data
+        assert created['job']['comment'] == comment
+        assert (set(c['id'] for c in created['job']['components']) ==
+                set(components_user_ids))
+
+    data = {'jobs': [job]}
+    r = remoteci_context.post('/api/v1/jobs/bulk', data=data)
+    assert r.status_code == 201
+
+    r = remoteci_context.post('/api/v1/jobs/bulk', data={'jobs': []})
+    assert r.status_code == 400
+    r = admin.post('/api/v1/jobs/bulk', data={'jobs': [job]})
+    assert r.status_code == 400
+
+
 def test_create_jobs_empty_comment(remoteci_context, components_user_ids,
                                    topic_user_id):
     data = {'components': components_user_ids,
@@ -124,6 +168,174 @@ def test_get_all_jobs_with_pagination(remoteci_context,
     assert jobs.data['jobs'] == []
 
 
+def test_get_all_jobs_with_cursor_pagination(remoteci_context,
+                                             components_user_ids,
+                                             topic_user_id):
+    data = {'components': components_user_ids,
+            'topic_id': topic_user_id}
+    for _ in range(5):
+        remoteci_context.post('/api/v1/jobs', data=data)
+    all_jobs = remoteci_context.get('/api/v1/jobs?sort=created_at').data
+    all_jobs_ids = [job['id'] for job in all_jobs['jobs']]
+
+    for embed in ('', '&embed=components'):
+        jobs = remoteci_context.get(
+            '/api/v1/jobs?sort=created_at&limit=2&offset=0' + embed).data
+        jobs_ids = [job['id'] for job in jobs['jobs']]
+        while 'next' in jobs['_meta']:
+            assert jobs['_meta']['count'] == 5
+            assert 'offset' not in jobs['_meta']['next']
+            jobs = remoteci_context.get(jobs['_meta']['next']).data
+            jobs_ids.extend([job['id'] for job in jobs['jobs']])
+        assert jobs_ids == all_jobs_ids
+
+    # default sort: -created_at
+    jobs = remoteci_context.get('/api/v1/jobs?limit=4&offset=0').data
+    jobs = remoteci_context.get(jobs['_meta']['next']).data
+    assert [job['id'] for job in jobs['jobs']] == all_jobs_ids[:1]
+    assert 'next' not in jobs['_meta']
+
+
+def test_get_all_jobs_count_modes(app, remoteci_context, components_user_ids,
+                                  topic_user_id):
+    data = {'components': components_user_ids,
+            'topic_id': topic_user_id}
+    for _ in range(3):
+        remoteci_context.post('/api/v1/jobs', data=data)
+
+    for embed in ('', '&embed=components,topic'):
+        jobs = remoteci_context.get(
+            '/api/v1/jobs?limit=2&offset=0' + embed).data
+        assert len(jobs['jobs']) == 2
+        assert jobs['_meta']['count'] == 3
+        assert 'dci_total_count' not in jobs['jobs'][0]
+        jobs = remoteci_context.get(
+            '/api/v1/jobs?limit=2&offset=10' + embed).data
+        assert jobs['_meta']['count'] == 3
+        jobs = remoteci_context.get('/api/v1/jobs?sort=created_at' + embed)
+        assert jobs.data['_meta']['count'] == 3
+
+    jobs = remoteci_context.get('/api/v1/jobs?limit=2&offset=0&count=none')
+    assert 'count' not in jobs.data['_meta']
+    jobs = remoteci_context.get(
+        '/api/v1/jobs?limit=2&offset=0&count=estimate')
+    assert isinstance(jobs.data['_meta']['count'], int)
+    jobs = remoteci_context.get('/api/v1/jobs?count=foo')
+    assert jobs.status_code == 400
+
+    app.config['COUNT_MODES'] = {'api_v1.get_all_jobs': 'none'}
+    jobs = remoteci_context.get('/api/v1/jobs?limit=2&offset=0')
+    assert 'count' not in jobs.data['_meta']
+    jobs = remoteci_context.get('/api/v1/jobs?limit=2&offset=0&count=exact')
+    assert jobs.data['_meta']['count'] == 3
+
+
+def test_get_all_jobs_embed_loading_strategies(app, admin, job_user_id,
+                                               jobstate_user_id,
+                                               file_job_user_id):
+    admin.post('/api/v1/jobstates', data={'job_id': job_user_id,
+                                          'status': 'success'})
+
+    def _get_jobs(url):
+        jobs = admin.get(url).data
+        for job in jobs.get('jobs', [jobs.get('job')]):
+            for embed in ('files', 'jobstates', 'components', 'tags'):
+                job[embed] = sorted(job[embed], key=lambda e: e['id'])
+        return jobs
+
+    embed = 'embed=files,jobstates,components,tags,topic,team'
+    urls = ['/api/v1/jobs?' + embed,
+            '/api/v1/jobs?limit=1&offset=0&' + embed,
+            '/api/v1/jobs?where=topic.state:active&' + embed,
+            '/api/v1/jobs/%s?%s' % (job_user_id, embed)]
+    app.config['EMBED_LOADING'] = 'join'
+    joined_jobs = [_get_jobs(url) for url in urls]
+    app.config['EMBED_LOADING'] = 'selectin'
+    assert [_get_jobs(url) for url in urls] == joined_jobs
+
+    job = joined_jobs[-1]['job']
+    assert len(job['jobstates']) == 2
+    assert len(job['components']) == 3
+    assert [f['id'] for f in job['files']] == [file_job_user_id]
+    assert job['tags'] == []
+
+
+def test_get_all_jobs_statement_cache(app, admin, remoteci_context,
+                                      components_user_ids, topic_user_id):
+    data = {'components': components_user_ids, 'topic_id': topic_user_id}
+    jobs_ids = [remoteci_context.post('/api/v1/jobs', data=data).data['job']['id']  # noqa
+                for _ in range(3)]
+
+    def _get_jobs_ids(url):
+        return [job['id'] for job in admin.get(url).data['jobs']]
+
+    url = '/api/v1/jobs?sort=created_at&embed=topic&limit=%s&offset=%s'
+    assert _get_jobs_ids(url % (1, 1)) == jobs_ids[1:2]
+    stats = app.statement_cache.stats()
+    assert _get_jobs_ids(url % (2, 2)) == jobs_ids[2:]
+    assert app.statement_cache.stats()['hits'] == stats['hits'] + 1
+    assert app.statement_cache.stats()['misses'] == stats['misses']
+
+    url = '/api/v1/jobs?where=id:%s'
+    assert _get_jobs_ids(url % jobs_ids[0]) == [jobs_ids[0]]
+    stats = app.statement_cache.stats()
+    assert _get_jobs_ids(url % jobs_ids[1]) == [jobs_ids[1]]
+    assert app.statement_cache.stats()['hits'] == stats['hits'] + 1
+
+    # another shape
+    assert _get_jobs_ids('/api/v1/jobs?where=status:new&sort=created_at') == jobs_ids  # noqa
+    assert app.statement_cache.stats()['misses'] == stats['misses'] + 1
+
+
+def test_get_all_jobs_with_fields(admin, job_user_id, jobstate_user_id):
+    jobs = admin.get('/api/v1/jobs?fields=status,comment').data
+    assert jobs['_meta']['count'] == 1
+    assert jobs['jobs'][0] == {'id': job_user_id, 'status': 'running',
+                               'comment': None}
+
+    for args in ('', '&limit=1&offset=1', '&limit=1&offset=0',
+                 '&limit=1&sort=created_at'):
+        jobs = admin.get('/api/v1/jobs?embed=topic,jobstates,components'
+                         '&fields=status,topic.name,jobstates.status' + args)
+        assert jobs.status_code == 200
+        for job in jobs.data['jobs']:
+            assert sorted(job.keys()) == ['components', 'id', 'jobstates',
+                                          'status', 'topic']
+            assert sorted(job['topic'].keys()) == ['id', 'name']
+            assert job['jobstates'] == [{'id': jobstate_user_id,
+                                         'status': 'running'}]
+            assert len(job['components'][0]) > 2
+
+    job = admin.get('/api/v1/jobs/%s?embed=topic&fields=status,topic.name'
+                    % job_user_id).data['job']
+    assert sorted(job.keys()) == ['id', 'status', 'topic']
+    assert sorted(job['topic'].keys()) == ['id', 'name']
+
+
+def test_get_all_jobs_with_invalid_fields(admin):
+    for fields in ('foo', 'topic.name', 'status;name'):
+        result = admin.get('/api/v1/jobs?fields=%s' % fields)
+        assert result.status_code == 400
+    result = admin.get('/api/v1/jobs?embed=topic&fields=topic.foo')
+    assert result.status_code == 400
+    assert 'topic.name' in result.data['payload']['Valid fields']
+
+
+def test_get_all_jobs_with_invalid_cursor(remoteci_context):
+    jobs = remoteci_context.get('/api/v1/jobs?limit=2&cursor=foo')
+    assert jobs.status_code == 400
+    jobs = remoteci_context.get('/api/v1/jobs?cursor=WyJ4Il0')
+    assert jobs.status_code == 400
+    jobs = remoteci_context.get('/api/v1/jobs?limit=2&offset=0&cursor=WyJ4Il0')
+    assert jobs.status_code == 400
+    jobs = remoteci_context.get('/api/v1/jobs?sort=comment&limit=2&offset=0')
+    assert jobs.status_code == 200
+    assert 'next' not in jobs.data['_meta']
+    jobs = remoteci_context.get(
+        '/api/v1/jobs?sort=comment&limit=2&cursor=WyJmb28iXQ')
+    assert jobs.status_code == 400
+
+
 def test_get_all_jobs_with_embed(admin, remoteci_context, team_user_id,
                                  remoteci_user_id, components_user_ids,
                                  topic_user_id):
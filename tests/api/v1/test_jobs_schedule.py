@@ -191,3 +191,62 @@ def test_schedule_a_job_with_dry_run_return_job_none(
     data = {"dry_run": True, "topic_id": topic_user_id}
     r = remoteci_context.post("/api/v1/jobs/schedule", data=data)
     assert r.data["job"] is None
+
+
+def test_schedule_jobs_latest_components_cache(
+        app, admin, remoteci_context, topic_user_id, components_user_ids):
+    data = {"dry_run": True, "topic_id": topic_user_id}
+
+    def _scheduled_components_ids():
+        r = remoteci_context.post("/api/v1/jobs/schedule", data=data)
+        assert r.status_code == 201
+        return [c['id'] for c in r.data["components"]]
+
+    assert _scheduled_components_ids() == components_user_ids
+    misses = app.latest_components_cache.misses
+    assert _scheduled_components_ids() == components_user_ids
+    assert app.latest_components_cache.misses == misses
+
+    # a new component is added to the cached latest components
+    topic = admin.get('/api/v1/topics/%s' % topic_user_id).data['topic']
+    component = admin.post('/api/v1/components',
+                           data={'name': 'new-component',
+                                 'type': topic['component_types'][0],
+                                 'topic_id': topic_user_id}).data['component']
+    latest_ids = [component['id']] + components_user_ids[1:]
+    assert _scheduled_components_ids() == latest_ids
+    assert app.latest_components_cache.misses == misses
+
+    # the previous component is the latest one again once it is deleted
+    admin.delete('/api/v1/components/%s' % component['id'])
+    assert _scheduled_components_ids() == components_user_ids
+
+
+def test_schedule_jobs_with_idempotency_key(admin, remoteci_context, topic):
+    data = {'topic_id': topic['id']}
+
+    def _schedule(key, data=data):
+        return remoteci_context.post('/api/v1/jobs/schedule', data=data,
+                                     headers={'Idempotency-Key': key})
+
+    r = _schedule('key-1')
+    assert r.status_code == 201
+    job = r.data['job']
+    assert 'Idempotent-Replayed' not in r.headers
+    nb_jobs = admin.get('/api/v1/jobs').data['_meta']['count']
+
+    # the retries get the job of the first request
+    r = _schedule('key-1')
+    assert r.status_code == 201
+    assert r.data['job']['id'] == job['id']
+    assert r.headers['Idempotent-Replayed'] == 'true'
+    assert admin.get('/api/v1/jobs').data['_meta']['count'] == nb_jobs
+
+    r = _schedule('key-1', data={'topic_id': topic['id'], 'comment': 'c'})
+    assert r.status_code == 422
+
+    r = _schedule('key-2')
+    assert r.status_code == 201
+    assert r.data['job']['id'] != job['id']
+
+    assert _schedule('k' * 256).status_code == 400
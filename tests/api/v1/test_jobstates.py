@@ -19,6 +19,8 @@ from __future__ import unicode_literals
 import mock
 import uuid
 
+from dci.common import exceptions as dci_exc
+
 
 def test_create_jobstates(user, job_user_id):
     data = {'job_id': job_user_id, 'status': 'running', 'comment': 'kikoolol'}
@@ -35,6 +37,21 @@ def test_create_jobstates(user, job_user_id):
     assert job['job']['status'] == 'running'
 
 
+def test_create_jobstates_is_atomic(user, job_user_id):
+    jobstates = user.get('/api/v1/jobs/%s/jobstates' % job_user_id).data
+    data = {'job_id': job_user_id, 'status': 'running'}
+
+    with mock.patch('dci.db.trends.update_job') as mocked_update:
+        mocked_update.side_effect = dci_exc.DCIException('error')
+        assert user.post('/api/v1/jobstates', data=data).status_code == 400
+
+    # neither the jobstate nor the job status are kept
+    job = user.get('/api/v1/jobs/%s' % job_user_id).data['job']
+    assert job['status'] == 'new'
+    assert user.get('/api/v1/jobs/%s/jobstates' % job_user_id).data == \
+        jobstates
+
+
 def test_create_jobstates_failure(user, job_user_id):
     data = {'job_id': job_user_id, 'status': 'failure'}
 
@@ -61,6 +78,46 @@ def test_create_jobstates_notification(user, job_user_id):
         assert 'results' in called_args
 
 
+def test_create_jobstates_bulk(user, job_user_id):
+    missing_id = str(uuid.uuid4())
+    data = {'jobstates': [
+        {'job_id': job_user_id, 'status': 'running'},
+        {'job_id': missing_id, 'status': 'running'},
+        {'status': 'running'},
+        {'job_id': job_user_id, 'status': 'failure', 'comment': 'failed'},
+    ]}
+
+    with mock.patch('dci.api.v1.notifications.get_events') as mocked_events:
+        mocked_events.return_value = []
+        r = user.post('/api/v1/jobstates/bulk', data=data)
+        # the job is notified once with its final status
+        assert mocked_events.call_count == 1
+        args, _ = mocked_events.call_args
+        assert args[0]['status'] == 'failure'
+        assert 'components' in args[0]
+        assert 'topic' in args[0]
+
+    assert r.status_code == 207
+    results = r.data['jobstates']
+    assert [result['status_code'] for result in results] == [201, 404, 400,
+                                                             201]
+    assert results[3]['jobstate']['status'] == 'failure'
+
+    jobstates = user.get('/api/v1/jobs/%s/jobstates?sort=created_at' %
+                         job_user_id).data
+    assert ([js['status'] for js in jobstates['jobstates']] ==
+            ['running', 'failure'])
+    job = user.get('/api/v1/jobs/%s' % job_user_id).data
+    assert job['job']['status'] == 'failure'
+
+
+def test_create_jobstates_bulk_new_to_failure(user, job_user_id):
+    data = {'jobstates': [{'job_id': job_user_id, 'status': 'failure'}]}
+    r = user.post('/api/v1/jobstates/bulk', data=data)
+    assert r.status_code == 201
+    assert r.data['jobstates'][0]['jobstate']['status'] == 'error'
+
+
 def test_create_jobstates_new_to_failure(user, job_user_id):
     data = {'job_id': job_user_id, 'status': 'new'}
     js = user.post('/api/v1/jobstates', data=data).data
@@ -15,35 +15,37 @@
 # under the License.
 import datetime
 import json
+import threading
+import time
 import uuid
 
-from dci.api.v1.trends import get_trends_from_jobs
+from dci.api.v1.trends import get_trends_from_days
+from dci.db import models
+from dci.db import trends as db_trends
 
 
 def test_trends():
-    jobs = [
+    days = [
         {
-            "created_at": datetime.datetime.strptime("2018-06-27T10:29:04", "%Y-%m-%dT%H:%M:%S"),  # noqa
-            "status": "failure",
+            "day": datetime.date(2018, 6, 27),
+            "success": 1,
+            "failure": 1,
             "topic_id": uuid.UUID('23da2f7b-90cd-4d71-a48a-e9c88f75b5eb')
         },
         {
-            "created_at": datetime.datetime.strptime("2018-06-27T14:30:02", "%Y-%m-%dT%H:%M:%S"),  # noqa
-            "status": "success",
+            "day": datetime.date(2018, 6, 28),
+            "success": 1,
+            "failure": 0,
             "topic_id": uuid.UUID('23da2f7b-90cd-4d71-a48a-e9c88f75b5eb')
         },
         {
-            "created_at": datetime.datetime.strptime("2018-06-28T02:14:03", "%Y-%m-%dT%H:%M:%S"),  # noqa
-            "status": "success",
-            "topic_id": uuid.UUID('23da2f7b-90cd-4d71-a48a-e9c88f75b5eb')
-        },
-        {
-            "created_at": datetime.datetime.strptime("2018-06-28T12:08:02", "%Y-%m-%dT%H:%M:%S"),  # noqa
-            "status": "success",
+            "day": datetime.date(2018, 6, 28),
+            "success": 1,
+            "failure": 0,
             "topic_id": uuid.UUID('9f2344e8-e3dc-4039-84fa-5bc7e53b8865')
         },
     ]
-    trends = get_trends_from_jobs(jobs)
+    trends = get_trends_from_days(days)
 
     assert json.dumps(trends, indent=4, sort_keys=True) == json.dumps({
         '23da2f7b-90cd-4d71-a48a-e9c88f75b5eb': [
@@ -54,3 +56,114 @@ def test_trends():
             [1530144000, 1, 0]
         ]
     }, indent=4, sort_keys=True)
+
+
+def test_get_trends_of_topics(admin, user, remoteci_context, engine,
+                              components_user_ids, topic_user_id):
+    data = {'components_ids': components_user_ids,
+            'topic_id': topic_user_id}
+    jobs = [remoteci_context.post('/api/v1/jobs/schedule',
+                                  data=data).data['job']['id']
+            for _ in range(3)]
+    for job_id, status in zip(jobs, ['success', 'failure', 'success']):
+        user.post('/api/v1/jobstates',
+                  data={'job_id': job_id, 'status': 'running'})
+        user.post('/api/v1/jobstates',
+                  data={'job_id': job_id, 'status': status})
+
+    today = datetime.datetime.utcnow().date()
+    timestamp = int((today - datetime.date(1970, 1, 1)).total_seconds())
+    topics = admin.get('/api/v1/trends/topics').data['topics']
+    assert topics == {topic_user_id: [[timestamp, 2, 1]]}
+
+    # a job which isn't finished anymore isn't counted
+    user.post('/api/v1/jobstates', data={'job_id': jobs[0],
+                                         'status': 'running'})
+    topics = admin.get('/api/v1/trends/topics').data['topics']
+    assert topics == {topic_user_id: [[timestamp, 1, 1]]}
+
+    with engine.connect() as db_conn:
+        db_trends.rebuild(db_conn)
+    assert admin.get('/api/v1/trends/topics').data['topics'] == topics
+
+    yesterday = (today - datetime.timedelta(days=1)).isoformat()
+    tomorrow = (today + datetime.timedelta(days=1)).isoformat()
+    topics = admin.get('/api/v1/trends/topics?since=%s&until=%s' %
+                       (yesterday, today.isoformat())).data['topics']
+    assert topics == {topic_user_id: [[timestamp, 1, 1]]}
+    topics = admin.get('/api/v1/trends/topics?since=%s' %
+                       tomorrow).data['topics']
+    assert topics == {}
+    topics = admin.get('/api/v1/trends/topics?until=%s' %
+                       yesterday).data['topics']
+    assert topics == {}
+
+
+def _schedule_jobs(remoteci_context, components_user_ids, topic_user_id,
+                   count):
+    data = {'components_ids': components_user_ids,
+            'topic_id': topic_user_id}
+    return [remoteci_context.post('/api/v1/jobs/schedule',
+                                  data=data).data['job']['id']
+            for _ in range(count)]
+
+
+def test_update_trends_concurrently(admin, remoteci_context, engine,
+                                    components_user_ids, topic_user_id):
+    jobs = _schedule_jobs(remoteci_context, components_user_ids,
+                          topic_user_id, 2)
+    engine.execute(models.JOBS.update().values(status='success'))
+    errors = []
+
+    def update_job(job_id):
+        try:
+            with engine.connect() as db_conn:
+                db_trends.update_job(db_conn, job_id)
+        except Exception as e:
+            errors.append(e)
+
+    # the count of the second job waits for the one of the first job, in a
+    # transaction not committed yet
+    with engine.connect() as db_conn:
+        with db_conn.begin():
+            db_trends.update_job(db_conn, jobs[0])
+            thread = threading.Thread(target=update_job, args=(jobs[1],))
+            thread.start()
+            time.sleep(0.5)
+            assert thread.is_alive()
+    thread.join()
+
+    assert errors == []
+    today = datetime.datetime.utcnow().date()
+    timestamp = int((today - datetime.date(1970, 1, 1)).total_seconds())
+    topics = admin.get('/api/v1/trends/topics').data['topics']
+    assert topics == {topic_user_id: [[timestamp, 2, 0]]}
+
+
+def test_get_trends_of_jobs_without_topic(admin, remoteci_context, engine,
+                                          components_user_ids,
+                                          topic_user_id):
+    jobs = _schedule_jobs(remoteci_context, components_user_ids,
+                          topic_user_id, 2)
+    engine.execute(models.JOBS.update().values(status='failure'))
+    engine.execute(models.JOBS.update()
+                   .where(models.JOBS.c.id == jobs[0])
+                   .values(topic_id=None, status='success'))
+    with engine.connect() as db_conn:
+        db_trends.rebuild(db_conn)
+
+    today = datetime.datetime.utcnow().date()
+    timestamp = int((today - datetime.date(1970, 1, 1)).total_seconds())
+    topics = admin.get('/api/v1/trends/topics').data['topics']
+    assert topics == {topic_user_id: [[timestamp, 0, 1]],
+                      'None': [[timestamp, 1, 0]]}
+    topics = admin.get('/api/v1/trends/topics?since=%s' %
+                       today.isoformat()).data['topics']
+    assert 'None' in topics
+
+
+def test_get_trends_of_topics_with_invalid_dates(admin):
+    result = admin.get('/api/v1/trends/topics?since=2018-13-45')
+    assert result.status_code == 400
+    result = admin.get('/api/v1/trends/topics?from=2018-01-01')
+    assert result.status_code == 400
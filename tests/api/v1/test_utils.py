@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from __future__ import unicode_literals
+
+import uuid
+
+from dci.api.v1 import utils as v1_utils
+from dci.db import models
+
+
+def _format_level_1_by_label(rows, root_table_name):
+    # the implementation splitting the labels of each row, kept as the
+    # reference of the row shaper
+    result_rows = []
+    for row in rows:
+        row = dict(row)
+        result_row = {}
+        prefixes_to_remove = []
+        for field in row:
+            if field.startswith('next_topic'):
+                prefix = 'next_topic'
+                suffix = field[11:]
+                if suffix == 'id_1':
+                    suffix = 'id'
+            else:
+                prefix, suffix = field.split('_', 1)
+            if suffix == 'id' and row[field] is None:
+                prefixes_to_remove.append(prefix)
+            if prefix not in result_row:
+                result_row[prefix] = {suffix: row[field]}
+            else:
+                result_row[prefix].update({suffix: row[field]})
+        for prefix_to_remove in prefixes_to_remove:
+            result_row.pop(prefix_to_remove)
+        root_table_fields = result_row.pop(root_table_name)
+        result_row.update(root_table_fields)
+        result_rows.append(result_row)
+    return result_rows
+
+
+def _get_rows(nb_rows):
+    rows = []
+    for i in range(nb_rows):
+        rows.append({
+            'topics_id': str(uuid.uuid4()),
+            'topics_name': 'topic-%s' % i,
+            'topics_next_topic_id': None,
+            'topics_product_id': str(uuid.uuid4()),
+            'product_id': str(uuid.uuid4()),
+            'product_name': 'product',
+            'next_topic_id_1': str(uuid.uuid4()) if i % 2 else None,
+            'next_topic_name': 'next' if i % 2 else None,
+            'teams_id': None if i % 3 else str(uuid.uuid4()),
+            'teams_name': None if i % 3 else 'team',
+        })
+    return rows
+
+
+def test_format_level_1():
+    rows = _get_rows(6)
+    result = v1_utils._format_level_1(rows, 'topics')
+    assert result == _format_level_1_by_label(rows, 'topics')
+    assert result[0] == {
+        'id': rows[0]['topics_id'],
+        'name': 'topic-0',
+        'next_topic_id': None,
+        'product_id': rows[0]['topics_product_id'],
+        'product': {'id': rows[0]['product_id'], 'name': 'product'},
+        'teams': {'id': rows[0]['teams_id'], 'name': 'team'},
+    }
+    assert result[1]['next_topic'] == {'id': rows[1]['next_topic_id_1'],
+                                       'name': 'next'}
+    assert 'teams' not in result[1]
+
+
+def test_format_level_1_rows_of_several_shapes():
+    rows = _get_rows(2)
+    rows.append({'topics_id': str(uuid.uuid4()),
+                 'teams_id': str(uuid.uuid4())})
+    result = v1_utils._format_level_1(rows, 'topics')
+    assert result == _format_level_1_by_label(rows, 'topics')
+    assert result[2] == {'id': rows[2]['topics_id'],
+                         'teams': {'id': rows[2]['teams_id']}}
+
+
+def test_format_level_1_many_rows():
+    rows = _get_rows(1000)
+    assert v1_utils._format_level_1(rows, 'topics') == \
+        _format_level_1_by_label(rows, 'topics')
+
+
+def test_window_count_only_in_exact_count_mode(app):
+    for count, with_window in (('exact', True), ('estimate', False),
+                               ('none', False)):
+        with app.test_request_context('/api/v1/jobs'):
+            query = v1_utils.QueryBuilder(
+                models.JOBS, {'limit': 2, 'offset': 0, 'count': count},
+                v1_utils.get_columns_name_with_objects(models.JOBS))
+            sql = str(query.get_query(with_count=True))
+            assert ('OVER ()' in sql) == with_window
+            # the embeds use a subquery for the root table
+            query = v1_utils.QueryBuilder(
+                models.JOBS, {'limit': 2, 'offset': 0, 'count': count,
+                              'embed': ['topic']},
+                v1_utils.get_columns_name_with_objects(models.JOBS),
+                embed_many={'topic': False})
+            sql = str(query.get_query(with_count=True))
+            assert ('OVER ()' in sql) == with_window
+
+
+def test_clause_shape():
+    jobs = models.JOBS
+    shape, binds = v1_utils.clause_shape([jobs.c.team_id == 'a',
+                                          jobs.c.status.in_(['b', 'c'])])
+    assert [b.effective_value for b in binds] == ['a', 'b', 'c']
+    assert v1_utils.clause_shape([jobs.c.team_id == 'd',
+                                  jobs.c.status.in_(['e', 'f'])])[0] == shape
+    assert v1_utils.clause_shape([jobs.c.team_id != 'a',
+                                  jobs.c.status.in_(['b', 'c'])])[0] != shape
+    assert v1_utils.clause_shape([jobs.c.team_id == 'a',
+                                  jobs.c.status.in_(['b'])])[0] != shape
+    assert v1_utils.clause_shape([jobs.c.topic_id == 'a',
+                                  jobs.c.status.in_(['b', 'c'])])[0] != shape
@@ -16,6 +16,7 @@
 
 from dci import auth
 from dci import dci_config
+from dci import identity
 
 import mock
 import datetime
@@ -51,3 +52,25 @@ def test_decode_jwt(m_datetime, access_token):
     decoded_jwt = auth.decode_jwt(access_token, pubkey, 'dci')
     assert decoded_jwt['username'] == 'dci'
     assert decoded_jwt['email'] == 'dci@distributed-ci.io'
+
+
+def test_verified_passwords():
+    user = identity.Identity({'id': 'user-id', 'etag': 'etag',
+                              'password': auth.hash_password('password')})
+    verified_passwords = auth.VerifiedPasswords(10, 300)
+
+    with mock.patch('dci.auth.check_passwords_equal',
+                    wraps=auth.check_passwords_equal) as m_check:
+        assert not verified_passwords.check(user, 'bad password')
+        assert not verified_passwords.check(user, 'bad password')
+        assert verified_passwords.check(user, 'password')
+        assert verified_passwords.check(user, 'password')
+        # the failed checks are never remembered
+        assert m_check.call_count == 3
+
+        # a new etag or a forgotten user is checked again
+        user.etag = 'new etag'
+        assert verified_passwords.check(user, 'password')
+        verified_passwords.forget('user-id')
+        assert verified_passwords.check(user, 'password')
+        assert m_check.call_count == 5
@@ -19,6 +19,8 @@ from dci.common import exceptions as dci_exc
 
 import pytest
 
+from tests import utils
+
 
 class MockRequest(object):
     def __init__(self, auth=None):
@@ -54,3 +56,18 @@ def test_bam_authenticate():
     basic_auth_mecanism = authm.BasicAuthMechanism(MockRequest(AuthMock()))
     basic_auth_mecanism.get_user_and_check_auth = return_is_authenticated
     assert basic_auth_mecanism.authenticate()
+
+
+def test_identity_cache(app, admin, user, user_id):
+    assert user.get('/api/v1/identity').status_code == 200
+    hits = app.identity_cache.hits
+    assert user.get('/api/v1/identity').status_code == 200
+    assert app.identity_cache.hits == hits + 1
+
+    # the cached identity is forgotten when the user changes
+    etag = admin.get('/api/v1/users/%s' % user_id).headers['ETag']
+    admin.put('/api/v1/users/%s' % user_id, headers={'If-match': etag},
+              data={'password': 'new_password'})
+    assert user.get('/api/v1/identity').status_code == 401
+    user = utils.generate_client(app, ('user', 'new_password'))
+    assert user.get('/api/v1/identity').status_code == 200
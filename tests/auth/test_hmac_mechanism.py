@@ -23,3 +23,16 @@ def test_hmac_mechanism_from_outside(remoteci_context):
 def test_hmac_mechanism_params(remoteci_context):
     jobs_request = remoteci_context.get('/api/v1/jobs?embed=components')
     assert jobs_request.status_code == 200
+
+
+def test_hmac_mechanism_api_secret_refreshed(admin, remoteci_context,
+                                             remoteci_user_id):
+    assert remoteci_context.get('/api/v1/identity').status_code == 200
+    remoteci = admin.get('/api/v1/remotecis/%s' % remoteci_user_id).data
+    admin.put('/api/v1/remotecis/%s/api_secret' % remoteci_user_id,
+              headers={'If-match': remoteci['remoteci']['etag']})
+    # the cached identity with the previous secret is forgotten
+    result = remoteci_context.get('/api/v1/identity')
+    assert result.status_code == 400
+    assert result.data['message'] == \
+        'Authentication failed: signature is invalid'
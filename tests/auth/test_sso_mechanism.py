@@ -15,8 +15,18 @@
 # under the License.
 
 import datetime
+import json
+import threading
+import time
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from jwt.algorithms import RSAAlgorithm
 
 import dci.auth_mechanism as authm
+from dci.api.v1 import sso
+from dci import auth
+from dci.common import cache
 from dci.common import exceptions as dci_exc
 from dci import dci_config
 
@@ -24,6 +34,8 @@ import flask
 import mock
 import pytest
 
+from tests import settings
+
 
 @mock.patch('jwt.api_jwt.datetime', spec=datetime.datetime)
 def test_sso_auth_verified(m_datetime, admin, app, engine, access_token,
@@ -49,24 +61,107 @@ def test_sso_auth_verified(m_datetime, admin, app, engine, access_token,
         assert (nb_users + 1) == nb_users_after_sso
 
 
+def _get_jwks_response(url, timeout):
+    public_key = serialization.load_pem_public_key(
+        settings.SSO_PUBLIC_KEY.encode('utf-8'),
+        backend=default_backend())
+    jwk = json.loads(RSAAlgorithm.to_jwk(public_key))
+    jwk['kid'] = 'uQxsQppsKoobFh3HNtkuWoRjFdu0cktF-Sy4eWE5xy4'
+    response = mock.Mock()
+    if url.endswith('openid-configuration'):
+        response.json.return_value = {'jwks_uri': 'http://keycloak/certs'}
+    else:
+        response.json.return_value = {'keys': [jwk]}
+    return response
+
+
 @mock.patch('jwt.api_jwt.datetime', spec=datetime.datetime)
-@mock.patch('dci.auth_mechanism.sso.get_latest_public_key')
-def test_sso_auth_verified_public_key_rotation(m_get_last_pubkey, m_datetime,
-                                               user_sso, app, engine,
-                                               team_admin_id):
+@mock.patch('dci.api.v1.sso.requests.get', side_effect=_get_jwks_response)
+def test_sso_auth_verified_public_key_rotation(m_get, m_datetime, user_sso,
+                                               app, engine, team_admin_id):
     sso_public_key = dci_config.CONFIG['SSO_PUBLIC_KEY']
     dci_config.CONFIG['SSO_PUBLIC_KEY'] = '= non valid sso public key here ='
     m_utcnow = mock.MagicMock()
     m_utcnow.utctimetuple.return_value = datetime.datetime. \
         fromtimestamp(1518653629).timetuple()
     m_datetime.utcnow.return_value = m_utcnow
-    m_get_last_pubkey.return_value = sso_public_key
+    try:
+        with app.app_context():
+            flask.g.team_admin_id = team_admin_id
+            flask.g.db_conn = engine.connect()
+            teams = user_sso.get('/api/v1/users/me')
+            assert teams.status_code == 200
+            assert m_get.call_count == 2
+            # the keys of the SSO server are fetched once
+            teams = user_sso.get('/api/v1/users/me')
+            assert teams.status_code == 200
+            assert m_get.call_count == 2
+    finally:
+        dci_config.CONFIG['SSO_PUBLIC_KEY'] = sso_public_key
+
+
+def test_jwks_cache():
+    now = [1000.0]
+    fetched_keys = [{'kid1': 'key1'}]
+    fetched = threading.Event()
+
+    def get_keys():
+        fetched.set()
+        return fetched_keys[-1]
+
+    jwks = sso.JWKSCache(3600, 300, get_keys=get_keys, timer=lambda: now[0])
+    with mock.patch.object(jwks, '_get_keys', wraps=get_keys) as m_get_keys:
+        assert jwks.get_key('kid1') == 'key1'
+        assert jwks.get_key('kid1') == 'key1'
+        assert m_get_keys.call_count == 1
+
+        # the unknown key ids are not fetched again before their ttl
+        assert jwks.get_key('kid2') is None
+        assert jwks.get_key('kid2') is None
+        assert m_get_keys.call_count == 2
+        fetched_keys.append({'kid1': 'key1', 'kid2': 'key2'})
+        now[0] += 300
+        assert jwks.get_key('kid2') == 'key2'
+        assert m_get_keys.call_count == 3
+
+        # the expired keys are still used while they are refreshed
+        fetched.clear()
+        fetched_keys.append({'kid1': 'new key1'})
+        now[0] += 3600
+        assert jwks.get_key('kid1') == 'key1'
+        assert fetched.wait(5)
+        for _ in range(50):
+            if jwks.get_key('kid1') == 'new key1':
+                break
+            time.sleep(0.1)
+        assert jwks.get_key('kid1') == 'new key1'
+        assert m_get_keys.call_count == 4
+
+
+@mock.patch('jwt.api_jwt.datetime', spec=datetime.datetime)
+def test_sso_decoded_token_cache(m_datetime, app, access_token):
+    m_utcnow = mock.MagicMock()
+    m_utcnow.utctimetuple.return_value = datetime.datetime. \
+        fromtimestamp(1518653629).timetuple()
+    m_datetime.utcnow.return_value = m_utcnow
+    app.sso_token_cache = cache.TTLCache(10, 300, timer=lambda: 1518653629)
     with app.app_context():
-        flask.g.team_admin_id = team_admin_id
-        flask.g.db_conn = engine.connect()
-        teams = user_sso.get('/api/v1/users/me')
-        assert teams.status_code == 200
-    assert dci_config.CONFIG['SSO_PUBLIC_KEY'] == sso_public_key
+        with mock.patch('dci.auth.decode_jwt',
+                        wraps=auth.decode_jwt) as m_decode_jwt:
+            decoded_token = sso.decode_token(access_token)
+            assert sso.decode_token(access_token) == decoded_token
+            assert m_decode_jwt.call_count == 1
+            assert decoded_token['username'] == 'dci'
+    assert len(app.sso_token_cache) == 1
+
+
+def test_sso_decoded_token_without_expiration(app):
+    app.sso_token_cache = cache.TTLCache(10, 300, timer=lambda: 1518653629)
+    token = {'username': 'dci', 'aud': 'dci'}
+    with app.app_context():
+        with mock.patch('dci.auth.decode_jwt', return_value=token):
+            assert sso.decode_token('token') == token
+    assert len(app.sso_token_cache) == 1
 
 
 @mock.patch('jwt.api_jwt.datetime', spec=datetime.datetime)
@@ -62,6 +62,20 @@ def test_args_invalid_limit_equal_to_zero():
         check_json_is_valid(args_schema, {"limit": "0", "offset": "10"})
 
 
+def test_args_cursor():
+    check_json_is_valid(args_schema, {"limit": "10", "cursor": "WyJ4Il0"})
+    with pytest.raises(DCIException):
+        check_json_is_valid(args_schema, {"limit": "10", "cursor": 1})
+
+
+def test_args_fields():
+    check_json_is_valid(args_schema, {"fields": "id,name,topic.name"})
+    for fields in ("id,", "id;name", "topic..name", "Name"):
+        with pytest.raises(DCIException):
+            check_json_is_valid(args_schema, {"fields": fields})
+    assert parse_args({"fields": "id,topic.name"})["fields"] == ["id", "topic.name"]
+
+
 def test_args_invalid_where_field():
     with pytest.raises(DCIException):
         check_json_is_valid(args_schema, {"where": "f1:v1;f2:v2"})
@@ -81,5 +95,8 @@ def test_parse_args():
         "sort": ["field_1", "field_2"],
         "where": ["field_1:value_1", "field_2:value_2"],
         "embed": ["resource_1", "resource_2"],
+        "cursor": None,
+        "count": None,
+        "fields": [],
     }
     assert parse_args(args) == args_expected
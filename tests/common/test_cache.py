@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci.common import cache
+
+
+def test_lru_cache():
+    lru = cache.LRUCache(2)
+    lru.put('a', 1)
+    lru.put('b', 2)
+    assert lru.get('a') == 1
+    lru.put('c', 3)
+    # 'b' is the least recently used entry
+    assert lru.get('b') is None
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+    assert lru.stats() == {'size': 2, 'maxsize': 2, 'hits': 3, 'misses': 1}
+
+    lru.clear()
+    assert lru.stats() == {'size': 0, 'maxsize': 2, 'hits': 0, 'misses': 0}
+
+
+def test_lru_cache_disabled():
+    lru = cache.LRUCache(0)
+    lru.put('a', 1)
+    assert lru.get('a') is None
+    assert len(lru) == 0
+
+
+class _Timer(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache():
+    timer = _Timer()
+    ttl = cache.TTLCache(10, 30, timer=timer)
+    ttl.put('a', 1)
+    timer.now += 20
+    ttl.put('b', 2)
+    assert ttl.get('a') == 1
+    timer.now += 10
+    # 'a' expired, 'b' is still valid
+    assert ttl.get('a') is None
+    assert ttl.get('b') == 2
+    assert ttl.stats() == {'size': 1, 'maxsize': 10, 'hits': 2,
+                           'misses': 1, 'ttl': 30, 'expirations': 1}
+
+
+def test_ttl_cache_discard():
+    ttl = cache.TTLCache(10, 30)
+    ttl.put('a', 1)
+    ttl.put('b', 2)
+    ttl.put('c', 3)
+    assert ttl.discard(lambda value: value % 2) == 2
+    assert ttl.get('a') is None
+    assert ttl.get('b') == 2
+    assert ttl.pop('b') == 2
+    assert len(ttl) == 0
+
+
+def test_ttl_cache_expires_at():
+    timer = _Timer()
+    ttl = cache.TTLCache(10, 30, timer=timer)
+    ttl.put('a', 1, expires_at=timer.now + 10)
+    ttl.put('b', 2, expires_at=timer.now + 60)
+    ttl.put('c', 3, expires_at=timer.now - 1)
+    assert ttl.get('c') is None
+    timer.now += 10
+    assert ttl.get('a') is None
+    assert ttl.get('b') == 2
+    timer.now += 20
+    assert ttl.get('b') is None
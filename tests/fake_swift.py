@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""In memory Swift server with a v1 authentication endpoint.
+
+It serves the containers and objects requests of swiftclient over
+keep-alive HTTP/1.1 connections and counts the authentications and the
+TCP connections, with an optional delay to emulate a remote keystone.
+"""
+
+import hashlib
+import re
+import threading
+import time
+import uuid
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+
+_RANGE = re.compile(r'^bytes=(\d+)-(\d+)$')
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.swift.count('connections')
+
+    def _respond(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunk = self.rfile.read(size)
+                self.rfile.readline()
+                if not size:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _handle(self):
+        swift = self.server.swift
+        swift.count('requests')
+        if self.path == '/auth/v1.0':
+            token = swift.authenticate(self.headers.get('X-Auth-User'),
+                                       self.headers.get('X-Auth-Key'))
+            if token is None:
+                return self._respond(401)
+            return self._respond(200, headers={
+                'X-Storage-Url': '%s/v1/AUTH_test' % swift.url,
+                'X-Auth-Token': token})
+
+        body = self._read_body()
+        if not swift.is_valid(self.headers.get('X-Auth-Token')):
+            return self._respond(401)
+        parts = self.path.split('?')[0].split('/', 4)[3:]
+        container = parts[0]
+        if len(parts) == 1:
+            if self.command == 'PUT':
+                swift.containers.setdefault(container, {})
+                return self._respond(201)
+            if container not in swift.containers:
+                return self._respond(404)
+            return self._respond(204)
+
+        objects = swift.containers.get(container)
+        if objects is None:
+            return self._respond(404)
+        name = parts[1]
+        if self.command == 'PUT':
+            objects[name] = body
+            return self._respond(
+                201, headers={'Etag': hashlib.md5(body).hexdigest()})
+        if name not in objects:
+            return self._respond(404)
+        content = objects[name]
+        if self.command == 'DELETE':
+            del objects[name]
+            return self._respond(204)
+        if self.command == 'COPY':
+            destination = self.headers.get('Destination').split('/', 2)
+            swift.containers[destination[1]][destination[2]] = content
+            return self._respond(201)
+        headers = {'Etag': hashlib.md5(content).hexdigest(),
+                   'Content-Type': 'application/octet-stream'}
+        match = _RANGE.match(self.headers.get('Range') or '')
+        if match:
+            start, stop = int(match.group(1)), int(match.group(2)) + 1
+            headers['Content-Range'] = 'bytes %s-%s/%s' % (
+                start, min(stop, len(content)) - 1, len(content))
+            return self._respond(206, content[start:stop], headers)
+        return self._respond(200, content, headers)
+
+    do_GET = do_PUT = do_HEAD = do_DELETE = do_COPY = _handle
+
+
+class FakeSwift(object):
+
+    def __init__(self, user='test', key='test', token_ttl=3600,
+                 auth_delay=0):
+        self.user = user
+        self.key = key
+        self.token_ttl = token_ttl
+        self.auth_delay = auth_delay
+        self.containers = {}
+        self.tokens = {}
+        self.counters = {'authentications': 0, 'connections': 0,
+                         'requests': 0}
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), _Handler)
+        self._server.swift = self
+        self.url = 'http://127.0.0.1:%s' % self._server.server_address[1]
+        self.auth_url = '%s/auth/v1.0' % self.url
+
+    def count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def authenticate(self, user, key):
+        time.sleep(self.auth_delay)
+        if (user, key) != (self.user, self.key):
+            return None
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.counters['authentications'] += 1
+            self.tokens[token] = time.time() + self.token_ttl
+        return token
+
+    def is_valid(self, token):
+        return self.tokens.get(token, 0) > time.time()
+
+    def expire_tokens(self):
+        self.tokens.clear()
+
+    def start(self):
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def store_configuration(self, container):
+        """The configuration of a dci.stores.swift.Swift store using this
+        server."""
+        return {'os_username': self.user,
+                'os_password': self.key,
+                'os_auth_url': self.auth_url,
+                'os_identity_api_version': '1',
+                'container': container}
@@ -17,8 +17,13 @@
 import alembic.autogenerate
 import alembic.environment
 import alembic.script
+import mock
+import pytest
+from sqlalchemy import exc as sa_exc
 
 import dci.alembic.utils
+from dci.common import exceptions as dci_exc
+from dci.db import connection
 import dci.db.models as models
 
 
@@ -44,6 +49,46 @@ def test_cors_headers(admin):
     assert resp.headers['Access-Control-Allow-Origin'] == '*'
 
 
+def test_cors_preflight_does_not_connect_to_db(app, admin):
+    with mock.patch.object(app, 'engine') as m_engine:
+        resp = admin.options('/api/v1')
+    assert resp.status_code == 200
+    assert not m_engine.connect.called
+
+
+def test_lazy_connection_connects_on_first_use():
+    m_engine = mock.Mock()
+    db_conn = connection.LazyConnection(m_engine,
+                                        connection.CircuitBreaker(3, 10))
+    assert not m_engine.connect.called
+    db_conn.execute('SELECT 1')
+    db_conn.execute('SELECT 2')
+    assert m_engine.connect.call_count == 1
+    db_conn.close()
+    assert m_engine.connect.return_value.close.called
+    assert not db_conn.connected
+
+
+def test_lazy_connection_circuit_breaker():
+    m_engine = mock.Mock()
+    m_engine.connect.side_effect = sa_exc.OperationalError('', {}, None)
+    circuit_breaker = connection.CircuitBreaker(2, 10)
+    for _ in range(4):
+        db_conn = connection.LazyConnection(m_engine, circuit_breaker)
+        with pytest.raises(dci_exc.DCIException) as e:
+            db_conn.execute('SELECT 1')
+        assert e.value.status_code == 503
+    # the circuit opened after the second failure
+    assert m_engine.connect.call_count == 2
+    assert circuit_breaker.is_open
+
+    circuit_breaker.reset_timeout = 0
+    m_engine.connect.side_effect = None
+    db_conn = connection.LazyConnection(m_engine, circuit_breaker)
+    db_conn.execute('SELECT 1')
+    assert not circuit_breaker.is_open
+
+
 def test_db_migration(engine, delete_db):
     config = dci.alembic.utils.generate_conf()
     context = alembic.context
@@ -66,3 +111,50 @@ def test_db_migration(engine, delete_db):
         )
 
     assert diff == []
+
+
+@pytest.fixture
+def read_only_engine(app, engine):
+    # the read only database is the test database
+    app.config['SQLALCHEMY_READ_ONLY_DATABASE_URI'] = \
+        app.config['SQLALCHEMY_DATABASE_URI']
+    app.read_only_engine = mock.Mock(wraps=engine)
+    return app.read_only_engine
+
+
+def test_get_requests_are_routed_to_read_only_db(admin, read_only_engine):
+    resp = admin.get('/api/v1/jobs')
+    assert resp.status_code == 200
+    assert read_only_engine.connect.called
+    assert 'dci_read_primary' not in resp.headers.get('Set-Cookie', '')
+
+
+def test_read_your_writes(admin, read_only_engine):
+    resp = admin.post('/api/v1/teams', data={'name': 'pname'})
+    assert resp.status_code == 201
+    assert not read_only_engine.connect.called
+    assert 'dci_read_primary=1' in resp.headers['Set-Cookie']
+
+    # the test client sends back the cookie
+    resp = admin.get('/api/v1/teams')
+    assert resp.status_code == 200
+    assert 'pname' in [t['name'] for t in resp.data['teams']]
+    assert not read_only_engine.connect.called
+
+
+def test_teardown_closes_read_only_connection(admin, read_only_engine):
+    close = connection.LazyConnection.close
+    closed = []
+
+    def close_then_fail(db_conn):
+        close(db_conn)
+        closed.append(db_conn)
+        if len(closed) == 1:
+            raise sa_exc.OperationalError('', {}, None)
+
+    with mock.patch.object(connection.LazyConnection, 'close',
+                           autospec=True, side_effect=close_then_fail):
+        resp = admin.get('/api/v1/jobs')
+    assert resp.status_code == 200
+    # the read only connection is closed even if the primary one failed
+    assert len(closed) == 2
@@ -0,0 +1,62 @@
+# -*- encoding: utf-8 -*-
+#
+# Copyright 2019 Red Hat, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from dci import dci_config
+
+
+def test_get_engine_is_shared():
+    engine = dci_config.get_engine()
+    assert dci_config.get_engine() is engine
+    assert dci_config.get_engine(dci_config.PRIMARY) is engine
+
+
+def test_get_engine_read_only_defaults_to_primary():
+    assert dci_config.CONFIG['SQLALCHEMY_READ_ONLY_DATABASE_URI'] is None
+    assert (dci_config.get_engine(dci_config.READ_ONLY) is
+            dci_config.get_engine(dci_config.PRIMARY))
+
+
+def test_get_engine_read_only_before_primary():
+    dci_config.dispose_engines()
+    # the primary engine is created on the way, and reported once
+    engine = dci_config.get_engine(dci_config.READ_ONLY)
+    assert engine is dci_config.get_engine(dci_config.PRIMARY)
+    assert list(dci_config.get_pool_stats().keys()) == ['primary']
+
+
+def test_get_engine_admin_has_its_own_pool():
+    admin_engine = dci_config.get_engine(dci_config.ADMIN)
+    assert admin_engine is not dci_config.get_engine()
+    assert admin_engine.pool.size() == \
+        dci_config.CONFIG['SQLALCHEMY_ADMIN_POOL_SIZE']
+
+
+def test_get_pool_stats(engine):
+    primary_engine = dci_config.get_engine()
+    checkouts = dci_config.get_pool_stats()['primary']['checkouts']
+    with primary_engine.connect():
+        stats = dci_config.get_pool_stats()['primary']
+        assert stats['checked_out'] == 1
+        assert stats['checkouts'] == checkouts + 1
+        assert stats['size'] == dci_config.CONFIG['SQLALCHEMY_POOL_SIZE']
+        assert stats['wait_time'] >= stats['max_wait_time'] >= 0
+    assert dci_config.get_pool_stats()['primary']['checked_out'] == 0
+
+
+def test_get_store_is_shared():
+    store = dci_config.get_store('files')
+    assert dci_config.get_store('files') is store
+    assert dci_config.get_store('components') is not store
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2020 Red Hat, Inc
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import io
+import os
+
+import flask
+import mock
+import pytest
+
+from dci import stores
+from dci.api.v1 import transformations
+from dci.common import exceptions
+from dci.stores import files_utils
+from dci.stores import filesystem
+from dci.stores import swift
+from tests import data as tests_data
+from tests import fake_swift
+
+
+def test_filesystem_upload(tmpdir):
+    store = filesystem.FileSystem({'path': str(tmpdir), 'container': 'c'})
+    content = b'x' * 200000
+
+    digests = store.upload('a/b/file', io.BytesIO(content))
+    assert digests == {'size': len(content),
+                       'md5': hashlib.md5(content).hexdigest(),
+                       'sha256': hashlib.sha256(content).hexdigest()}
+    assert os.listdir(str(tmpdir.join('c', 'a', 'b'))) == ['file']
+    with open(str(tmpdir.join('c', 'a', 'b', 'file')), 'rb') as f:
+        assert f.read() == content
+
+    digests = store.upload('a/b/file', 'content')
+    assert digests['size'] == 7
+    assert digests['md5'] == hashlib.md5(b'content').hexdigest()
+
+
+def test_filesystem_upload_is_atomic(tmpdir):
+    store = filesystem.FileSystem({'path': str(tmpdir), 'container': 'c'})
+    store.upload('a/file', b'previous')
+
+    stream = mock.Mock()
+    stream.read.side_effect = [b'partial', IOError('connection lost')]
+    with pytest.raises(IOError):
+        store.upload('a/file', stream)
+
+    # the previous file is untouched and the temporary one is removed
+    assert os.listdir(str(tmpdir.join('c', 'a'))) == ['file']
+    with open(str(tmpdir.join('c', 'a', 'file')), 'rb') as f:
+        assert f.read() == b'previous'
+
+
+def test_filesystem_get_range(tmpdir):
+    store = filesystem.FileSystem({'path': str(tmpdir), 'container': 'c'})
+    store.upload('file', b'0123456789')
+
+    assert b''.join(store.get_range('file', 2, 5)) == b'234'
+    assert b''.join(store.get_range('file', 8, 10)) == b'89'
+
+
+def test_filesystem_rename(tmpdir):
+    store = filesystem.FileSystem({'path': str(tmpdir), 'container': 'c'})
+    store.upload('a/file', b'content')
+    store.rename('a/file', 'b/c/file')
+    assert b''.join(store.get_range('b/c/file', 0, 7)) == b'content'
+    with pytest.raises(exceptions.StoreExceptions) as exc:
+        store.rename('a/file', 'b/c/file')
+    assert exc.value.status_code == 404
+
+
+@pytest.fixture
+def swift_server():
+    server = fake_swift.FakeSwift().start()
+    yield server
+    server.stop()
+    swift.clear_connection_pools()
+
+
+def test_swift_connections_are_pooled(swift_server):
+    files = swift.Swift(swift_server.store_configuration('files'))
+    components = swift.Swift(swift_server.store_configuration('components'))
+    # the stores with the same credentials share their connections
+    assert files.pool is components.pool
+
+    for i in range(5):
+        files.upload('file-%s' % i, 'content %s' % i)
+        components.upload('file-%s' % i, b'content')
+    assert b''.join(files.get('file-3')[1]) == b'content 3'
+    assert b''.join(files.get_range('file-3', 2, 4)) == b'nt'
+    files.delete('file-3')
+    with pytest.raises(exceptions.StoreExceptions) as exc:
+        files.get('file-3')
+    assert exc.value.status_code == 404
+
+    assert swift_server.counters['authentications'] == 1
+    # the authentication one and the pooled one
+    assert swift_server.counters['connections'] == 2
+    assert files.pool.stats()['idle'] == 1
+    assert files.pool.stats()['in_use'] == 0
+
+
+def test_swift_container_is_checked_once(swift_server):
+    store = swift.Swift(swift_server.store_configuration('files'))
+    store.upload('a', b'a')
+    requests = swift_server.counters['requests']
+    store.upload('b', b'b')
+    # only the object is put
+    assert swift_server.counters['requests'] == requests + 1
+
+    # the container is created again when it was removed
+    del swift_server.containers['files']
+    with pytest.raises(exceptions.StoreExceptions):
+        store.upload('c', b'c')
+    store.upload('c', b'c')
+    assert swift_server.containers['files'] == {'c': b'c'}
+
+
+def test_swift_token_is_renewed(swift_server):
+    now = [0]
+    store = swift.Swift(swift_server.store_configuration('files'))
+    pool = swift.ConnectionPool(store.pool._options, token_ttl=10,
+                                timer=lambda: now[0])
+    store.pool = pool
+
+    store.upload('a', b'a')
+    now[0] = 9
+    store.upload('b', b'b')
+    assert pool.authentications == 1
+    # the token is renewed before it expires
+    now[0] = 10
+    store.upload('c', b'c')
+    assert pool.authentications == 2
+
+    # a connection authenticating after a 401 shares its token
+    swift_server.expire_tokens()
+    assert b''.join(store.get('a')[1]) == b'a'
+    store.upload('d', b'd')
+    assert swift_server.counters['authentications'] == 3
+    assert pool.authentications == 2
+    assert len(swift_server.containers['files']) == 4
+
+
+def test_swift_partially_read_connection_is_discarded(swift_server):
+    store = swift.Swift(swift_server.store_configuration('files'))
+    store.upload('a', b'a' * (stores.CHUNK_SIZE * 3))
+    body = store.get('a')[1]
+    body.read(10)
+    body.close()
+    assert store.pool.stats() == {'idle': 0, 'in_use': 0, 'maxsize': 8,
+                                  'created': 1, 'authentications': 1}
+    assert b''.join(store.get('a')[1]) == b'a' * (stores.CHUNK_SIZE * 3)
+    assert store.pool.stats()['idle'] == 1
+
+    # a body which is not read at all also gives its connection back
+    store.get('a')[1].close()
+    assert store.pool.stats()['in_use'] == 0
+
+
+def test_swift_body_is_a_file(swift_server):
+    store = swift.Swift(swift_server.store_configuration('files'))
+    store.upload('junit', tests_data.JUNIT)
+    _, body = store.get('junit')
+    assert transformations.junit2dict(body)['total'] == 6
+    assert store.pool.stats()['in_use'] == 0
+
+    app = flask.Flask(__name__)
+    app.config['DOWNLOAD_OFFLOAD'] = ''
+    with app.test_request_context():
+        response = files_utils.send_stored_file(store, 'junit', 'text/xml')
+        assert b''.join(response.response) == \
+            tests_data.JUNIT.encode('utf-8')
+        response.close()
+    assert store.pool.stats() == {'idle': 1, 'in_use': 0, 'maxsize': 8,
+                                  'created': 1, 'authentications': 1}
+
+
+def test_swift_rename(swift_server):
+    store = swift.Swift(swift_server.store_configuration('files'))
+    store.upload('a/file', b'content')
+    store.rename('a/file', 'b/c/file')
+    assert swift_server.containers['files'] == {'b/c/file': b'content'}
+    with pytest.raises(exceptions.StoreExceptions) as exc:
+        store.rename('a/file', 'b/c/file')
+    assert exc.value.status_code == 404